@@ -1,10 +1,15 @@
 
-from .utils import get_loop, ScheduleError
-from .schedule import Schedule, RepeatSchedule
+from .utils import get_loop, ScheduleError, CancelToken, get_cancel_token
+from .schedule import CATCH_UP_NONE, CATCH_UP_ONCE, CATCH_UP_ALL, Schedule, RepeatSchedule
+from .tracing import RunContext, get_run_context, Span, start_span, MemoryExporter, FileExporter, Tracer, \
+    get_tracer, set_tracer, enable_tracing, disable_tracing
+from .simulate import iter_run_times, preview, Simulation, simulate, VirtualClock
 
 try:
     from .server import get_server, set_server, start_server, Scheduler, \
-        Message, Error, Quit, Update, RunCommand, ScheduleCommand, RunningSchedule, ListSchedules, StopSchedule
+        Message, Error, Busy, Quit, Ping, Update, RunCommand, ScheduleCommand, RunningSchedule, ListSchedules, \
+        StopSchedule, JobStatus, JobResult, CancelJob, Subscribe, Event, CallbackProfile, Profile, Stats, RunRecord, \
+        GetHistory, Auth, AuthenticationError, make_server_context, make_client_context
 
 except (ImportError, Exception) as srverr:
     srv_error = srverr
@@ -21,20 +26,39 @@ except (ImportError, Exception) as srverr:
 
     Message = ClassEnvironmentError
     Error = ClassEnvironmentError
+    Busy = ClassEnvironmentError
     Quit = ClassEnvironmentError
+    Ping = ClassEnvironmentError
     Update = ClassEnvironmentError
     RunCommand = ClassEnvironmentError
     ScheduleCommand = ClassEnvironmentError
     RunningSchedule = ClassEnvironmentError
     ListSchedules = ClassEnvironmentError
     StopSchedule = ClassEnvironmentError
+    JobStatus = ClassEnvironmentError
+    JobResult = ClassEnvironmentError
+    CancelJob = ClassEnvironmentError
+    Subscribe = ClassEnvironmentError
+    Event = ClassEnvironmentError
+    CallbackProfile = ClassEnvironmentError
+    Profile = ClassEnvironmentError
+    Stats = ClassEnvironmentError
+    RunRecord = ClassEnvironmentError
+    GetHistory = ClassEnvironmentError
+    Auth = ClassEnvironmentError
+    AuthenticationError = ClassEnvironmentError
+    make_server_context = ClassEnvironmentError
+    make_client_context = ClassEnvironmentError
 
 
 try:
     from .client import Client, \
         quit_server_async, quit_server, update_server_async, update_server, request_schedules_async, \
         request_schedules, run_command_async, run_command, schedule_command_async, schedule_command, \
-        stop_schedule_async, stop_schedule
+        stop_schedule_async, stop_schedule, start_command_async, start_command, job_status_async, job_status, \
+        job_result_async, job_result, cancel_job_async, cancel_job, subscribe_async, \
+        request_profile_async, request_profile, request_stats_async, request_stats, get_history_async, get_history, \
+        SyncClient, ClientPool, get_pool, set_pool
 
 except (ImportError, Exception) as err:
     client_error = err
@@ -51,3 +75,13 @@ except (ImportError, Exception) as err:
     run_command_async = run_command = ClassEnvironmentError
     schedule_command_async = schedule_command = ClassEnvironmentError
     stop_schedule_async = stop_schedule = ClassEnvironmentError
+    start_command_async = start_command = ClassEnvironmentError
+    job_status_async = job_status = ClassEnvironmentError
+    job_result_async = job_result = ClassEnvironmentError
+    cancel_job_async = cancel_job = ClassEnvironmentError
+    subscribe_async = ClassEnvironmentError
+    request_profile_async = request_profile = ClassEnvironmentError
+    request_stats_async = request_stats = ClassEnvironmentError
+    get_history_async = get_history = ClassEnvironmentError
+    SyncClient = ClassEnvironmentError
+    ClientPool = get_pool = set_pool = ClassEnvironmentError
@@ -1,14 +1,25 @@
 from async_sched.client import quit_server as module_quit
 from async_sched.client import request_schedules as module_request
 from async_sched.client import run_command as module_run
+from async_sched.client import start_command as module_start
+from async_sched.client import job as module_job
+from async_sched.client import subscribe as module_subscribe
+from async_sched.client import profile as module_profile
+from async_sched.client import stats as module_stats
+from async_sched.client import history as module_history
 from async_sched.client import schedule_command as module_schedule
 from async_sched.client import stop_schedule as module_stop
 from async_sched.client import update_server as module_update
+from async_sched.client import simulate as module_simulate
 
 from .client import Client, \
     quit_server_async, quit_server, update_server_async, update_server, request_schedules_async, \
     request_schedules, run_command_async, run_command, schedule_command_async, schedule_command, \
-    stop_schedule_async, stop_schedule
+    stop_schedule_async, stop_schedule, start_command_async, start_command, job_status_async, job_status, \
+    job_result_async, job_result, cancel_job_async, cancel_job, subscribe_async, \
+    request_profile_async, request_profile, request_stats_async, request_stats, get_history_async, get_history, \
+    SyncClient
+from .pool import ClientPool, get_pool, set_pool, BackgroundLoop
 
 # The other modules in this package exist for the "-m" python flag
 # `python -m async_sched.client.request_schedules --host "12.0.0.1" --port 8000`
@@ -17,6 +28,12 @@ from .client import Client, \
 __all__ = ['Client',
            'quit_server_async', 'quit_server', 'update_server_async', 'update_server', 'request_schedules_async',
            'request_schedules', 'run_command_async', 'run_command', 'schedule_command_async', 'schedule_command',
-           'stop_schedule_async', 'stop_schedule',
+           'stop_schedule_async', 'stop_schedule', 'start_command_async', 'start_command', 'job_status_async',
+           'job_status', 'job_result_async', 'job_result', 'cancel_job_async', 'cancel_job', 'subscribe_async',
+           'request_profile_async', 'request_profile', 'request_stats_async', 'request_stats',
+           'get_history_async', 'get_history', 'SyncClient',
+           'ClientPool', 'get_pool', 'set_pool', 'BackgroundLoop',
 
-           'module_quit', 'module_request', 'module_run', 'module_schedule', 'module_stop', 'module_update']
+           'module_quit', 'module_request', 'module_run', 'module_schedule', 'module_stop', 'module_update',
+           'module_start', 'module_job', 'module_subscribe', 'module_profile',
+           'module_stats', 'module_history', 'module_simulate']
@@ -6,11 +6,20 @@ python -m async_sched.client "quit_server"
 python -m async_sched.client "request_schedules"
 python -m async_sched.client "stop_schedule" "Task 1"
 python -m async_sched.client "run_command" "print_task" "abc"
+python -m async_sched.client "start_command" "print_task" "abc"
+python -m async_sched.client "job" "result" "<job_id>" --wait 1
+python -m async_sched.client "subscribe" --events "failed"
+python -m async_sched.client "profile" --sort "max_step"
+python -m async_sched.client "stats"
+python -m async_sched.client "history" "Task 1" --limit 10
 python -m async_sched.client "schedule_command" "Task 1" "print_task" "abc" --seconds 10
+python -m async_sched.client "simulate" "./schedules.toml" --hours 24
 
 """
 import argparse
-from async_sched.client import module_update, module_request, module_stop, module_run, module_schedule, module_quit
+from async_sched.client import module_update, module_request, module_stop, module_run, module_schedule, module_quit, \
+    module_start, module_job, module_subscribe, module_profile, module_stats, \
+    module_history, module_simulate
 
 
 if __name__ == '__main__':
@@ -21,6 +30,13 @@ if __name__ == '__main__':
                    module_stop.NAME: module_stop,
                    module_run.NAME: module_run,
                    module_schedule.NAME: module_schedule,
+                   module_start.NAME: module_start,
+                   module_job.NAME: module_job,
+                   module_subscribe.NAME: module_subscribe,
+                   module_profile.NAME: module_profile,
+                   module_stats.NAME: module_stats,
+                   module_history.NAME: module_history,
+                   module_simulate.NAME: module_simulate,
                    }
 
     P = argparse.ArgumentParser(description='Run a client command.')
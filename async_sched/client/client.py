@@ -1,35 +1,73 @@
+import ssl
 import asyncio
-from typing import Union, Tuple
+import datetime
+from typing import Union, Tuple, Iterable
 
 from serial_json import DataClass
 
-from async_sched.utils import get_loop
+from async_sched.utils import get_loop, is_unix_address, get_unix_path
 from async_sched.schedule import Schedule
-from async_sched.server.messages import Quit, Update, RunCommand, ScheduleCommand, ListSchedules, StopSchedule
+from async_sched.server.messages import Quit, Ping, Update, RunCommand, ScheduleCommand, ListSchedules, StopSchedule, \
+    JobStatus, JobResult, CancelJob, Subscribe, Profile, Stats, GetHistory, Error, MESSAGE_LIMIT, read_message, \
+    write_message
+from async_sched.server.security import SessionContext, make_token, authenticate_client, get_default_token, \
+    get_default_client_context
+from async_sched.client.pool import get_pool, make_key, BackgroundLoop
 
 
 __all__ = ['Client',
            'quit_server_async', 'quit_server', 'update_server_async', 'update_server', 'request_schedules_async',
            'request_schedules', 'run_command_async', 'run_command', 'schedule_command_async', 'schedule_command',
-           'stop_schedule_async', 'stop_schedule']
+           'stop_schedule_async', 'stop_schedule', 'start_command_async', 'start_command', 'job_status_async',
+           'job_status', 'job_result_async', 'job_result', 'cancel_job_async', 'cancel_job', 'subscribe_async',
+           'request_profile_async', 'request_profile', 'request_stats_async', 'request_stats',
+           'get_history_async', 'get_history', 'SyncClient', 'check_chunk']
+
+
+def check_chunk(message: DataClass) -> ListSchedules:
+    """Return the ListSchedules chunk of a streamed reply or raise an error if the stream did not continue."""
+    if message is None:
+        raise ConnectionError('The server closed the connection before the last chunk!')
+    elif not isinstance(message, ListSchedules):
+        raise ValueError(getattr(message, 'message', 'Invalid reply received!'))
+    return message
 
 
 class Client(object):
 
-    READ_SIZE = 4096
+    MESSAGE_LIMIT = MESSAGE_LIMIT
 
     def __init__(self, addr: Union[str, Tuple[str, int]] = None, port: int = 8000,
+                 auth_token: Union[str, bytes] = None, ssl_context: ssl.SSLContext = None, server_hostname: str = None,
                  loop: asyncio.AbstractEventLoop = None):
+        """Create a client to send commands to a running scheduler server.
+
+        Args:
+            addr (str/tuple)[None]: Ip address or tuple of ip address, port. Use "unix:///path/to/file.sock" to
+                connect to a unix domain socket instead of TCP.
+            port (int)[8000]: Socket port to connect to. Ignored for unix domain sockets.
+            auth_token (str/bytes)[None]: Token of a server that requires authentication. If None use the
+                ASYNC_SCHED_TOKEN environment variable. An empty string disables authentication.
+            ssl_context (ssl.SSLContext)[None]: Connect with TLS using this context (see
+                security.make_client_context). If None TLS is set up from the environment variables (see
+                security.get_default_client_context).
+            server_hostname (str)[None]: Host name the server certificate must match. If None use the address.
+            loop (asyncio.AbstractEventLoop)[None]: Async event loop to run with if None use the running loop.
+        """
         if not isinstance(addr, (list, tuple)):
             addr = (addr, port)
         if len(addr) == 1:
             addr = addr + (port,)
 
         self._loop = loop
+        self.auth_token = get_default_token() if auth_token is None else make_token(auth_token)
+        self.ssl_context = get_default_client_context() if ssl_context is None else ssl_context
+        self.server_hostname = server_hostname
 
         self.reader = None
         self.writer = None
         self._is_connected = False
+        self.streaming = False  # A streamed ListSchedules reply has chunks that were not read yet
 
         self.ip_address = addr[0]
         self.port = addr[1]
@@ -64,88 +102,313 @@ class Client(object):
             self.ip_address = addr
         if isinstance(port, int):
             self.port = port
-        self.reader, self.writer = await asyncio.open_connection(self.ip_address, self.port, **kwargs)
+        kwargs.setdefault('limit', self.MESSAGE_LIMIT)
+        if self.ssl_context is not None:
+            kwargs.setdefault('ssl', self.ssl_context)
+            kwargs.setdefault('server_hostname', self.get_server_hostname())
+        if is_unix_address(self.ip_address):
+            self.reader, self.writer = await asyncio.open_unix_connection(get_unix_path(self.ip_address), **kwargs)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.ip_address, self.port, **kwargs)
+        if self.auth_token is not None:
+            try:
+                self.reader, self.writer = await authenticate_client(self.reader, self.writer, self.auth_token)
+            except BaseException:
+                self.writer.close()
+                raise
+            self.save_session()
+        self._is_connected = True
         return self
 
+    def get_server_hostname(self) -> str:
+        """Return the host name the server certificate must match."""
+        if self.server_hostname:
+            return self.server_hostname
+        elif is_unix_address(self.ip_address):
+            return 'localhost'
+        return self.ip_address
+
+    def save_session(self):
+        """Keep the TLS session so the next connection to the server resumes it instead of a full handshake."""
+        if isinstance(self.ssl_context, SessionContext) and self.writer is not None:
+            self.ssl_context.save_session(self.get_server_hostname(), self.writer.get_extra_info('ssl_object'))
+
+    @property
+    def session_reused(self) -> bool:
+        """Return if the TLS connection resumed a session."""
+        ssl_object = self.writer.get_extra_info('ssl_object') if self.writer is not None else None
+        return bool(ssl_object is not None and ssl_object.session_reused)
+
     async def stop_async(self):
         """Stop the connection"""
         if self.writer is not None:
+            self.save_session()
             self.writer.close()
             await self.writer.wait_closed()
         self.writer = None
         self.reader = None
+        self._is_connected = False
+        self.streaming = False
         return self
 
-    async def send_quit(self):
-        """Send the quit command."""
-        self.writer.write(Quit().json().encode())
-        await self.writer.drain()
+    def is_alive(self) -> bool:
+        """Return if the connection is open and the server has not closed its end."""
+        return (self._is_connected and self.writer is not None and not self.writer.is_closing() and
+                self.reader is not None and not self.reader.at_eof())
+
+    async def drain_stream(self):
+        """Read the chunks that an iter_schedules loop stopped early left on the connection.
 
-        data = await self.reader.read(self.READ_SIZE)
-        message = DataClass.from_json(data)
+        Otherwise the next request on the connection would read a stale chunk as its reply.
+        """
+        while self.streaming:
+            self.streaming = False
+            self.streaming = check_chunk(await read_message(self.reader)).more
+
+    async def send_message(self, message: DataClass) -> DataClass:
+        """Send a message and return the reply message."""
+        if self.streaming:
+            await self.drain_stream()
+        await write_message(self.writer, message)
+        reply = await read_message(self.reader)
+        if reply is None:
+            raise ConnectionError('The server closed the connection!')
+        return reply
+
+    async def send_ping(self):
+        """Send a ping and wait for the server to echo it back."""
+        return await self.send_message(Ping())
+
+    async def send_quit(self, deadline: float = None):
+        """Send the quit command. The server waits up to deadline seconds for the running callbacks."""
+        message = await self.send_message(Quit(deadline=deadline))
         print(f'{message.message}')
         return message
 
-    async def send_update(self, module_name: str = ''):
+    async def send_update(self, module_name: str = '', manifest_path: str = ''):
         """Send the quit command.
 
         Args:
-            module_name (str)['']: Module name to import/reload. If blank import/reload all modules.
+            module_name (str)['']: Module name to import/reload. If blank import/reload all modules and the manifest.
+            manifest_path (str)['']: Manifest file in the directory of the server manifest to load.
         """
-        self.writer.write(Update(module_name=module_name).json().encode())
-        await self.writer.drain()
-
-        data = await self.reader.read(self.READ_SIZE)
-        message = DataClass.from_json(data)
+        message = await self.send_message(Update(module_name=module_name, manifest_path=manifest_path))
         print(f'{message.message}')
         return message
 
-    async def request_schedules(self, print_results=True):
-        """Print the list of schedules."""
-        self.writer.write(ListSchedules().json().encode())
-        await self.writer.drain()
+    async def iter_schedules(self, prefix: str = '', callback_name: str = '',
+                             next_run_after: datetime.datetime = None, next_run_before: datetime.datetime = None,
+                             limit: int = 0, cursor: str = '', chunk_size: int = 100):
+        """Stream the running schedules from the server and yield each RunningSchedule as it arrives.
 
-        data = await self.reader.read(self.READ_SIZE)
-        if not data:
-            data = await self.reader.read(self.READ_SIZE)
-        message = DataClass.from_json(data)
+        Args:
+            prefix (str)['']: Only include schedules with a name that starts with this prefix.
+            callback_name (str)['']: Only include schedules that run this callback.
+            next_run_after (datetime.datetime)[None]: Only include schedules that run at or after this time.
+            next_run_before (datetime.datetime)[None]: Only include schedules that run before this time.
+            limit (int)[0]: Maximum number of schedules to receive. If 0 receive all schedules.
+            cursor (str)['']: Cursor from a previous page to continue from.
+            chunk_size (int)[100]: Number of schedules the server sends in each message.
+        """
+        request = ListSchedules(prefix=prefix, callback_name=callback_name, next_run_after=next_run_after,
+                                next_run_before=next_run_before, limit=limit, cursor=cursor,
+                                stream=True, chunk_size=chunk_size)
+        message = check_chunk(await self.send_message(request))
+        while True:
+            # If the caller stops early the next send_message reads the rest of the chunks first
+            self.streaming = message.more
+            for running in message.schedules:
+                yield running
+            if not message.more:
+                break
+            self.streaming = False
+            message = check_chunk(await read_message(self.reader))
+
+    async def request_schedules(self, print_results=True, prefix: str = '', callback_name: str = '',
+                                next_run_after: datetime.datetime = None, next_run_before: datetime.datetime = None,
+                                limit: int = 0, cursor: str = '', stream: bool = False, chunk_size: int = 100):
+        """Print the list of schedules.
+
+        Args:
+            print_results (bool)[True]: If true print the schedules that were returned.
+            prefix (str)['']: Only include schedules with a name that starts with this prefix.
+            callback_name (str)['']: Only include schedules that run this callback.
+            next_run_after (datetime.datetime)[None]: Only include schedules that run at or after this time.
+            next_run_before (datetime.datetime)[None]: Only include schedules that run before this time.
+            limit (int)[0]: Maximum number of schedules in this page. If 0 return all schedules.
+            cursor (str)['']: Cursor from a previous page to continue from.
+            stream (bool)[False]: If True the server sends the schedules in chunks.
+            chunk_size (int)[100]: Number of schedules the server sends in each chunk when streaming.
+
+        Returns:
+            message (ListSchedules): Message with the schedules and the cursor for the next page.
+        """
+        request = ListSchedules(prefix=prefix, callback_name=callback_name, next_run_after=next_run_after,
+                                next_run_before=next_run_before, limit=limit, cursor=cursor,
+                                stream=stream, chunk_size=chunk_size)
+        message = await self.send_message(request)
+        while isinstance(message, ListSchedules) and message.more:
+            chunk = check_chunk(await read_message(self.reader))
+            message.schedules.extend(chunk.schedules)
+            message.cursor = chunk.cursor
+            message.more = chunk.more
 
         if print_results:
             print('Running Schedules:')
             for running in message.schedules:
                 print(f'  {running.name} = {running.schedule}')
+                sched = running.schedule
+                if sched.missed:
+                    print(f'    Skipped {sched.missed} missed runs')
+                if running.after:
+                    print(f'    Runs after {", ".join(running.after)}')
+                if sched.attempt:
+                    print(f'    Retry {sched.attempt} of {sched.retries} at {sched.retry_run}: {sched.last_error}')
+            if message.cursor:
+                print(f'More schedules after cursor "{message.cursor}"')
 
         return message
 
-    async def run_command(self, callback_name, *args, **kwargs):
-        """Run the given command name on the remote server."""
-        self.writer.write(RunCommand(callback_name=callback_name, args=args, kwargs=kwargs).json().encode())
-        await self.writer.drain()
-
-        data = await self.reader.read(self.READ_SIZE)
-        message = DataClass.from_json(data)
+    async def run_command(self, callback_name, *args, command_timeout: float = None, **kwargs):
+        """Run the given command name on the remote server. The server stops it after command_timeout seconds."""
+        message = await self.send_message(RunCommand(callback_name=callback_name, args=args, kwargs=kwargs,
+                                                     timeout=command_timeout))
         print(f'{message.message}')
         return message
 
-    async def schedule_command(self, name: str, schedule: Schedule, callback_name, *args, **kwargs):
-        """Schedule a command to run on the remote server."""
-        json = ScheduleCommand(name=name, schedule=schedule,
-                               callback_name=callback_name, args=args, kwargs=kwargs).json()
-        self.writer.write(json.encode())
-        await self.writer.drain()
+    async def start_command(self, callback_name, *args, command_timeout: float = None, **kwargs):
+        """Start running the given command name on the remote server in the background.
+
+        The server stops the job after command_timeout seconds.
+
+        Returns:
+            message (JobStatus): Status with the job_id used to get the result.
+        """
+        message = await self.send_message(RunCommand(callback_name=callback_name, args=args, kwargs=kwargs,
+                                                     background=True, timeout=command_timeout))
+        print(f'Job {getattr(message, "job_id", "")} {getattr(message, "status", message)}')
+        return message
+
+    async def job_status(self, job_id: str):
+        """Return the JobStatus of a background command."""
+        message = await self.send_message(JobStatus(job_id=job_id))
+        print(f'Job {message.job_id} {message.status}')
+        return message
 
-        data = await self.reader.read(self.READ_SIZE)
-        message = DataClass.from_json(data)
+    async def job_result(self, job_id: str, wait: bool = False, timeout: float = None):
+        """Return the JobResult of a background command.
+
+        Args:
+            job_id (str): Id of the job returned by start_command.
+            wait (bool)[False]: If True the server replies when the job is done.
+            timeout (float)[None]: Maximum seconds the server waits for the job.
+        """
+        message = await self.send_message(JobResult(job_id=job_id, wait=wait, timeout=timeout))
+        print(f'Job {message.job_id} {message.status}: {message.error or message.result}')
+        return message
+
+    async def cancel_job(self, job_id: str):
+        """Cancel a background command and return the JobStatus."""
+        message = await self.send_message(CancelJob(job_id=job_id))
+        print(f'Job {message.job_id} {message.status}')
+        return message
+
+    async def subscribe(self, names: Iterable[str] = None, prefix: str = '', events: Iterable[str] = None,
+                        max_queue: int = 1000):
+        """Subscribe to server events and yield each Event as it arrives.
+
+        The connection only receives events after subscribing. Close the client to stop the subscription.
+
+        Args:
+            names (list)[None]: Only receive events for these schedule or callback names.
+            prefix (str)['']: Only receive events for names that start with this prefix.
+            events (list)[None]: Only receive these events ("fired", "finished", "failed", "added", "removed").
+            max_queue (int)[1000]: Number of events the server queues before coalescing or dropping events.
+        """
+        await self.send_message(Subscribe(names=list(names or ()), prefix=prefix, events=list(events or ()),
+                                          max_queue=max_queue))
+        while True:
+            message = await read_message(self.reader)
+            if message is None:
+                break
+            yield message
+
+    async def request_stats(self, print_results: bool = True):
+        """Request the server statistics like the event loop lag and how many schedules were shed."""
+        message = await self.send_message(Stats())
+        if print_results:
+            print(f'Lag {message.lag:.3f} s ({message.level}), max lag {message.max_lag:.3f} s, '
+                  f'{message.schedules} schedules, {message.running_jobs} running jobs')
+            for name, value in sorted(message.counters.items()):
+                print(f'{name}: {value}')
+            for priority, late in message.lateness.items():
+                print(f'Priority {priority} lateness: p50 {late["p50"]:.4f} s, p99 {late["p99"]:.4f} s, '
+                      f'max {late["max"]:.4f} s ({late["count"]} runs)')
+            for name, jit in message.jitter.items():
+                print(f'{name} jitter: p50 {jit["p50"] * 1e6:.0f} us, p99 {jit["p99"] * 1e6:.0f} us, '
+                      f'max {jit["max"] * 1e6:.0f} us ({jit["count"]} runs)')
+            for name, limit in message.rate_limits.items():
+                print(f'{name} rate {limit["rate"]}/s ({limit["policy"]}): {limit["depth"]} waiting, '
+                      f'{limit["allowed"]} allowed, {limit["queued"]} queued, {limit["dropped"]} dropped')
+            for dead in message.dead_letters:
+                print(f'Dead letter {dead["name"]} ({dead["callback_name"]}) failed {dead["attempts"]} times '
+                      f'at {dead["time"]}: {dead["error"]}')
+        return message
+
+    async def request_profile(self, print_results: bool = True, sort: str = 'wall', limit: int = 10,
+                              reset: bool = False, enabled: bool = None, slow_threshold: float = None):
+        """Request the callbacks that blocked the server loop the most.
+
+        Args:
+            print_results (bool)[True]: If True print the callback timing.
+            sort (str)['wall']: Sort by "wall", "cpu", "max_step", "slow_steps", "calls" or "elapsed".
+            limit (int)[10]: Number of callbacks to return.
+            reset (bool)[False]: If True clear the timing after it is sent.
+            enabled (bool)[None]: Turn profiling on or off. If None leave it unchanged.
+            slow_threshold (float)[None]: Change the seconds a callback can block the loop before it is logged.
+        """
+        message = await self.send_message(Profile(sort=sort, limit=limit, reset=reset, enabled=enabled,
+                                                  slow_threshold=slow_threshold))
+        if print_results and isinstance(message, Error):
+            print(message.message)
+        elif print_results:
+            print(f'Profiling {"enabled" if message.enabled else "disabled"} '
+                  f'(slow threshold {message.slow_threshold} s)')
+            for prof in message.profiles:
+                print(f'{prof.callback_name}: {prof.calls} calls, {prof.errors} errors, wall {prof.wall:.4f} s, '
+                      f'cpu {prof.cpu:.4f} s, max step {prof.max_step:.4f} s ({prof.slow_name}), '
+                      f'{prof.slow_steps} slow steps')
+        return message
+
+    async def get_history(self, name: str, limit: int = 0, print_results: bool = True):
+        """Request the most recent runs of a schedule, newest first.
+
+        Args:
+            name (str): Name of the schedule.
+            limit (int)[0]: Maximum number of runs to return. 0 returns every run the server keeps.
+            print_results (bool)[True]: If True print the runs.
+        """
+        message = await self.send_message(GetHistory(name=name, limit=limit))
+        if print_results and isinstance(message, Error):
+            print(message.message)
+        elif print_results:
+            print(f'{message.name}: {len(message.runs)} runs')
+            for run in message.runs:
+                late = (run.started - run.planned).total_seconds()
+                print(f'{run.planned} started {late:+.4f} s late, took {run.duration:.4f} s: {run.outcome}')
+        return message
+
+    async def schedule_command(self, name: str, schedule: Schedule, callback_name, *args, after: list = None,
+                               **kwargs):
+        """Schedule a command to run on the remote server. If after is given run it after those schedules succeed."""
+        message = await self.send_message(ScheduleCommand(name=name, schedule=schedule, callback_name=callback_name,
+                                                          args=args, kwargs=kwargs, after=list(after or ())))
         print(f'{message.message}')
         return message
 
     async def stop_schedule(self, name: str):
         """Stop a running schedule."""
-        self.writer.write(StopSchedule(name=name).json().encode())
-        await self.writer.drain()
-
-        data = await self.reader.read(self.READ_SIZE)
-        message = DataClass.from_json(data)
+        message = await self.send_message(StopSchedule(name=name))
         print(f'{message.message}')
         return message
 
@@ -181,80 +444,90 @@ class Client(object):
         return self.loop.run_forever()
 
 
-async def quit_server_async(addr: Tuple[str, int]):
+async def quit_server_async(addr: Tuple[str, int], deadline: float = None):
     """Send a command to the server to Quit.
 
     Args:
         addr (tuple): Server IP address
+        deadline (float)[None]: Seconds the server waits for the running callbacks. None uses its drain timeout.
     """
-    async with Client(addr) as client:
-        return await client.send_quit()
+    async with get_pool().connection(addr, reuse=False) as client:
+        return await client.send_quit(deadline=deadline)
 
 
-def quit_server(addr: Tuple[str, int], loop: asyncio.AbstractEventLoop = None):
+def quit_server(addr: Tuple[str, int], loop: asyncio.AbstractEventLoop = None, deadline: float = None):
     """Send a command to the server to Quit.
 
     Args:
         addr (tuple): Server IP address
         loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+        deadline (float)[None]: Seconds the server waits for the running callbacks. None uses its drain timeout.
     """
     if loop is None:
         loop = get_loop()
-    return loop.run_until_complete(quit_server_async(addr))
+    return loop.run_until_complete(quit_server_async(addr, deadline=deadline))
 
 
-async def update_server_async(addr: Tuple[str, int], module_name: str = '', list_schedules: bool = False):
+async def update_server_async(addr: Tuple[str, int], module_name: str = '', list_schedules: bool = False,
+                              manifest_path: str = ''):
     """Send a command to the server to Update Commands by reading files in the command_path
 
     Args:
         addr (tuple): Server IP address
-        module_name (str)['']: Module name to import/reload. If blank import/reload all modules.
+        module_name (str)['']: Module name to import/reload. If blank import/reload all modules and the manifest.
         list_schedules (bool)[False]: If True request and print the schedules that the server is running.
+        manifest_path (str)['']: Manifest file in the directory of the server manifest to load.
     """
-    async with Client(addr) as client:
-        msg = await client.send_update(module_name=module_name)
+    async with get_pool().connection(addr) as client:
+        msg = await client.send_update(module_name=module_name, manifest_path=manifest_path)
         if list_schedules:
             msg = await client.request_schedules(print_results=True)
         return msg
 
 
 def update_server(addr: Tuple[str, int], module_name: str = '', list_schedules: bool = False,
-                  loop: asyncio.AbstractEventLoop = None):
+                  loop: asyncio.AbstractEventLoop = None, manifest_path: str = ''):
     """Send a command to the server to Update Commands.
 
     Args:
         addr (tuple): Server IP address
-        module_name (str)['']: Module name to import/reload. If blank import/reload all modules.
+        module_name (str)['']: Module name to import/reload. If blank import/reload all modules and the manifest.
         list_schedules (bool)[False]: If True request and print the schedules that the server is running.
         loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+        manifest_path (str)['']: Manifest file in the directory of the server manifest to load.
     """
     if loop is None:
         loop = get_loop()
-    return loop.run_until_complete(update_server_async(addr, module_name, list_schedules))
+    return loop.run_until_complete(update_server_async(addr, module_name, list_schedules, manifest_path))
 
 
-async def request_schedules_async(addr: Tuple[str, int], print_results: bool = True):
+async def request_schedules_async(addr: Tuple[str, int], print_results: bool = True, **filters):
     """Send a command to the server to Update Commands by reading files in the command_path
 
     Args:
         addr (tuple): Server IP address
         print_results (bool)[True]: If true print the schedules that were returned.
+        **filters (dict): prefix, callback_name, next_run_after, next_run_before, limit, cursor, stream and chunk_size
+            keyword arguments for Client.request_schedules.
     """
-    async with Client(addr) as client:
-        return await client.request_schedules(print_results=print_results)
+    async with get_pool().connection(addr) as client:
+        return await client.request_schedules(print_results=print_results, **filters)
 
 
-def request_schedules(addr: Tuple[str, int], print_results: bool = True, loop: asyncio.AbstractEventLoop = None):
+def request_schedules(addr: Tuple[str, int], print_results: bool = True, loop: asyncio.AbstractEventLoop = None,
+                      **filters):
     """Send a command to the server to Update Commands.
 
     Args:
         addr (tuple): Server IP address
         print_results (bool)[True]: If true print the schedules that were returned.
         loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+        **filters (dict): prefix, callback_name, next_run_after, next_run_before, limit, cursor, stream and chunk_size
+            keyword arguments for Client.request_schedules.
     """
     if loop is None:
         loop = get_loop()
-    return loop.run_until_complete(request_schedules_async(addr, print_results=print_results))
+    return loop.run_until_complete(request_schedules_async(addr, print_results=print_results, **filters))
 
 
 async def run_command_async(addr: Tuple[str, int],
@@ -270,7 +543,7 @@ async def run_command_async(addr: Tuple[str, int],
     if not callback_name:
         raise ValueError('Invalid callback name given')
 
-    async with Client(addr) as client:
+    async with get_pool().connection(addr) as client:
         return await client.run_command(callback_name, *args, **kwargs)
 
 
@@ -300,7 +573,8 @@ async def schedule_command_async(addr: Tuple[str, int],
         schedule (Schedule)[None]: Schedule to run the callback function with.
         callback_name (str)['']: Name of the registered callback function.
         *args: Positional arguments for the callback function.
-        **kwargs: Keyword Arguments for the callback function.
+        **kwargs: Keyword Arguments for the callback function. The "after" keyword is the list of schedule names
+            that must succeed before the callback runs.
     """
     if not name:
         raise ValueError('Must give a name to keep track of the schedule!')
@@ -309,7 +583,7 @@ async def schedule_command_async(addr: Tuple[str, int],
     if not callback_name:
         raise ValueError('Invalid callback name given!')
 
-    async with Client(addr) as client:
+    async with get_pool().connection(addr) as client:
         return await client.schedule_command(name, schedule, callback_name, *args, **kwargs)
 
 
@@ -343,7 +617,7 @@ async def stop_schedule_async(addr: Tuple[str, int], name: str = '', list_schedu
     if not name:
         raise ValueError('Must give a name to keep track of the schedule!')
 
-    async with Client(addr) as client:
+    async with get_pool().connection(addr) as client:
         msg = await client.stop_schedule(name)
         if list_schedules:
             msg = await client.request_schedules(print_results=True)
@@ -363,3 +637,318 @@ def stop_schedule(addr: Tuple[str, int], name: str = '', list_schedules: bool =
     if loop is None:
         loop = get_loop()
     return loop.run_until_complete(stop_schedule_async(addr, name, list_schedules=list_schedules))
+
+
+async def start_command_async(addr: Tuple[str, int], callback_name: str = '', *args, **kwargs):
+    """Send a command to the server to run a registered callback function in the background.
+
+    Args:
+        addr (tuple): Server IP address
+        callback_name (str)['']: Name of the registered callback function.
+        *args: Positional arguments for the callback function.
+        **kwargs: Keyword Arguments for the callback function.
+
+    Returns:
+        message (JobStatus): Status with the job_id used to get the result.
+    """
+    if not callback_name:
+        raise ValueError('Invalid callback name given')
+
+    async with get_pool().connection(addr) as client:
+        return await client.start_command(callback_name, *args, **kwargs)
+
+
+def start_command(addr: Tuple[str, int], callback_name: str = '', *args,
+                  loop: asyncio.AbstractEventLoop = None, **kwargs):
+    """Send a command to the server to run a registered callback function in the background.
+
+    Args:
+        addr (tuple): Server IP address
+        callback_name (str)['']: Name of the registered callback function.
+        *args: Positional arguments for the callback function.
+        **kwargs: Keyword Arguments for the callback function.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(start_command_async(addr, callback_name, *args, **kwargs))
+
+
+async def job_status_async(addr: Tuple[str, int], job_id: str = ''):
+    """Request the status of a background command.
+
+    Args:
+        addr (tuple): Server IP address
+        job_id (str)['']: Id of the job returned by start_command.
+    """
+    async with get_pool().connection(addr) as client:
+        return await client.job_status(job_id)
+
+
+def job_status(addr: Tuple[str, int], job_id: str = '', loop: asyncio.AbstractEventLoop = None):
+    """Request the status of a background command.
+
+    Args:
+        addr (tuple): Server IP address
+        job_id (str)['']: Id of the job returned by start_command.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(job_status_async(addr, job_id))
+
+
+async def job_result_async(addr: Tuple[str, int], job_id: str = '', wait: bool = False, timeout: float = None):
+    """Request the result of a background command.
+
+    Args:
+        addr (tuple): Server IP address
+        job_id (str)['']: Id of the job returned by start_command.
+        wait (bool)[False]: If True the server replies when the job is done.
+        timeout (float)[None]: Maximum seconds the server waits for the job.
+    """
+    async with get_pool().connection(addr) as client:
+        return await client.job_result(job_id, wait=wait, timeout=timeout)
+
+
+def job_result(addr: Tuple[str, int], job_id: str = '', wait: bool = False, timeout: float = None,
+               loop: asyncio.AbstractEventLoop = None):
+    """Request the result of a background command.
+
+    Args:
+        addr (tuple): Server IP address
+        job_id (str)['']: Id of the job returned by start_command.
+        wait (bool)[False]: If True the server replies when the job is done.
+        timeout (float)[None]: Maximum seconds the server waits for the job.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(job_result_async(addr, job_id, wait=wait, timeout=timeout))
+
+
+async def cancel_job_async(addr: Tuple[str, int], job_id: str = ''):
+    """Cancel a background command.
+
+    Args:
+        addr (tuple): Server IP address
+        job_id (str)['']: Id of the job returned by start_command.
+    """
+    async with get_pool().connection(addr) as client:
+        return await client.cancel_job(job_id)
+
+
+def cancel_job(addr: Tuple[str, int], job_id: str = '', loop: asyncio.AbstractEventLoop = None):
+    """Cancel a background command.
+
+    Args:
+        addr (tuple): Server IP address
+        job_id (str)['']: Id of the job returned by start_command.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(cancel_job_async(addr, job_id))
+
+
+async def subscribe_async(addr: Tuple[str, int], names: Iterable[str] = None, prefix: str = '',
+                          events: Iterable[str] = None, max_queue: int = 1000):
+    """Subscribe to server events and yield each Event as it arrives. The connection is not shared with the pool.
+
+    Args:
+        addr (tuple): Server IP address
+        names (list)[None]: Only receive events for these schedule or callback names.
+        prefix (str)['']: Only receive events for names that start with this prefix.
+        events (list)[None]: Only receive these events ("fired", "finished", "failed", "added", "removed").
+        max_queue (int)[1000]: Number of events the server queues before coalescing or dropping events.
+    """
+    async with Client(addr) as client:
+        async for event in client.subscribe(names=names, prefix=prefix, events=events, max_queue=max_queue):
+            yield event
+
+
+async def request_stats_async(addr: Tuple[str, int], print_results: bool = True):
+    """Request the server statistics.
+
+    Args:
+        addr (tuple): Server IP address
+        print_results (bool)[True]: If True print the statistics.
+    """
+    async with get_pool().connection(addr) as client:
+        return await client.request_stats(print_results=print_results)
+
+
+def request_stats(addr: Tuple[str, int], print_results: bool = True, loop: asyncio.AbstractEventLoop = None):
+    """Request the server statistics.
+
+    Args:
+        addr (tuple): Server IP address
+        print_results (bool)[True]: If True print the statistics.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(request_stats_async(addr, print_results=print_results))
+
+
+async def request_profile_async(addr: Tuple[str, int], print_results: bool = True, sort: str = 'wall',
+                                limit: int = 10, reset: bool = False, enabled: bool = None,
+                                slow_threshold: float = None):
+    """Request the callbacks that blocked the server loop the most.
+
+    Args:
+        addr (tuple): Server IP address
+        print_results (bool)[True]: If True print the callback timing.
+        sort (str)['wall']: Sort by "wall", "cpu", "max_step", "slow_steps", "calls" or "elapsed".
+        limit (int)[10]: Number of callbacks to return.
+        reset (bool)[False]: If True clear the timing after it is sent.
+        enabled (bool)[None]: Turn profiling on or off. If None leave it unchanged.
+        slow_threshold (float)[None]: Change the seconds a callback can block the loop before it is logged.
+    """
+    async with get_pool().connection(addr) as client:
+        return await client.request_profile(print_results=print_results, sort=sort, limit=limit, reset=reset,
+                                            enabled=enabled, slow_threshold=slow_threshold)
+
+
+def request_profile(addr: Tuple[str, int], print_results: bool = True, sort: str = 'wall', limit: int = 10,
+                    reset: bool = False, enabled: bool = None, slow_threshold: float = None,
+                    loop: asyncio.AbstractEventLoop = None):
+    """Request the callbacks that blocked the server loop the most.
+
+    Args:
+        addr (tuple): Server IP address
+        print_results (bool)[True]: If True print the callback timing.
+        sort (str)['wall']: Sort by "wall", "cpu", "max_step", "slow_steps", "calls" or "elapsed".
+        limit (int)[10]: Number of callbacks to return.
+        reset (bool)[False]: If True clear the timing after it is sent.
+        enabled (bool)[None]: Turn profiling on or off. If None leave it unchanged.
+        slow_threshold (float)[None]: Change the seconds a callback can block the loop before it is logged.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(request_profile_async(addr, print_results=print_results, sort=sort, limit=limit,
+                                                         reset=reset, enabled=enabled, slow_threshold=slow_threshold))
+
+
+async def get_history_async(addr: Tuple[str, int], name: str, limit: int = 0, print_results: bool = True):
+    """Request the most recent runs of a schedule.
+
+    Args:
+        addr (tuple): Server IP address
+        name (str): Name of the schedule.
+        limit (int)[0]: Maximum number of runs to return. 0 returns every run the server keeps.
+        print_results (bool)[True]: If True print the runs.
+    """
+    async with get_pool().connection(addr) as client:
+        return await client.get_history(name, limit=limit, print_results=print_results)
+
+
+def get_history(addr: Tuple[str, int], name: str, limit: int = 0, print_results: bool = True,
+                loop: asyncio.AbstractEventLoop = None):
+    """Request the most recent runs of a schedule.
+
+    Args:
+        addr (tuple): Server IP address
+        name (str): Name of the schedule.
+        limit (int)[0]: Maximum number of runs to return. 0 returns every run the server keeps.
+        print_results (bool)[True]: If True print the runs.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run the async command with.
+    """
+    if loop is None:
+        loop = get_loop()
+    return loop.run_until_complete(get_history_async(addr, name, limit=limit, print_results=print_results))
+
+
+class SyncClient(object):
+    """Thread safe synchronous client that keeps pooled connections open on a background event loop.
+
+    Application code can call these methods in a tight loop without paying for a connection every time.
+
+    Example:
+
+        ..code-block:: python
+
+            client = SyncClient(('127.0.0.1', 8000))
+            for i in range(1000):
+                client.run_command('print_task2', i)
+            client.close()
+
+    Args:
+        addr (str/tuple)[None]: Ip address or tuple of ip address, port.
+        port (int)[8000]: Socket port to connect to.
+        timeout (float)[None]: Seconds to wait for each command.
+    """
+    def __init__(self, addr: Union[str, Tuple[str, int]] = None, port: int = 8000, timeout: float = None):
+        self.addr = make_key(addr, port)
+        self.timeout = timeout
+        self.background = BackgroundLoop()
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and return the result."""
+        return self.background.run(coro, self.timeout)
+
+    def quit_server(self, deadline: float = None):
+        """Send a command to the server to Quit."""
+        return self.run(quit_server_async(self.addr, deadline=deadline))
+
+    def update_server(self, module_name: str = '', list_schedules: bool = False, manifest_path: str = ''):
+        """Send a command to the server to Update Commands."""
+        return self.run(update_server_async(self.addr, module_name, list_schedules, manifest_path))
+
+    def request_schedules(self, print_results: bool = True, **filters):
+        """Request the list of running schedules."""
+        return self.run(request_schedules_async(self.addr, print_results=print_results, **filters))
+
+    def run_command(self, callback_name: str = '', *args, **kwargs):
+        """Run a registered callback function on the server with the given arguments."""
+        return self.run(run_command_async(self.addr, callback_name, *args, **kwargs))
+
+    def start_command(self, callback_name: str = '', *args, **kwargs):
+        """Run a registered callback function on the server in the background and return the JobStatus."""
+        return self.run(start_command_async(self.addr, callback_name, *args, **kwargs))
+
+    def job_status(self, job_id: str = ''):
+        """Return the status of a background command."""
+        return self.run(job_status_async(self.addr, job_id))
+
+    def job_result(self, job_id: str = '', wait: bool = False, timeout: float = None):
+        """Return the result of a background command."""
+        return self.run(job_result_async(self.addr, job_id, wait=wait, timeout=timeout))
+
+    def cancel_job(self, job_id: str = ''):
+        """Cancel a background command."""
+        return self.run(cancel_job_async(self.addr, job_id))
+
+    def schedule_command(self, name: str = '', schedule: Schedule = None, callback_name: str = '', *args, **kwargs):
+        """Schedule a registered callback function to run on the server."""
+        return self.run(schedule_command_async(self.addr, name, schedule, callback_name, *args, **kwargs))
+
+    def stop_schedule(self, name: str = '', list_schedules: bool = False):
+        """Stop running a schedule on the server."""
+        return self.run(stop_schedule_async(self.addr, name, list_schedules=list_schedules))
+
+    def request_stats(self, print_results: bool = True):
+        """Request the server statistics."""
+        return self.run(request_stats_async(self.addr, print_results=print_results))
+
+    def request_profile(self, print_results: bool = True, **kwargs):
+        """Request the callbacks that blocked the server loop the most."""
+        return self.run(request_profile_async(self.addr, print_results=print_results, **kwargs))
+
+    def get_history(self, name: str = '', limit: int = 0, print_results: bool = True):
+        """Request the most recent runs of a schedule."""
+        return self.run(get_history_async(self.addr, name, limit=limit, print_results=print_results))
+
+    def close(self):
+        """Close the pooled connections and stop the background loop."""
+        if self.background.loop is not None:
+            self.run(get_pool().close_async(self.background.loop))
+        self.background.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
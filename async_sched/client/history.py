@@ -0,0 +1,43 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.history "Task 1" --limit 10
+
+"""
+import argparse
+from async_sched.client.client import get_history
+from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'history'
+
+
+def get_argparse(name: str = '', limit: int = 0, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Show the most recent runs of a schedule.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Show the most recent runs of a schedule.')
+
+    p.add_argument('name', type=str, help='Name of the schedule.')
+    p.add_argument('--limit', type=int, default=limit, help='Number of runs to show. 0 shows every kept run.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
+
+    return p
+
+
+def main(name: str = '', limit: int = 0, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    get_history((host, port), name, limit=limit)
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
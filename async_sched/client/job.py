@@ -0,0 +1,53 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.job status "<job_id>"
+python -m async_sched.client.job result "<job_id>" --wait 1
+python -m async_sched.client.job cancel "<job_id>"
+
+"""
+import argparse
+from async_sched.client.client import job_status, job_result, cancel_job
+from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'job'
+
+
+def get_argparse(wait: bool = False, timeout: float = None,
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Get the status or result of a background command or cancel it.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Get the status or result of a background command or cancel it.')
+
+    p.add_argument('action', type=str, choices=['status', 'result', 'cancel'], help='Job action to run.')
+    p.add_argument('job_id', type=str, help='Job id printed by start_command.')
+    p.add_argument('--wait', type=bool, default=wait, help='If True wait for the job to finish to get the result.')
+    p.add_argument('--timeout', type=float, default=timeout, help='Maximum seconds to wait for the result.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
+
+    return p
+
+
+def main(action: str, job_id: str, wait: bool = False, timeout: float = None,
+         host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    if action == 'result':
+        job_result((host, port), job_id, wait=wait, timeout=timeout)
+    elif action == 'cancel':
+        cancel_job((host, port), job_id)
+    else:
+        job_status((host, port), job_id)
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
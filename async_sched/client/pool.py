@@ -0,0 +1,219 @@
+import ssl
+import socket
+import asyncio
+import weakref
+import threading
+import contextlib
+from collections import deque
+from typing import Union, Tuple
+
+from async_sched.utils import get_loop, get_clock, is_unix_address
+from async_sched.server.messages import Ping
+
+
+__all__ = ['ClientPool', 'get_pool', 'set_pool', 'make_key', 'BackgroundLoop']
+
+
+POOL = None
+
+
+def get_pool() -> 'ClientPool':
+    """Return the process wide connection pool used by the module level helper functions."""
+    global POOL
+    if POOL is None:
+        POOL = ClientPool()
+    return POOL
+
+
+def set_pool(value: 'ClientPool'):
+    """Set the process wide connection pool. If None a new pool is created on the next get_pool()."""
+    global POOL
+    POOL = value
+
+
+def make_key(addr: Union[str, Tuple[str, int]] = None, port: int = 8000) -> Tuple[str, int]:
+    """Return the (host, port) key for the given address the same way the Client parses it."""
+    if not isinstance(addr, (list, tuple)):
+        addr = (addr, port)
+    if len(addr) == 1:
+        addr = tuple(addr) + (port,)
+    if is_unix_address(addr[0]):
+        return addr[0], 0
+    return addr[0], addr[1]
+
+
+class ClientPool(object):
+    """Keep idle client connections open so repeated commands to the same server skip the connection handshake.
+
+    Streams belong to the event loop that created them, so idle connections are kept per loop and per address.
+
+    Args:
+        max_idle (int)[4]: Maximum number of idle connections to keep for each address.
+        keep_alive (float)[60]: Seconds an idle connection is kept before it is closed.
+        health_check (float)[5]: Ping connections that were idle longer than this many seconds before reusing them.
+        ping_timeout (float)[2]: Seconds to wait for the ping reply before dropping the connection.
+        auth_token (str/bytes)[None]: Token for the new clients. If None the clients use ASYNC_SCHED_TOKEN.
+        ssl_context (ssl.SSLContext)[None]: TLS context for the new clients. If None the clients use the environment
+            variables. A pooled connection pays for the TLS and authentication handshake once and a SessionContext
+            resumes the TLS session for the connections that are opened later.
+    """
+    def __init__(self, max_idle: int = 4, keep_alive: float = 60, health_check: float = 5, ping_timeout: float = 2,
+                 auth_token: Union[str, bytes] = None, ssl_context: ssl.SSLContext = None):
+        self.max_idle = max_idle
+        self.keep_alive = keep_alive
+        self.health_check = health_check
+        self.ping_timeout = ping_timeout
+        self.auth_token = auth_token
+        self.ssl_context = ssl_context
+
+        self._idle = weakref.WeakKeyDictionary()  # {loop: {key: deque([(last_used, client), ...])}}
+
+    def get_idle(self, loop: asyncio.AbstractEventLoop = None) -> dict:
+        """Return the dictionary of idle connections for the given loop."""
+        if loop is None:
+            loop = get_loop()
+        try:
+            return self._idle[loop]
+        except KeyError:
+            idle = self._idle[loop] = {}
+            return idle
+
+    def count_idle(self, addr: Union[str, Tuple[str, int]] = None) -> int:
+        """Return the number of idle connections for the address (or all addresses) on the running loop."""
+        idle = self.get_idle()
+        if addr is None:
+            return sum(len(clients) for clients in idle.values())
+        return len(idle.get(make_key(addr), ()))
+
+    def make_client(self, key: Tuple[str, int]) -> 'Client':
+        """Create a new client for the given (host, port) key."""
+        from async_sched.client.client import Client  # client.py uses this module for the helper functions
+        return Client(key, auth_token=self.auth_token, ssl_context=self.ssl_context)
+
+    async def is_healthy(self, client: 'Client', last_used: float) -> bool:
+        """Return if the idle client can be reused."""
+        if not client.is_alive():
+            return False
+
+        idle_time = get_clock().monotonic() - last_used
+        if self.keep_alive is not None and idle_time > self.keep_alive:
+            return False
+
+        if self.health_check is not None and idle_time > self.health_check:
+            try:
+                msg = await asyncio.wait_for(client.send_ping(), self.ping_timeout)
+                return isinstance(msg, Ping)
+            except (asyncio.TimeoutError, ConnectionError, TypeError, ValueError, Exception):
+                return False
+        return True
+
+    async def acquire(self, addr: Union[str, Tuple[str, int]] = None, port: int = 8000, **kwargs) -> 'Client':
+        """Return a healthy idle client for the address or connect a new one."""
+        key = make_key(addr, port)
+        clients = self.get_idle().get(key)
+        while clients:
+            last_used, client = clients.pop()
+            if await self.is_healthy(client, last_used):
+                return client
+            await self.discard(client)
+
+        client = self.make_client(key)
+        await client.start_async(**kwargs)
+        if not is_unix_address(key[0]):
+            sock = client.writer.get_extra_info('socket')
+            if sock is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return client
+
+    async def release(self, client: 'Client'):
+        """Give the client back to the pool so it can be reused."""
+        if not client.is_alive():
+            return await self.discard(client)
+
+        key = make_key((client.ip_address, client.port))
+        clients = self.get_idle().setdefault(key, deque())
+        clients.append((get_clock().monotonic(), client))
+        while len(clients) > self.max_idle:
+            _, old = clients.popleft()
+            await self.discard(old)
+
+    async def discard(self, client: 'Client'):
+        """Close the client without returning it to the pool."""
+        try:
+            await client.stop_async()
+        except (ConnectionError, Exception):
+            pass
+
+    @contextlib.asynccontextmanager
+    async def connection(self, addr: Union[str, Tuple[str, int]] = None, port: int = 8000, reuse: bool = True,
+                         **kwargs):
+        """Context manager that acquires a client and releases it when finished.
+
+        A client that raised an error is closed since the state of its stream is unknown.
+
+        Args:
+            addr (str/tuple)[None]: Ip address or tuple of ip address, port.
+            port (int)[8000]: Socket port to connect to.
+            reuse (bool)[True]: If False close the connection instead of returning it to the pool.
+            **kwargs (dict): Keyword arguments for opening a new connection.
+        """
+        client = await self.acquire(addr, port, **kwargs)
+        try:
+            yield client
+        except BaseException:
+            await self.discard(client)
+            raise
+        else:
+            if reuse:
+                await self.release(client)
+            else:
+                await self.discard(client)
+
+    async def close_async(self, loop: asyncio.AbstractEventLoop = None):
+        """Close all idle connections for the given loop."""
+        idle = self.get_idle(loop)
+        clients = [client for items in idle.values() for _, client in items]
+        idle.clear()
+        for client in clients:
+            await self.discard(client)
+
+
+class BackgroundLoop(object):
+    """Event loop running forever in a daemon thread. Coroutines can be run on it from any thread."""
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> 'BackgroundLoop':
+        """Start the background thread if it is not running."""
+        with self._lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name='async_sched_client', daemon=True)
+                self.thread.start()
+        return self
+
+    def run(self, coro, timeout: float = None):
+        """Run the coroutine on the background loop and wait for the result."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    @staticmethod
+    async def cancel_tasks():
+        """Cancel the other tasks on the loop and wait for them to finish like asyncio.run does."""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        """Cancel the tasks on the background loop, stop the loop and wait for the thread to end."""
+        with self._lock:
+            if self.loop is not None and self.thread is not None and self.thread.is_alive():
+                asyncio.run_coroutine_threadsafe(self.cancel_tasks(), self.loop).result()
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.thread.join()
+                self.loop.close()
+            self.loop = None
+            self.thread = None
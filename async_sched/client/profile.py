@@ -0,0 +1,56 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.profile --enabled 1
+python -m async_sched.client.profile --sort "max_step" --limit 5
+python -m async_sched.client.profile --reset 1
+
+"""
+import argparse
+from async_sched.client.client import request_profile
+from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'profile'
+
+
+def get_argparse(sort: str = 'wall', limit: int = 10, reset: bool = False, enabled: int = None,
+                 slow_threshold: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Show the callbacks that blocked the server loop the most.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Show the callbacks that blocked the server loop the most.')
+
+    p.add_argument('--sort', type=str, default=sort,
+                   choices=['wall', 'cpu', 'max_step', 'slow_steps', 'calls', 'elapsed'],
+                   help='Value to sort the callbacks by.')
+    p.add_argument('--limit', type=int, default=limit, help='Number of callbacks to show.')
+    p.add_argument('--reset', type=bool, default=reset, help='If True clear the timing after it is shown.')
+    p.add_argument('--enabled', type=int, default=enabled, help='1 to turn profiling on or 0 to turn it off.')
+    p.add_argument('--slow_threshold', type=float, default=slow_threshold,
+                   help='Seconds a callback can block the loop before it is logged as slow.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
+
+    return p
+
+
+def main(sort: str = 'wall', limit: int = 10, reset: bool = False, enabled: int = None,
+         slow_threshold: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    if enabled is not None:
+        enabled = bool(enabled)
+    request_profile((host, port), sort=sort, limit=limit, reset=reset, enabled=enabled,
+                    slow_threshold=slow_threshold)
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
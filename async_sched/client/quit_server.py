@@ -15,20 +15,23 @@ __all__ = ['NAME', 'get_argparse', 'main']
 NAME = 'quit_server'
 
 
-def get_argparse(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+def get_argparse(deadline: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
     if parent_parser is None:
         p = argparse.ArgumentParser(description='Quit the server')
     else:
         p = parent_parser.add_parser(NAME, help='Quit the server')
 
-    p.add_argument('--host', type=str, default='127.0.0.1')
-    p.add_argument('--port', type=int, default=8000)
+    p.add_argument('--deadline', type=float, default=deadline,
+                   help='Seconds the server waits for the running callbacks before it stops.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
 
     return p
 
 
-def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
-    quit_server((host, port))
+def main(deadline: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    quit_server((host, port), deadline=deadline)
 
 
 if __name__ == '__main__':
@@ -1,10 +1,11 @@
 """
 module to run with the -m flag
 
-python -m async_sched.client.request_schedules
+python -m async_sched.client.request_schedules --prefix "Task" --limit 100
 
 """
 import argparse
+from serial_json import make_datetime
 from async_sched.client.client import request_schedules
 from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
 
@@ -15,20 +16,40 @@ __all__ = ['NAME', 'get_argparse', 'main']
 NAME = 'request_schedules'
 
 
-def get_argparse(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+def get_argparse(prefix: str = '', callback_name: str = '', next_run_after: str = None, next_run_before: str = None,
+                 limit: int = 0, cursor: str = '', stream: bool = False,
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
     if parent_parser is None:
         p = argparse.ArgumentParser(description='Request and list the running schedules')
     else:
         p = parent_parser.add_parser(NAME, help='Request and list the running schedules')
 
-    p.add_argument('--host', type=str, default=host)
+    p.add_argument('--prefix', type=str, default=prefix, help='Only list schedules with names that start with this.')
+    p.add_argument('--callback_name', type=str, default=callback_name, help='Only list schedules with this callback.')
+    p.add_argument('--next_run_after', type=str, default=next_run_after,
+                   help='Only list schedules that run at or after this datetime.')
+    p.add_argument('--next_run_before', type=str, default=next_run_before,
+                   help='Only list schedules that run before this datetime.')
+    p.add_argument('--limit', type=int, default=limit, help='Maximum number of schedules to list. 0 lists all.')
+    p.add_argument('--cursor', type=str, default=cursor, help='Cursor printed by the previous page.')
+    p.add_argument('--stream', type=bool, default=stream, help='If True the server sends the schedules in chunks.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
     p.add_argument('--port', type=int, default=port)
 
     return p
 
 
-def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
-    request_schedules((host, port))
+def main(prefix: str = '', callback_name: str = '', next_run_after: str = None, next_run_before: str = None,
+         limit: int = 0, cursor: str = '', stream: bool = False,
+         host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    if next_run_after is not None:
+        next_run_after = make_datetime(next_run_after)
+    if next_run_before is not None:
+        next_run_before = make_datetime(next_run_before)
+
+    request_schedules((host, port), prefix=prefix, callback_name=callback_name, next_run_after=next_run_after,
+                      next_run_before=next_run_before, limit=limit, cursor=cursor, stream=stream)
 
 
 if __name__ == '__main__':
@@ -23,7 +23,7 @@ def parse(value):
         return value
 
 
-def get_argparse(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+def get_argparse(timeout: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
     if parent_parser is None:
         p = argparse.ArgumentParser(description='Run a registered command on the server.')
     else:
@@ -31,16 +31,18 @@ def get_argparse(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_pars
 
     p.add_argument('callback_name', help='Registered callback name to run.')
     p.add_argument('args', nargs='*', help='Positional arguments to pass into the callback function.')
+    p.add_argument('--timeout', type=float, default=timeout, help='Seconds before the server stops the command.')
 
-    p.add_argument('--host', type=str, default=host)
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
     p.add_argument('--port', type=int, default=port)
 
     return p
 
 
-def main(callback_name: str, args: tuple, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+def main(callback_name: str, args: tuple, timeout: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+         **kwargs):
     args = (parse(arg) for arg in args)
-    run_command((host, port), callback_name, *args)
+    run_command((host, port), callback_name, *args, command_timeout=timeout)
 
 
 if __name__ == '__main__':
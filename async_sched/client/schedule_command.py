@@ -29,8 +29,10 @@ def parse(value):
 def get_argparse(days: int = 0, hours: int = 0, minutes: int = 0, seconds: float = 0, milliseconds: int = 0,
                  microseconds: int = 0, weeks: int = 0, weekdays: Weekdays = '', repeat: bool = False,
                  at: datetime.date = None, start_on: datetime.time = None, end_on: datetime.time = None,
-                 next_run: datetime.datetime = None,
-                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+                 next_run: datetime.datetime = None, priority: int = 0, shed: str = 'none',
+                 spin: float = 0, misfire_grace_time: float = 1.0, catch_up: str = 'once', max_catch_up: int = 10,
+                 timeout: float = None, after: list = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 parent_parser=None):
     if parent_parser is None:
         p = argparse.ArgumentParser(description='Schedule one of the registered commands to run.')
     else:
@@ -54,8 +56,23 @@ def get_argparse(days: int = 0, hours: int = 0, minutes: int = 0, seconds: float
     p.add_argument('--start_on', type=str, default=start_on, help='Schedule field')
     p.add_argument('--end_on', type=str, default=end_on, help='Schedule field')
     p.add_argument('--next_run', type=str, default=next_run, help='Schedule field')
-
-    p.add_argument('--host', type=str, default=host)
+    p.add_argument('--priority', type=int, default=priority, help='Schedule field higher priorities run first.')
+    p.add_argument('--shed', type=str, default=shed, choices=['none', 'defer', 'skip'],
+                   help='Schedule field what to do with the schedule while the server is overloaded.')
+    p.add_argument('--spin', type=float, default=spin,
+                   help='Schedule field seconds to wait precisely before each run. 0 disables precision mode.')
+    p.add_argument('--misfire_grace_time', type=float, default=misfire_grace_time,
+                   help='Schedule field seconds a run can be late before it counts as a missed run.')
+    p.add_argument('--catch_up', type=str, default=catch_up, choices=['none', 'once', 'all'],
+                   help='Schedule field skip, run once or run all of the missed runs.')
+    p.add_argument('--max_catch_up', type=int, default=max_catch_up,
+                   help='Schedule field maximum number of missed runs to run with catch_up "all".')
+    p.add_argument('--timeout', type=float, default=timeout,
+                   help='Schedule field seconds a run can take before it is stopped.')
+    p.add_argument('--after', type=str, nargs='*', default=after,
+                   help='Run every time all of these schedules succeeded instead of on the schedule.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
     p.add_argument('--port', type=int, default=port)
 
     return p
@@ -65,6 +82,8 @@ def main(name: str, callback_name: str, args: tuple, days: int = 0, hours: int =
          seconds: float = 0, milliseconds: int = 0, microseconds: int = 0, weeks: int = 0,
          weekdays: Weekdays = '', repeat: bool = False, at: datetime.date = None,
          start_on: datetime.time = None, end_on: datetime.time = None, next_run: datetime.datetime = None,
+         priority: int = 0, shed: str = 'none', spin: float = 0, misfire_grace_time: float = 1.0,
+         catch_up: str = 'once', max_catch_up: int = 10, timeout: float = None, after: list = None,
          host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
 
     args = (parse(arg) for arg in args)
@@ -72,9 +91,11 @@ def main(name: str, callback_name: str, args: tuple, days: int = 0, hours: int =
 
     s = Schedule(days=days, hours=hours, minutes=minutes, seconds=seconds, milliseconds=milliseconds,
                  microseconds=microseconds, weeks=weeks, weekdays=weekdays, repeat=repeat, at=at,
-                 start_on=start_on, end_on=end_on, next_run=next_run)
+                 start_on=start_on, end_on=end_on, next_run=next_run, priority=priority, shed=shed,
+                 spin=spin, misfire_grace_time=misfire_grace_time, catch_up=catch_up, max_catch_up=max_catch_up,
+                 timeout=timeout)
 
-    schedule_command((host, port), name, s, callback_name, *args)
+    schedule_command((host, port), name, s, callback_name, *args, after=after)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,74 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.simulate "./schedules.toml" --hours 24 --duration 2
+
+"""
+import datetime
+import argparse
+from async_sched.server.manifest import read_manifest, make_schedule
+from async_sched.simulate import preview as preview_schedule, simulate
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'simulate'
+
+
+def get_argparse(manifest_path: str = '', start: str = '', hours: float = 24, duration: float = 0,
+                 bucket: float = 60, resolution: float = 1, busiest: int = 5, preview: int = 0, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Simulate the schedules of a manifest without running them.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Simulate the schedules of a manifest without running them.')
+
+    p.add_argument('manifest_path', type=str, help='JSON, TOML or YAML manifest with the schedules.')
+    p.add_argument('--start', type=str, default=start, help='ISO time the simulation starts at. Empty uses now.')
+    p.add_argument('--hours', type=float, default=hours, help='Number of hours to simulate.')
+    p.add_argument('--duration', type=float, default=duration, help='Seconds each run is expected to take.')
+    p.add_argument('--bucket', type=float, default=bucket, help='Seconds in each reported bucket.')
+    p.add_argument('--resolution', type=float, default=resolution,
+                   help='Seconds in each slot the concurrency is counted in.')
+    p.add_argument('--busiest', type=int, default=busiest, help='Number of the busiest buckets to show.')
+    p.add_argument('--preview', type=int, default=preview, help='Show the next run times of every schedule.')
+
+    return p
+
+
+def main(manifest_path: str = '', start: str = '', hours: float = 24, duration: float = 0, bucket: float = 60,
+         resolution: float = 1, busiest: int = 5, preview: int = 0, **kwargs):
+    start = datetime.datetime.fromisoformat(start) if start else datetime.datetime.now()
+    schedules = {}
+    for name, entry in read_manifest(manifest_path).items():
+        schedules[name] = sched = make_schedule(entry)
+        if 'start_on' not in entry['schedule']:
+            sched.start_on = start  # Start like the manifest was loaded when the simulation starts
+
+    if preview > 0:
+        for name, sched in schedules.items():
+            times = ', '.join(str(dt) for dt in preview_schedule(sched, preview, start))
+            print(f'{name}: {times}')
+
+    sim = simulate(schedules, start, start + datetime.timedelta(hours=hours), duration=duration, bucket=bucket,
+                   resolution=resolution)
+    summary = sim.summary()
+    print('{schedules} schedules, {runs} runs from {start} to {end}'.format(start=sim.start, end=sim.end, **summary))
+    print('Firings per {bucket_seconds:g} s: max {max_firings}, mean {mean_firings:.1f}'.format(**summary))
+    print('Peak concurrency: {peak_concurrency} at {peak_time}'.format(**summary))
+
+    print('Firings histogram (firings: buckets):')
+    for firings, count in sim.get_histograms()['firings'].items():
+        print(f'  {firings:8d}: {count}')
+    print('Busiest buckets:')
+    for item in sim.busiest(busiest):
+        print('  {time}: {firings} firings, {concurrency} concurrent'.format(**item))
+    return sim
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,53 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.start_command "print_task" "abc"
+
+"""
+import argparse
+import serial_json
+from async_sched.client.client import start_command
+from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'start_command'
+
+
+def parse(value):
+    try:
+        return serial_json.loads(value)
+    except:
+        return value
+
+
+def get_argparse(timeout: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Start a registered command on the server and print the job id.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Start a registered command on the server and print the job id.')
+
+    p.add_argument('callback_name', help='Registered callback name to run.')
+    p.add_argument('args', nargs='*', help='Positional arguments to pass into the callback function.')
+    p.add_argument('--timeout', type=float, default=timeout, help='Seconds before the server stops the command.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
+
+    return p
+
+
+def main(callback_name: str, args: tuple, timeout: float = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+         **kwargs):
+    args = (parse(arg) for arg in args)
+    start_command((host, port), callback_name, *args, command_timeout=timeout)
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,39 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.stats --host "127.0.0.1" --port 8000
+
+"""
+import argparse
+from async_sched.client.client import request_stats
+from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'stats'
+
+
+def get_argparse(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Show the server statistics like the event loop lag.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Show the server statistics like the event loop lag.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
+
+    return p
+
+
+def main(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    request_stats((host, port))
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -25,7 +25,7 @@ def get_argparse(list_schedules: bool = True, host: str = DEFAULT_HOST, port: in
     p.add_argument('--list_schedules', '-l', type=bool, default=list_schedules,
                    help='If True print the running schedules')
 
-    p.add_argument('--host', type=str, default=host)
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
     p.add_argument('--port', type=int, default=port)
 
     return p
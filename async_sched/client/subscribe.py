@@ -0,0 +1,61 @@
+"""
+module to run with the -m flag
+
+python -m async_sched.client.subscribe --events "fired,failed" --prefix "Task"
+
+"""
+import asyncio
+import argparse
+from async_sched.client.client import subscribe_async
+from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
+
+
+__all__ = ['NAME', 'get_argparse', 'main']
+
+
+NAME = 'subscribe'
+
+
+def get_argparse(names: str = '', prefix: str = '', events: str = '',
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Print the server events as they happen.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Print the server events as they happen.')
+
+    p.add_argument('--names', type=str, default=names, help='Comma separated schedule names to receive events for.')
+    p.add_argument('--prefix', type=str, default=prefix, help='Only receive events for names with this prefix.')
+    p.add_argument('--events', type=str, default=events,
+                   help='Comma separated events to receive (fired, finished, failed, added, removed).')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
+    p.add_argument('--port', type=int, default=port)
+
+    return p
+
+
+async def print_events(addr, names=None, prefix='', events=None):
+    async for event in subscribe_async(addr, names=names, prefix=prefix, events=events):
+        error = f': {event.error}' if event.error else ''
+        count = f' x{event.count}' if event.count > 1 else ''
+        print(f'{event.time} {event.event} "{event.name}"{count}{error}')
+        if event.dropped:
+            print(f'  {event.dropped} events were dropped')
+
+
+def main(names: str = '', prefix: str = '', events: str = '',
+         host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    names = [name for name in names.split(',') if name]
+    events = [event for event in events.split(',') if event]
+    try:
+        asyncio.run(print_events((host, port), names=names, prefix=prefix, events=events))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
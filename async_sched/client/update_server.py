@@ -15,7 +15,7 @@ __all__ = ['NAME', 'get_argparse', 'main']
 NAME = 'update_server'
 
 
-def get_argparse(module_name: str = '', list_schedules: bool = True,
+def get_argparse(module_name: str = '', list_schedules: bool = True, manifest_path: str = '',
                  host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, parent_parser=None):
     if parent_parser is None:
         p = argparse.ArgumentParser(description='Update the server command modules.')
@@ -28,18 +28,20 @@ def get_argparse(module_name: str = '', list_schedules: bool = True,
                    help='Name of the module to import or reload. If None import/reload all.')
     p.add_argument('--list_schedules', '-l', type=bool, default=list_schedules,
                    help='If True print the running schedules')
+    p.add_argument('--manifest_path', type=str, default=manifest_path,
+                   help='JSON, TOML or YAML manifest file in the directory of the server manifest to load.')
 
-    p.add_argument('--host', type=str, default=host)
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
     p.add_argument('--port', type=int, default=port)
 
     return p
 
 
-def main(name: str = '', module_name: str = '', list_schedules: bool = True,
+def main(name: str = '', module_name: str = '', list_schedules: bool = True, manifest_path: str = '',
          host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
     if name:
         module_name = name
-    update_server((host, port), module_name=module_name, list_schedules=list_schedules)
+    update_server((host, port), module_name=module_name, list_schedules=list_schedules, manifest_path=manifest_path)
 
 
 if __name__ == '__main__':
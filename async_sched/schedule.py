@@ -1,18 +1,36 @@
 import time
+import random
 import inspect
 import asyncio
 import datetime
 import logging
+from operator import itemgetter
 from typing import Union, Callable, Awaitable, Tuple, Optional, ClassVar
 
 from serial_json import DataClass, field, field_property, MISSING, \
     Weekdays, weekdays_property, weekdays_attr_property, \
     datetime_property, time_property, timedelta_attr_property, seconds_property, make_datetime
 
-from .utils import call, call_async, get_loop
+from .utils import call, call_async, call_timeout, get_loop, get_task_name, get_clock, sleep_precise
+from .tracing import RunContext
 
 
-__all__ = ['Schedule', 'RepeatSchedule']
+__all__ = ['CATCH_UP_NONE', 'CATCH_UP_ONCE', 'CATCH_UP_ALL', 'TIMING_KEYS', 'SETTING_KEYS', 'Schedule',
+           'RepeatSchedule']
+
+
+CATCH_UP_NONE = 'none'
+CATCH_UP_ONCE = 'once'
+CATCH_UP_ALL = 'all'
+
+# __dict__ keys of the values that decide when a schedule runs and of the other values that decide how it runs.
+# The values that keep the state of the runs (last_run, attempt, missed, ...) are not settings.
+TIMING_KEYS = ('days', 'hours', 'minutes', '_seconds', 'milliseconds', 'microseconds', 'weeks', '_weekdays', 'repeat',
+               '_at', '_start_on', '_end_on')
+SETTING_KEYS = TIMING_KEYS + ('shed', 'priority', 'spin', 'retries', 'retry_delay', 'retry_backoff',
+                              'retry_max_delay', 'retry_jitter', 'misfire_grace_time', 'catch_up', 'max_catch_up',
+                              'catch_up_delay', 'timeout')
+get_settings = itemgetter(*SETTING_KEYS)
 
 
 class Schedule(DataClass):
@@ -75,10 +93,34 @@ class Schedule(DataClass):
 
         repeat (bool)[True]: If True repeat the schedule else run once.
         at (Time/str)[None]: Time of day when the schedule should run.
-        start_on (DateTime/str)[datetime.datetime.now()]: Date and time on which to start on.
+        start_on (DateTime/str)[get_clock().now()]: Date and time on which to start on.
         end_on (DateTime/str)[None]: Date and time on which to end on.
         last_run (DateTime/str)[None]: Date and time to make the next_run from.
         next_run (DateTime/str)[None]: Manually set the next run time.
+        shed (str)['none']: What a server does with this schedule while its event loop is overloaded. "none" runs
+            on time, "defer" waits until the loop catches up (missed runs become one run) and "skip" skips the run.
+        priority (int)[0]: Schedules with a higher priority run first when several schedules are due together.
+        spin (float)[0]: High precision mode for short intervals. Seconds before the run time to stop the normal
+            sleep and wait precisely (see utils.sleep_precise). Precise schedules also run at a fixed rate from the
+            time they were due instead of from when they ran, so they do not drift. 0 disables precision mode.
+        retries (int)[0]: Number of times to retry a run that raised an error before giving up on the run.
+        retry_delay (float)[1]: Seconds to wait before the first retry.
+        retry_backoff (float)[2]: Multiply the delay by this for every retry after the first.
+        retry_max_delay (float)[3600]: Maximum seconds to wait before a retry.
+        retry_jitter (float)[0.1]: Randomly change the delay by up to this fraction so retries do not line up.
+        attempt (int)[0]: Number of times the current run failed. Reset when the run succeeds or gives up.
+        last_error (str)['']: Error message of the last failed run.
+        retry_run (DateTime/str)[None]: When the pending retry runs. A pending retry replaces the next run.
+        misfire_grace_time (float)[1]: Seconds a run can be late and still run normally. A later run missed its
+            time (after the host slept, the loop stalled or start_on is far in the past) and the catch_up policy
+            decides what happens to the missed runs. None never counts a run as missed.
+        catch_up (str)['once']: What happens to missed runs. "none" skips them and waits for the next run time,
+            "once" runs once for all of them and "all" runs every missed run (at most max_catch_up runs).
+        max_catch_up (int)[10]: Maximum number of missed runs "all" runs in a row. The rest are skipped.
+        catch_up_delay (float)[0]: Seconds between the runs of "all" so catching up does not flood the callback.
+        missed (int)[0]: Number of missed runs that were skipped.
+        timeout (float)[None]: Seconds an asynchronous run can take before it is cancelled and fails with a
+            TimeoutError (which can be retried). None is no timeout.
     """
     days: int = field(0, skip_repr=0, skip_dict=0)
     hours: int = field(0, skip_repr=0, skip_dict=0)
@@ -101,17 +143,43 @@ class Schedule(DataClass):
 
     repeat: bool = False
     at: datetime.time = time_property('at', allow_none=True, required=False, skip_repr=None, skip_dict=None)
-    start_on: datetime.datetime = datetime_property('start_on', default_factory=datetime.datetime.now, repr=False)
+    start_on: datetime.datetime = datetime_property('start_on', default_factory=lambda: get_clock().now(), repr=False)
     end_on: datetime.datetime = datetime_property('end_on', allow_none=True, required=False, skip_repr=None, skip_dict=None)
     last_run: datetime.datetime = datetime_property('last_run', allow_none=True, required=False, repr=False, skip_dict=None)
     _next_run: Union[datetime.datetime, None] = field(default=None, repr=False, skip_dict=None)
+    shed: str = field('none', skip_repr='none', skip_dict='none')
+    priority: int = field(0, skip_repr=0, skip_dict=0)
+    spin: float = field(0.0, skip_repr=0.0, skip_dict=0.0)
+    retries: int = field(0, skip_repr=0, skip_dict=0)
+    retry_delay: float = field(1.0, skip_repr=1.0, skip_dict=1.0)
+    retry_backoff: float = field(2.0, skip_repr=2.0, skip_dict=2.0)
+    retry_max_delay: float = field(3600.0, skip_repr=3600.0, skip_dict=3600.0)
+    retry_jitter: float = field(0.1, skip_repr=0.1, skip_dict=0.1)
+    attempt: int = field(0, skip_repr=0, skip_dict=0)
+    last_error: str = field('', repr=False, skip_dict='')
+    retry_run: datetime.datetime = datetime_property('retry_run', allow_none=True, required=False, repr=False,
+                                                     skip_dict=None)
+    misfire_grace_time: float = field(1.0, skip_repr=1.0, skip_dict=1.0)
+    catch_up: str = field(CATCH_UP_ONCE, skip_repr=CATCH_UP_ONCE, skip_dict=CATCH_UP_ONCE)
+    max_catch_up: int = field(10, skip_repr=10, skip_dict=10)
+    catch_up_delay: float = field(0.0, skip_repr=0.0, skip_dict=0.0)
+    missed: int = field(0, repr=False, skip_dict=0)
+    timeout: float = field(None, skip_repr=None, skip_dict=None)
+    last_due: datetime.datetime = field(default=None, repr=False, dict=False, hash=False, compare=False)
+    catch_up_left: int = field(default=None, repr=False, dict=False, hash=False, compare=False)
+    last_catch_up: float = field(default=None, repr=False, dict=False, hash=False, compare=False)
+    last_jitter: float = field(default=0.0, repr=False, dict=False, hash=False, compare=False)
 
     logger: logging.Logger = field(default=logging.getLogger('asyncio'), repr=False, dict=False, hash=False, compare=False)
 
     @field_property(default=None)
     def next_run(self) -> Union[datetime.datetime, None]:
+        # A pending retry replaces the next run
+        if getattr(self, 'retry_run', None) is not None:
+            return self.retry_run
+
         # Check end on
-        now = datetime.datetime.now()
+        now = get_clock().now()
         if self.past_end(now):
             return None
 
@@ -130,7 +198,7 @@ class Schedule(DataClass):
     def run_in(self, now: datetime.datetime = None) -> Union[float, int]:
         """Return the number of seconds to wait until this should run."""
         if now is None:
-            now = datetime.datetime.now()
+            now = get_clock().now()
 
         next_run = self.next_run
         if next_run is None:
@@ -148,17 +216,70 @@ class Schedule(DataClass):
     def past_end(self, now: datetime.datetime = None) -> bool:
         """Return if this datetime is past the end_on datetime and should stop running"""
         if now is None:
-            now = datetime.datetime.now()
+            now = get_clock().now()
         return self.end_on and now >= self.end_on
 
+    def changed_settings(self, other: 'Schedule', now: datetime.datetime = None) -> list:
+        """Return the SETTING_KEYS that have a different value in the other schedule.
+
+        A start_on that already passed is not a change, because every Schedule made without a start_on starts now.
+        It is not compared after the first run either, because the runs follow the last run. The end_on of a run
+        once schedule that already ran is its last run, so it is not compared after the run.
+        """
+        values, other_values = vars(self), vars(other)
+        if get_settings(values) == get_settings(other_values):
+            return []  # Fast path for adding the same schedule again
+
+        if now is None:
+            now = get_clock().now()
+        started = values['_last_run'] is not None
+        changed = []
+        for key in SETTING_KEYS:
+            value, other_value = values[key], other_values[key]
+            if value == other_value:
+                continue
+            elif key == '_start_on' and (started or ((value is None or value <= now) and
+                                                     (other_value is None or other_value <= now))):
+                continue
+            elif key == '_end_on' and started and not values['repeat']:
+                continue
+            changed.append(key)
+        return changed
+
+    def update_settings(self, other: 'Schedule', keys: list = None) -> 'Schedule':
+        """Copy the settings of the other schedule and keep the state of the runs.
+
+        If a timing value changed the next run is made again from the new values.
+
+        Args:
+            other (Schedule): Schedule to copy the settings from.
+            keys (list)[None]: Setting keys to copy. If None copy the changed_settings().
+        """
+        if keys is None:
+            keys = self.changed_settings(other)
+        values, other_values = vars(self), vars(other)
+        for key in keys:
+            values[key] = other_values[key]
+        if any(key in TIMING_KEYS for key in keys):
+            self._next_run = None
+        return self
+
     def wait(self, now: datetime.datetime = None) -> 'Schedule':
         """Wait until it is time to run."""
         time.sleep(self.run_in(now))
+        time.sleep(self.get_catch_up_wait())
         return self
 
     async def wait_async(self, now: datetime.datetime = None) -> 'Schedule':
         """Asynchronous Wait until it is time to run."""
-        await asyncio.sleep(self.run_in(now))
+        if self.spin > 0:
+            self.last_jitter = await sleep_precise(self.run_in(now), self.spin)
+        else:
+            await asyncio.sleep(self.run_in(now))
+
+        delay = self.get_catch_up_wait()
+        if delay > 0:
+            await asyncio.sleep(delay)
         return self
 
     def __await__(self) -> 'Schedule':
@@ -167,10 +288,21 @@ class Schedule(DataClass):
 
     def reschedule(self, now: datetime.datetime = None) -> 'Schedule':
         """Reset to get the next run time."""
+        due = self.next_run  # Time this run was due to measure how late it is
         if now is None:
-            now = datetime.datetime.now()
+            now = get_clock().now()
+            if self.catch_up_left is not None and due is not None:
+                now = due  # Catching up runs every missed run time
+            elif (self.spin > 0 and due is not None and self.interval > datetime.timedelta(0) and
+                  now - due > -self.interval):
+                # Fixed rate so precise schedules do not drift by the time it takes to wake up. A wake up later
+                # than the interval skips the missed ticks and keeps the phase instead of running a burst.
+                skipped = max((now - due) // self.interval, 0)
+                self.missed += skipped
+                now = due + self.interval * skipped
 
         # Setup the run times
+        self.last_due = due
         self.last_run = now
         self.next_run = None
         if not self.repeat:
@@ -181,41 +313,157 @@ class Schedule(DataClass):
         """Reset to get the next run time."""
         return self.reschedule(now)
 
+    def start_run(self, now: datetime.datetime = None) -> 'Schedule':
+        """Reschedule for the run that is starting. A retry keeps the last run so the regular runs keep their time."""
+        if self.retry_run is not None:
+            self.last_due = self.retry_run
+            if getattr(self, '_next_run', None) == self.retry_run:
+                self._next_run = None  # next_run was saved with the retry time
+            self.retry_run = None
+            return self
+        return self.reschedule(now)
+
+    def count_missed(self, now: datetime.datetime = None) -> Tuple[int, Optional[datetime.datetime]]:
+        """Return the number of run times that passed since the next run (including it) and the latest of them."""
+        if now is None:
+            now = get_clock().now()
+        due = self.next_run
+        if due is None or due > now:
+            return 0, None
+        interval = self.interval
+        if not self.repeat or interval <= datetime.timedelta(0):
+            return 1, due
+
+        if self.at is None and len(self.allowed_weekdays()) == 7:
+            count = (now - due) // interval + 1  # Fast path so long outages with short intervals are not stepped
+            return count, due + interval * (count - 1)
+
+        count, latest = 1, due
+        while True:
+            dt = self.get_run_after(latest)
+            if dt is None or dt > now:
+                return count, latest
+            count, latest = count + 1, dt
+
+    def skip_missed(self, now: datetime.datetime = None) -> bool:
+        """Apply the catch up policy if the run is later than the misfire grace time. Return True to skip the run."""
+        if now is None:
+            now = get_clock().now()
+        due = self.next_run
+        if (self.retry_run is not None or due is None or self.misfire_grace_time is None or
+                (now - due).total_seconds() <= self.misfire_grace_time or self.catch_up == CATCH_UP_ONCE):
+            self.catch_up_left = None
+            return False
+
+        if self.catch_up == CATCH_UP_ALL:
+            if self.catch_up_left is None:
+                self.catch_up_left = self.max_catch_up
+            if self.catch_up_left > 0:
+                self.catch_up_left -= 1
+                self.last_catch_up = get_clock().monotonic()
+                return False
+
+        # Skip every missed run and continue from the latest of them
+        count, latest = self.count_missed(now)
+        self.catch_up_left = None
+        self.missed += count
+        self.reschedule(latest)
+        self.logger.warning(f'Task "{get_task_name()}" skipped {count} missed runs since {due}')
+        return True
+
+    def get_catch_up_wait(self) -> float:
+        """Return the seconds to wait before the next run while catching up on missed runs."""
+        if self.catch_up_left is None or self.last_catch_up is None or self.catch_up_delay <= 0:
+            return 0
+        return max(self.last_catch_up + self.catch_up_delay - get_clock().monotonic(), 0)
+
+    def will_retry(self) -> bool:
+        """Return if the run that is failing will be retried."""
+        return self.attempt < self.retries
+
+    def get_retry_delay(self, attempt: int = None) -> float:
+        """Return the seconds to wait before the retry with exponential backoff and jitter."""
+        if attempt is None:
+            attempt = self.attempt
+        delay = min(self.retry_delay * self.retry_backoff ** max(attempt - 1, 0), self.retry_max_delay)
+        if self.retry_jitter:
+            delay *= 1 + random.uniform(-self.retry_jitter, self.retry_jitter)
+        return max(delay, 0)
+
+    def run_failed(self, err: BaseException, now: datetime.datetime = None) -> 'Schedule':
+        """Save the error and set the retry run if the run can be retried."""
+        if now is None:
+            now = get_clock().now()
+        self.last_error = str(err)
+        if self.will_retry():
+            self.attempt += 1
+            self.retry_run = now + datetime.timedelta(seconds=self.get_retry_delay())
+            self.logger.warning(f'Retry {self.attempt} of {self.retries} for Task "{get_task_name()}" '
+                                f'at {self.retry_run}')
+        else:
+            self.attempt = 0
+        return self
+
+    def retry_later(self, now: datetime.datetime = None) -> 'Schedule':
+        """Set the retry run again for a retry that was dropped before it ran. The attempt is not counted."""
+        if now is None:
+            now = get_clock().now()
+        if self.attempt > 0:
+            self.retry_run = now + datetime.timedelta(seconds=self.get_retry_delay())
+        return self
+
+    def run_succeeded(self) -> 'Schedule':
+        """Reset the retry state after a successful run."""
+        self.attempt = 0
+        return self
+
     def call(self, callback: Callable = None, *args, **kwargs) -> object:
         """Wait for the schedule and run the callback"""
         self.wait()
-        self.reschedule()
+        if self.skip_missed():
+            return None
+        self.start_run()
 
-        task = asyncio.Task.current_task().get_name()
-        self.logger.info(f'Running Task "{task}" with {self}')
+        if self.logger.isEnabledFor(logging.INFO):  # Formatting the schedule is slow for short intervals
+            self.logger.info(f'Running Task "{get_task_name()}" with {self}')
 
         try:
-            return call(callback, *args, **kwargs)
+            with RunContext(get_task_name(), self.last_due):
+                result = call(callback, *args, **kwargs)
+            self.run_succeeded()
+            return result
         except Exception as err:
-            self.logger.critical(f'Error in Task "{task}": {err}')
+            self.logger.critical(f'Error in Task "{get_task_name()}": {err}')
+            self.run_failed(err)
 
     async def call_async(self, callback: Callable[..., Awaitable[None]] = None, *args, **kwargs) -> object:
         """Run the set callback and setup repeat if set."""
         await self.wait_async()
-        await self.reschedule_async()
+        if self.skip_missed():
+            return None
+        self.start_run()
 
-        task = asyncio.Task.current_task().get_name()
-        self.logger.info(f'Running Task "{task}" with {self}')
+        if self.logger.isEnabledFor(logging.INFO):  # Formatting the schedule is slow for short intervals
+            self.logger.info(f'Running Task "{get_task_name()}" with {self}')
 
         try:
-            return await call_async(callback, *args, **kwargs)
+            with RunContext(get_task_name(), self.last_due):
+                result = await call_timeout(call_async(callback, *args, **kwargs), self.timeout, get_task_name())
+            self.run_succeeded()
+            return result
         except Exception as err:
-            self.logger.critical(f'Error in Task "{task}": {err}')
+            self.logger.critical(f'Error in Task "{get_task_name()}": {err}')
+            self.run_failed(err)
 
     def run(self, callback: Callable = None, *args, **kwargs) -> 'Schedule':
         """Loop until and call this function until the schedule ends."""
-        while not self.past_end():
+        while self.retry_run is not None or not self.past_end():
             self.call(callback, *args, **kwargs)
         return self
 
     async def run_async(self, callback: Callable[..., Awaitable[None]] = None, *args, **kwargs) -> 'Schedule':
         """Generator to keep running this schedule repeatedly."""
-        while not self.past_end():
+        while self.retry_run is not None or not self.past_end():
             await self.call_async(callback, *args, **kwargs)
         return self
 
@@ -240,7 +488,7 @@ class Schedule(DataClass):
     def make_at(self, dt: Union[datetime.datetime, datetime.timedelta]) -> datetime.datetime:
         """Make the given datetime run at the set "at" time if the "at" time was set."""
         if isinstance(dt, datetime.timedelta):
-            today = datetime.datetime.today()
+            today = get_clock().now()
             return datetime.datetime(year=today.year, month=today.month, day=today.day,
                             hour=0, minute=0, second=0, microsecond=0) + dt
         else:
@@ -250,7 +498,14 @@ class Schedule(DataClass):
 
     def create_run_time(self) -> Union[datetime.datetime, None]:
         """Make the next_run datetime."""
-        from_dt = self.last_run or self.start_on or datetime.datetime.now()
+        from_dt = self.last_run or self.start_on or get_clock().now()
+        dt = self.get_run_after(from_dt)
+        if dt is None:
+            self.end_on = from_dt  # No weekdays for this interval are allowed
+        return dt
+
+    def get_run_after(self, from_dt: datetime.datetime) -> Union[datetime.datetime, None]:
+        """Return the run time that follows the given run time or None if no weekday is allowed."""
         dt = from_dt
 
         # Increment the interval and make at time
@@ -268,7 +523,6 @@ class Schedule(DataClass):
 
             i += 1
             if i > 7:
-                self.end_on = from_dt  # No weekdays for this interval are allowed
                 return None
 
         return dt
@@ -277,12 +531,12 @@ class Schedule(DataClass):
         """Stop running all tasks associated with this schedule"""
         if loop is None:
             loop = get_loop()
-        self.end_on = datetime.datetime.now()
+        self.end_on = get_clock().now()
         try:
             # Assume only one task runs this schedule or stop cancels all tasks with this schedule.
             for task in asyncio.all_tasks(loop):
                 try:
-                    if inspect.getcoroutinelocals(task.get_coro())['self'] == self:
+                    if inspect.getcoroutinelocals(task.get_coro()).get('self') is self:
                         task.cancel()
                 except:
                     pass
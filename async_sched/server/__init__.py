@@ -1,3 +1,17 @@
-from .messages import Message, Error, Quit, Update, RunCommand, ScheduleCommand, \
-    RunningSchedule, ListSchedules, StopSchedule
+from .messages import Message, Error, Busy, Quit, Ping, Update, RunCommand, ScheduleCommand, \
+    RunningSchedule, ListSchedules, StopSchedule, JobStatus, JobResult, CancelJob, Subscribe, Event, \
+    CallbackProfile, Profile, Stats, RunRecord, GetHistory, Auth
+from .jobs import Job, JobManager
+from .events import Subscriber, EventBus
+from .profiler import CallbackStats, Profiler
+from .lag import LagMonitor
+from .priority import PriorityGate, LatenessStats
+from .batch import Batcher
+from .cache import ResultCache
+from .dag import DependencyGraph
+from .ratelimit import TokenBucket
+from .history import RunHistory
+from .snapshot import write_snapshot, read_snapshot
+from .manifest import parse_manifest, read_manifest, diff_manifest
+from .security import AuthenticationError, SessionContext, make_server_context, make_client_context
 from .srv import get_server, set_server, start_server, Scheduler
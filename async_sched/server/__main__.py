@@ -6,6 +6,7 @@ python -m async_sched.server --path "./schedules/"
 """
 import argparse
 from async_sched.server.srv import start_server
+from async_sched.server.security import make_server_context, get_default_token
 from async_sched.utils import DEFAULT_HOST, DEFAULT_PORT
 
 
@@ -15,8 +16,9 @@ __all__ = ['NAME', 'get_argparse', 'main']
 NAME = 'run'
 
 
-def get_argparse(update_path: str = None, set_env: bool = False,
-                 host=DEFAULT_HOST, port=DEFAULT_PORT, parent_parser=None):
+def get_argparse(update_path: str = None, set_env: bool = False, state_path: str = None, drain_timeout: float = 30,
+                 history_size: int = 100, manifest_path: str = None, certfile: str = None, keyfile: str = None,
+                 cafile: str = None, host=DEFAULT_HOST, port=DEFAULT_PORT, parent_parser=None):
     if parent_parser is None:
         p = argparse.ArgumentParser(description='Update the server command modules.')
     else:
@@ -26,18 +28,40 @@ def get_argparse(update_path: str = None, set_env: bool = False,
                    help='Command path that "update" imports files from.')
     p.add_argument('--set_env', default=set_env, type=bool,
                    help='Set this address as the environment variable.')
-
-    p.add_argument('--host', type=str, default=host)
+    p.add_argument('--state_path', default=state_path, type=str,
+                   help='JSON file that keeps the last run of every schedule between restarts.')
+    p.add_argument('--drain_timeout', default=drain_timeout, type=float,
+                   help='Seconds to wait for the running callbacks on Quit or SIGTERM.')
+    p.add_argument('--history_size', default=history_size, type=int,
+                   help='Number of recent runs kept for every schedule.')
+    p.add_argument('--manifest_path', default=manifest_path, type=str,
+                   help='JSON, TOML or YAML file of schedules to load. "update" reloads the changed schedules.')
+    p.add_argument('--certfile', default=certfile, type=str,
+                   help='PEM certificate chain to serve TLS with. Set ASYNC_SCHED_TOKEN to require signed messages.')
+    p.add_argument('--keyfile', default=keyfile, type=str, help='PEM private key if it is not in the certfile.')
+    p.add_argument('--cafile', default=cafile, type=str,
+                   help='Only accept TLS clients with a certificate signed by these CAs.')
+
+    p.add_argument('--host', type=str, default=host, help='Server ip address or "unix:///path/to/file.sock".')
     p.add_argument('--port', type=int, default=port)
 
     return p
 
 
-def main(update_path: str = None, set_env: bool = False, host=DEFAULT_HOST, port=DEFAULT_PORT, **kwargs):
+def main(update_path: str = None, set_env: bool = False, state_path: str = None, drain_timeout: float = 30,
+         history_size: int = 100, manifest_path: str = None, certfile: str = None, keyfile: str = None,
+         cafile: str = None, host=DEFAULT_HOST, port=DEFAULT_PORT, **kwargs):
     # import logging
     # logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    srv = start_server((host, port), update_path=update_path, global_server=True, set_env=set_env)
+    srv = start_server((host, port), update_path=update_path, global_server=True, set_env=set_env,
+                       state_path=state_path, drain_timeout=drain_timeout,
+                       history_size=history_size, manifest_path=manifest_path, auth_token=get_default_token(),
+                       ssl_context=make_server_context(certfile, keyfile, cafile) if certfile else None)
+    try:
+        srv.add_signal_handlers()
+    except NotImplementedError:
+        pass  # Windows event loops do not support signal handlers
     srv.run_forever()
 
 
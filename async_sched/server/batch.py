@@ -0,0 +1,91 @@
+import asyncio
+from typing import Callable, Awaitable
+
+from ..utils import get_loop, call_async
+
+
+__all__ = ['Batcher']
+
+
+class Batcher(object):
+    """Group the calls of one callback that happen within a small window into one call.
+
+    The callback receives a list of (args, kwargs) tuples. If it returns a list or tuple with one item for every
+    call, each caller gets its own item. Otherwise every caller gets the whole return value. If the callback raises
+    an error every caller gets the error.
+
+    Args:
+        callback (callable/awaitable): Function that receives the list of (args, kwargs).
+        window (float)[0.01]: Seconds to wait for more calls after the first call of a batch.
+        max_size (int)[None]: Call the callback right away when this many calls are waiting.
+        runner (callable)[None]: Coroutine function called as runner(callback, items) to run the callback.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run with if None use the running loop.
+    """
+    def __init__(self, callback: Callable[..., Awaitable[None]], window: float = 0.01, max_size: int = None,
+                 runner: Callable[..., Awaitable[None]] = None, loop: asyncio.AbstractEventLoop = None):
+        self.callback = callback
+        self.window = window
+        self.max_size = max_size
+        self.runner = runner or call_async
+        self._loop = loop
+
+        self.items = []
+        self.futures = []
+        self._handle = None
+        self.calls = 0  # Number of times the callback was called
+        self.submitted = 0  # Number of calls that were grouped into the batches
+
+    @property
+    def loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is not None:
+            return self._loop
+        return get_loop()
+
+    @loop.setter
+    def loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    async def submit(self, *args, **kwargs):
+        """Add one call to the batch and return its result when the batch ran."""
+        fut = self.loop.create_future()
+        self.items.append((args, kwargs))
+        self.futures.append(fut)
+        self.submitted += 1
+
+        if self.max_size is not None and len(self.items) >= self.max_size:
+            self.flush()
+        elif self._handle is None:
+            self._handle = self.loop.call_later(self.window, self.flush)
+        return await fut
+
+    def flush(self):
+        """Run the callback with the waiting calls."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self.items:
+            return
+
+        items, futures = self.items, self.futures
+        self.items, self.futures = [], []
+        self.calls += 1
+        self.loop.create_task(self.run_batch(items, futures), name='batch')
+
+    async def run_batch(self, items: list, futures: list):
+        """Call the callback and give every caller its result."""
+        try:
+            result = await self.runner(self.callback, items)
+        except Exception as err:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(err)
+            return
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+
+        split = isinstance(result, (list, tuple)) and len(result) == len(futures)
+        for i, fut in enumerate(futures):
+            if not fut.done():
+                fut.set_result(result[i] if split else result)
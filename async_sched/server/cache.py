@@ -0,0 +1,117 @@
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Awaitable, Union
+
+from serial_json import dumps
+
+from ..utils import get_loop, get_clock
+
+
+__all__ = ['make_cache_key', 'ResultCache']
+
+
+def make_cache_key(args: tuple = (), kwargs: dict = None) -> Union[str, None]:
+    """Return the serialized arguments to use as a cache key or None if the arguments cannot be serialized."""
+    try:
+        return dumps([list(args), sorted((kwargs or {}).items())])
+    except (TypeError, ValueError, Exception):
+        return None
+
+
+class ResultCache(object):
+    """Cache the results of one callback by its arguments with a time to live and a least recently used bound.
+
+    Identical calls that happen while the first call is still running share the first call (single flight). The
+    shared call runs in its own task, so a caller that disconnects does not cancel it for the other callers. When
+    the last caller times out or is cancelled the shared call is cancelled too, so a call that hangs is not shared
+    with the later callers. Errors are not cached.
+
+    Args:
+        ttl (float)[60]: Seconds a result is reused. None keeps results until they are the least recently used.
+        max_size (int)[128]: Maximum number of results to keep.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run with if None use the running loop.
+    """
+    def __init__(self, ttl: float = 60, max_size: int = 128, loop: asyncio.AbstractEventLoop = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._loop = loop
+
+        self.results = OrderedDict()  # {key: (expires, result)}
+        self.in_flight = {}  # {key: asyncio.Task}
+        self.waiters = {}  # {asyncio.Task: number of callers awaiting the task}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    @property
+    def loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is not None:
+            return self._loop
+        return get_loop()
+
+    @loop.setter
+    def loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    async def call(self, key: Union[str, None], make_coro: Callable[[], Awaitable]):
+        """Return the cached result for the key or await make_coro() once for all callers with the same key.
+
+        Args:
+            key (str): Cache key from make_cache_key. If None the call is not cached.
+            make_coro (callable): Function that returns the awaitable to run when the result is not cached.
+        """
+        if key is None:
+            return await make_coro()
+
+        try:
+            expires, result = self.results[key]
+            if expires is None or expires > get_clock().monotonic():
+                self.results.move_to_end(key)
+                self.hits += 1
+                return result
+            del self.results[key]
+        except KeyError:
+            pass
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            task = self.in_flight[key] = self.loop.create_task(make_coro(), name='cached call')
+            task.add_done_callback(lambda t: self.save(key, t))
+
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.waiters[task] == 1:
+                self.cancel(key, task)
+            raise
+        finally:
+            self.waiters[task] -= 1
+            if not self.waiters[task]:
+                del self.waiters[task]
+
+    def cancel(self, key: str, task: 'asyncio.Task'):
+        """Cancel the shared call that nobody waits for, so the next caller with the key starts a new call."""
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        task.cancel()
+
+    def save(self, key: str, task: 'asyncio.Task'):
+        """Save the result of the finished task."""
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        expires = None if self.ttl is None else get_clock().monotonic() + self.ttl
+        self.results[key] = (expires, task.result())
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        """Remove all of the cached results."""
+        self.results.clear()
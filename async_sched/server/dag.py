@@ -0,0 +1,100 @@
+import asyncio
+from typing import Iterable, Callable
+
+from .priority import PriorityGate
+
+
+__all__ = ['DependencyGraph']
+
+
+class DependencyGraph(object):
+    """Dependencies between schedules. A dependent schedule runs when all of the schedules it runs after succeeded.
+
+    Every upstream schedule has to succeed once since the last run of the dependent schedule before it runs again.
+    When an upstream schedule fails (after its retries) every schedule downstream of it is told about the failure
+    and has to wait for all of its upstream schedules to succeed again.
+
+    Args:
+        max_concurrent (int)[None]: Maximum number of dependent schedules running at the same time.
+        on_failed (callable)[None]: Function called as on_failed(name, error) for each downstream schedule of a
+            failed schedule.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run with if None use the running loop.
+    """
+    def __init__(self, max_concurrent: int = None, on_failed: Callable[[str, str], None] = None,
+                 loop: asyncio.AbstractEventLoop = None):
+        self.upstream = {}  # {name: set(names it runs after)}
+        self.downstream = {}  # {name: set(names that run after it)}
+        self.done = {}  # {name: set(upstream names that succeeded since its last run)}
+        self.ready = {}  # {name: asyncio.Event}
+        self.on_failed = on_failed
+        self.gate = PriorityGate(max_concurrent=max_concurrent, loop=loop)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.upstream
+
+    def get_after(self, name: str) -> list:
+        """Return the sorted names the schedule runs after."""
+        return sorted(self.upstream.get(name, ()))
+
+    def check(self, name: str, after: Iterable[str]):
+        """Raise a ValueError if the schedule running after the given names would make a cycle."""
+        stack = list(after)
+        seen = set()
+        while stack:
+            item = stack.pop()
+            if item == name:
+                raise ValueError(f'Schedule "{name}" cannot run after {sorted(after)}! The dependencies make a cycle.')
+            if item not in seen:
+                seen.add(item)
+                stack.extend(self.upstream.get(item, ()))
+
+    def add(self, name: str, after: Iterable[str]):
+        """Make the schedule run after the given schedules."""
+        after = set(after)
+        self.check(name, after)
+        self.remove(name)
+        self.upstream[name] = after
+        self.done[name] = set()
+        self.ready[name] = asyncio.Event()
+        for item in after:
+            self.downstream.setdefault(item, set()).add(name)
+
+    def remove(self, name: str):
+        """Remove the dependencies of the schedule. Schedules that run after it keep waiting for it."""
+        for item in self.upstream.pop(name, ()):
+            names = self.downstream.get(item)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.downstream[item]
+        self.done.pop(name, None)
+        self.ready.pop(name, None)
+
+    async def wait_ready(self, name: str):
+        """Wait until all of the upstream schedules succeeded."""
+        ready = self.ready[name]
+        await ready.wait()
+        ready.clear()
+
+    def succeeded(self, name: str):
+        """Mark the schedule as succeeded and trigger the downstream schedules that are ready."""
+        for item in self.downstream.get(name, ()):
+            done = self.done[item]
+            done.add(name)
+            if done >= self.upstream[item]:
+                done.clear()
+                self.ready[item].set()
+
+    def failed(self, name: str, error: str = ''):
+        """Tell every schedule downstream of the failed schedule that it cannot run with the current inputs."""
+        stack = list(self.downstream.get(name, ()))
+        seen = set()
+        while stack:
+            item = stack.pop()
+            if item in seen:
+                continue
+            seen.add(item)
+            self.done[item].clear()
+            if self.on_failed is not None:
+                self.on_failed(item, f'Upstream "{name}" failed: {error}')
+            stack.extend(self.downstream.get(item, ()))
@@ -0,0 +1,114 @@
+import asyncio
+from collections import deque
+from typing import Iterable
+
+from ..utils import get_clock
+from .messages import Event
+
+
+__all__ = ['FIRED', 'FINISHED', 'FAILED', 'ADDED', 'REMOVED', 'EVENT_TYPES', 'Subscriber', 'EventBus']
+
+
+FIRED = 'fired'
+FINISHED = 'finished'
+FAILED = 'failed'
+ADDED = 'added'
+REMOVED = 'removed'
+EVENT_TYPES = (FIRED, FINISHED, FAILED, ADDED, REMOVED)
+
+
+class Subscriber(object):
+    """Bounded queue of events for one subscribed connection.
+
+    When the queue is full a new event is coalesced into a waiting event with the same type and name (its count is
+    increased). If there is no matching event the oldest event is dropped. The number of dropped events is reported
+    on the next event that is sent.
+
+    Args:
+        names (list)[None]: Only receive events for these names. If empty receive events for all names.
+        prefix (str)['']: Only receive events for names that start with this prefix.
+        events (list)[None]: Only receive these event types. If empty receive all event types.
+        max_queue (int)[1000]: Maximum number of events waiting to be sent.
+    """
+    def __init__(self, names: Iterable[str] = None, prefix: str = '', events: Iterable[str] = None,
+                 max_queue: int = 1000):
+        self.names = set(names or ())
+        self.prefix = prefix
+        self.events = set(events or ())
+        self.max_queue = max(max_queue, 1)
+
+        self.queue = deque()
+        self.pending = {}  # {(event, name): Event} for the events waiting in the queue
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def matches(self, event: str, name: str) -> bool:
+        """Return if this subscriber wants the event."""
+        return ((not self.events or event in self.events) and
+                (not self.names or name in self.names) and
+                (not self.prefix or name.startswith(self.prefix)))
+
+    def put(self, msg: Event):
+        """Add the event without blocking. Coalesce or drop events if the queue is full."""
+        key = (msg.event, msg.name)
+        if len(self.queue) >= self.max_queue:
+            waiting = self.pending.get(key)
+            if waiting is not None:
+                waiting.count += msg.count
+                waiting.time = msg.time
+                waiting.error = msg.error or waiting.error
+                return
+
+            old = self.queue.popleft()
+            if self.pending.get((old.event, old.name)) is old:
+                del self.pending[(old.event, old.name)]
+            self.dropped += old.count
+
+        self.queue.append(msg)
+        self.pending[key] = msg
+        self.ready.set()
+
+    async def get(self) -> Event:
+        """Wait for and return the next event."""
+        while not self.queue:
+            self.ready.clear()
+            await self.ready.wait()
+
+        msg = self.queue.popleft()
+        key = (msg.event, msg.name)
+        if self.pending.get(key) is msg:
+            del self.pending[key]
+        if self.dropped:
+            msg.dropped = self.dropped
+            self.dropped = 0
+        return msg
+
+
+class EventBus(object):
+    """Publish scheduler events to the subscribed connections."""
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, names: Iterable[str] = None, prefix: str = '', events: Iterable[str] = None,
+                  max_queue: int = 1000) -> Subscriber:
+        """Create and return a new subscriber."""
+        sub = Subscriber(names=names, prefix=prefix, events=events, max_queue=max_queue)
+        self.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        """Stop sending events to the subscriber."""
+        try:
+            self.subscribers.remove(sub)
+        except ValueError:
+            pass
+
+    def publish(self, event: str, name: str, error: str = '', job_id: str = ''):
+        """Send an event to every subscriber that wants it."""
+        if not self.subscribers:
+            return
+
+        now = get_clock().now()
+        for sub in self.subscribers:
+            if sub.matches(event, name):
+                sub.put(Event(event=event, name=name, time=now, error=error, job_id=job_id))
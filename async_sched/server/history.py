@@ -0,0 +1,84 @@
+import datetime
+from array import array
+
+from .messages import RunRecord
+
+
+__all__ = ['SUCCEEDED', 'FAILED', 'TIMEOUT', 'CANCELLED', 'SKIPPED', 'DROPPED', 'OUTCOMES', 'RunHistory']
+
+
+# Run outcomes. The index in OUTCOMES is the code that is stored.
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+CANCELLED = 'cancelled'
+SKIPPED = 'skipped'  # Shed while the event loop was overloaded
+DROPPED = 'dropped'  # Dropped by the callback's rate limit
+OUTCOMES = (SUCCEEDED, FAILED, TIMEOUT, CANCELLED, SKIPPED, DROPPED)
+
+
+class RunHistory(object):
+    """Fixed size ring buffer of the most recent runs of one schedule.
+
+    The runs are kept in preallocated arrays instead of objects, so every schedule takes the same memory no matter
+    how often it runs. One run is ENTRY_BYTES bytes: the start time as a float64 timestamp, the lateness and duration
+    as float32 seconds and the outcome as one byte. With the array headers a schedule keeping 100 runs uses about
+    2.1 KB, so 100,000 schedules use about 210 MB.
+
+    Args:
+        size (int)[100]: Number of runs to keep.
+    """
+    __slots__ = ('size', 'count', 'started', 'lateness', 'duration', 'outcome')
+
+    ENTRY_BYTES = 17
+
+    def __init__(self, size: int = 100):
+        self.size = max(size, 1)
+        self.count = 0  # Total number of runs recorded
+        self.started = array('d', [0.0]) * self.size
+        self.lateness = array('f', [0.0]) * self.size
+        self.duration = array('f', [0.0]) * self.size
+        self.outcome = array('B', [0]) * self.size
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the bytes used by the arrays."""
+        return self.size * self.ENTRY_BYTES
+
+    def record(self, started: float, lateness: float, duration: float, outcome: str = SUCCEEDED):
+        """Save one run, overwriting the oldest run when the buffer is full.
+
+        Args:
+            started (float): time.time() when the run started.
+            lateness (float): Seconds the run started after it was planned.
+            duration (float): Seconds the run took.
+            outcome (str)['succeeded']: One of OUTCOMES.
+        """
+        i = self.count % self.size
+        self.started[i] = started
+        self.lateness[i] = lateness
+        self.duration[i] = duration
+        self.outcome[i] = OUTCOMES.index(outcome)
+        self.count += 1
+
+    def runs(self, limit: int = None) -> list:
+        """Return up to limit RunRecord messages, newest first. None or 0 returns every kept run."""
+        n = len(self)
+        if limit:
+            n = min(n, limit)
+
+        runs = []
+        for j in range(1, n + 1):
+            i = (self.count - j) % self.size
+            started = self.started[i]
+            runs.append(RunRecord(planned=datetime.datetime.fromtimestamp(started - self.lateness[i]),
+                                  started=datetime.datetime.fromtimestamp(started),
+                                  duration=self.duration[i], outcome=OUTCOMES[self.outcome[i]]))
+        return runs
+
+    def clear(self):
+        """Forget every run."""
+        self.count = 0
@@ -0,0 +1,127 @@
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Union
+
+from ..utils import get_loop, get_clock, print_exception
+from .events import FIRED, FINISHED, FAILED, EventBus
+
+
+__all__ = ['RUNNING', 'FINISHED', 'FAILED', 'CANCELLED', 'UNKNOWN', 'Job', 'JobManager']
+
+
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+UNKNOWN = 'unknown'
+
+
+class Job(object):
+    """Background command that was started with RunCommand(background=True)."""
+    def __init__(self, job_id: str, callback_name: str = '', task: 'asyncio.Task' = None):
+        self.job_id = job_id
+        self.callback_name = callback_name
+        self.task = task
+        self.status = RUNNING
+        self.result = None
+        self.error = ''
+        self.started = get_clock().now()
+        self.finished = None
+
+    def done(self) -> bool:
+        """Return if the job is no longer running."""
+        return self.status != RUNNING
+
+
+class JobManager(object):
+    """Run commands as background tasks and keep their results in a bounded least recently used cache.
+
+    Args:
+        max_results (int)[1000]: Maximum number of finished jobs to remember.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to create the tasks on. If None use the running loop.
+        events (EventBus)[None]: Publish fired, finished and failed events for the jobs.
+    """
+    def __init__(self, max_results: int = 1000, loop: asyncio.AbstractEventLoop = None, events: EventBus = None):
+        self.max_results = max_results
+        self._loop = loop
+        self.events = events
+
+        self.running = {}
+        self.results = OrderedDict()
+
+    @property
+    def loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is not None:
+            return self._loop
+        return get_loop()
+
+    @loop.setter
+    def loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def start(self, coro: Awaitable, callback_name: str = '') -> Job:
+        """Start running the coroutine as a background job and return the job."""
+        job = Job(uuid.uuid4().hex, callback_name)
+        job.task = self.loop.create_task(coro, name=f'job {job.job_id}')
+        job.task.add_done_callback(lambda task: self.finish(job))
+        self.running[job.job_id] = job
+        if self.events is not None:
+            self.events.publish(FIRED, callback_name, job_id=job.job_id)
+        return job
+
+    def finish(self, job: Job):
+        """Save the result or error of the finished job task and move the job to the results cache."""
+        if job.task.cancelled():
+            job.status = CANCELLED
+        elif job.task.exception() is not None:
+            err = job.task.exception()
+            print_exception(err, msg='Error in job {} "{}"'.format(job.job_id, job.callback_name))
+            job.status = FAILED
+            job.error = str(err)
+        else:
+            job.result = job.task.result()
+            job.status = FINISHED
+        job.finished = get_clock().now()
+        if self.events is not None and job.status == FINISHED:
+            self.events.publish(FINISHED, job.callback_name, job_id=job.job_id)
+        elif self.events is not None:
+            self.events.publish(FAILED, job.callback_name, error=job.error or job.status, job_id=job.job_id)
+
+        self.running.pop(job.job_id, None)
+        self.results[job.job_id] = job
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+    def get(self, job_id: str) -> Union[Job, None]:
+        """Return the job for the id or None if it is unknown."""
+        try:
+            return self.running[job_id]
+        except KeyError:
+            pass
+        try:
+            self.results.move_to_end(job_id)
+            return self.results[job_id]
+        except KeyError:
+            return None
+
+    async def wait(self, job_id: str, timeout: float = None) -> Union[Job, None]:
+        """Wait for the job to finish and return it. The job is returned still running if the timeout passed."""
+        job = self.get(job_id)
+        if job is not None and not job.done():
+            await asyncio.wait([job.task], timeout=timeout)
+            await asyncio.sleep(0)  # Let the done callback save the result
+        return job
+
+    async def cancel(self, job_id: str) -> Union[Job, None]:
+        """Cancel a running job and return it after the job task has ended."""
+        job = self.get(job_id)
+        if job is not None and not job.done():
+            job.task.cancel()
+            await self.wait(job_id)
+        return job
+
+    def cancel_all(self):
+        """Cancel all of the running jobs."""
+        for job in list(self.running.values()):
+            job.task.cancel()
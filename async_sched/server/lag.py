@@ -0,0 +1,138 @@
+import asyncio
+import logging
+
+from ..utils import get_loop
+
+
+__all__ = ['OK', 'WARN', 'SHED', 'BUSY', 'LEVELS', 'SHED_NONE', 'SHED_DEFER', 'SHED_SKIP', 'SHED_POLICIES',
+           'LagMonitor']
+
+
+# Lag levels from least to most overloaded
+OK = 'ok'
+WARN = 'warn'
+SHED = 'shed'
+BUSY = 'busy'
+LEVELS = (OK, WARN, SHED, BUSY)
+
+# Schedule.shed policies
+SHED_NONE = 'none'  # Always run on time
+SHED_DEFER = 'defer'  # Wait until the lag clears, missed runs are coalesced into one run
+SHED_SKIP = 'skip'  # Skip the run
+SHED_POLICIES = (SHED_NONE, SHED_DEFER, SHED_SKIP)
+
+
+class LagMonitor(object):
+    """Continuously measure how late the event loop wakes up a sleeping task.
+
+    The lag is smoothed so one late wake up does not flip the level back and forth. Above the shed threshold low
+    priority schedules are deferred or skipped. Above the busy threshold new schedules are rejected.
+
+    Args:
+        interval (float)[0.1]: Seconds between measurements.
+        warn_threshold (float)[0.1]: Lag in seconds that is logged as a warning.
+        shed_threshold (float)[0.5]: Lag in seconds to start shedding schedules.
+        busy_threshold (float)[1.0]: Lag in seconds to reject new schedules.
+        max_defer (float)[60]: Maximum seconds a deferred schedule waits for the lag to clear.
+        smoothing (float)[0.5]: Weight of the newest measurement (1 uses the newest measurement only).
+        logger (logging.Logger)[None]: Logger for the level changes.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to measure. If None use the running loop.
+    """
+    def __init__(self, interval: float = 0.1, warn_threshold: float = 0.1, shed_threshold: float = 0.5,
+                 busy_threshold: float = 1.0, max_defer: float = 60, smoothing: float = 0.5,
+                 logger: logging.Logger = None, loop: asyncio.AbstractEventLoop = None):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.shed_threshold = shed_threshold
+        self.busy_threshold = busy_threshold
+        self.max_defer = max_defer
+        self.smoothing = smoothing
+        self.logger = logger or logging.getLogger("asyncio")
+        self._loop = loop
+
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.level = OK
+        self.task = None
+        self._clear = None  # asyncio.Event set while the level is below shed. Created on the running loop.
+
+    @property
+    def loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is not None:
+            return self._loop
+        return get_loop()
+
+    @loop.setter
+    def loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    @property
+    def clear(self) -> asyncio.Event:
+        if self._clear is None:
+            self._clear = asyncio.Event()
+            if LEVELS.index(self.level) < LEVELS.index(SHED):
+                self._clear.set()
+        return self._clear
+
+    def get_level(self, lag: float) -> str:
+        """Return the level for the lag."""
+        if self.busy_threshold is not None and lag >= self.busy_threshold:
+            return BUSY
+        elif self.shed_threshold is not None and lag >= self.shed_threshold:
+            return SHED
+        elif self.warn_threshold is not None and lag >= self.warn_threshold:
+            return WARN
+        return OK
+
+    def update(self, sample: float):
+        """Add a lag measurement in seconds and change the level."""
+        self.lag = self.smoothing * sample + (1 - self.smoothing) * self.lag
+        self.max_lag = max(self.max_lag, sample)
+
+        level = self.get_level(self.lag)
+        if level != self.level:
+            if LEVELS.index(level) > LEVELS.index(self.level):
+                self.logger.warning(f'Event loop lag is {self.lag:.3f} s ({level})')
+            else:
+                self.logger.info(f'Event loop lag is {self.lag:.3f} s ({level})')
+            self.level = level
+
+        if self.is_shedding():
+            self.clear.clear()
+        else:
+            self.clear.set()
+
+    def is_shedding(self) -> bool:
+        """Return if low priority schedules should be shed."""
+        return self.level in (SHED, BUSY)
+
+    def is_busy(self) -> bool:
+        """Return if new schedules should be rejected."""
+        return self.level == BUSY
+
+    async def wait_clear(self) -> bool:
+        """Wait until the lag is below the shed threshold. Return False if max_defer passed first."""
+        try:
+            await asyncio.wait_for(self.clear.wait(), self.max_defer)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def run(self):
+        """Measure the lag forever."""
+        while True:
+            expected = self.loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.update(max(self.loop.time() - expected, 0))
+
+    def start(self) -> 'LagMonitor':
+        """Start measuring the lag in a task."""
+        if self.task is None or self.task.done():
+            self.task = self.loop.create_task(self.run(), name='lag_monitor')
+        return self
+
+    def stop(self):
+        """Stop measuring the lag."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,115 @@
+import os
+import json
+from typing import Tuple
+
+try:
+    import tomllib
+except (ImportError, Exception):
+    try:
+        import tomli as tomllib
+    except (ImportError, Exception):
+        tomllib = None
+
+try:
+    import yaml
+except (ImportError, Exception):
+    yaml = None
+
+from ..schedule import Schedule
+
+
+__all__ = ['ENTRY_KEYS', 'parse_manifest', 'read_manifest', 'diff_manifest', 'make_schedule']
+
+
+# Keys of a manifest entry that are not Schedule fields. Every other key of an entry is passed to the Schedule.
+ENTRY_KEYS = ('name', 'callback', 'args', 'kwargs', 'after', 'schedule')
+
+
+def parse_entry(name: str, item: dict) -> dict:
+    """Return the entry in the one form that the manifest diff compares."""
+    if not isinstance(item, dict):
+        raise ValueError(f'Manifest schedule "{name}" must be a table of values!')
+    if not item.get('callback'):
+        raise ValueError(f'Manifest schedule "{name}" does not have a callback!')
+
+    schedule = dict(item.get('schedule') or {})
+    schedule.update((key, value) for key, value in item.items() if key not in ENTRY_KEYS)
+    return {'callback': str(item['callback']),
+            'schedule': schedule,
+            'args': list(item.get('args') or []),
+            'kwargs': dict(item.get('kwargs') or {}),
+            'after': sorted(item.get('after') or [])}
+
+
+def parse_manifest(data: dict) -> dict:
+    """Return {name: entry} from the parsed manifest file.
+
+    The "schedules" value is a table of schedule name to entry or a list of entries with a "name". An entry has the
+    registered "callback" name and optional "args", "kwargs" and "after" values. The other values are the Schedule
+    fields either in a "schedule" table or next to the callback.
+
+    .. code-block:: toml
+
+        [schedules."Task 1"]
+        callback = "print_task1"
+        seconds = 15
+        repeat = true
+    """
+    schedules = (data or {}).get('schedules') or {}
+    if isinstance(schedules, dict):
+        items = schedules.items()
+    else:
+        items = []
+        for item in schedules:
+            if not isinstance(item, dict) or not item.get('name'):
+                raise ValueError('Every schedule in a manifest list must have a name!')
+            items.append((item['name'], item))
+
+    entries = {}
+    for name, item in items:
+        name = str(name)
+        if name in entries:
+            raise ValueError(f'Manifest schedule "{name}" is listed more than once!')
+        entries[name] = parse_entry(name, item)
+    return entries
+
+
+def read_manifest(path: str) -> dict:
+    """Read the JSON, TOML or YAML manifest file (by its extension) and return {name: entry}.
+
+    TOML files need Python 3.11 or the tomli library. YAML files need the PyYAML library.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.toml':
+        if tomllib is None:
+            raise ImportError('Reading a TOML manifest requires Python 3.11 or the tomli library!')
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    elif ext in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ImportError('Reading a YAML manifest requires the PyYAML library!')
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f)
+    else:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    return parse_manifest(data)
+
+
+def diff_manifest(old: dict, new: dict) -> Tuple[list, list, list, list]:
+    """Return the (added, changed, removed, unchanged) names between the old and new {name: entry}."""
+    added, changed, unchanged = [], [], []
+    for name, entry in new.items():
+        if name not in old:
+            added.append(name)
+        elif old[name] != entry:
+            changed.append(name)
+        else:
+            unchanged.append(name)
+    removed = [name for name in old if name not in new]
+    return added, changed, removed, unchanged
+
+
+def make_schedule(entry: dict) -> Schedule:
+    """Return a new Schedule from the values of the manifest entry."""
+    return Schedule(**entry['schedule'])
@@ -1,12 +1,18 @@
-from typing import List
+import datetime
+from typing import List, Any
 
 from serial_json import DataClass, field
 
 from ..schedule import Schedule
 
 
-__all__ = ['DataClass', 'Message', 'Error', 'Quit', 'Update', 'RunCommand', 'ScheduleCommand',
-           'RunningSchedule', 'ListSchedules', 'StopSchedule']
+__all__ = ['DataClass', 'Message', 'Error', 'Busy', 'Quit', 'Ping', 'Update', 'RunCommand', 'ScheduleCommand',
+           'RunningSchedule', 'ListSchedules', 'StopSchedule', 'JobStatus', 'JobResult', 'CancelJob',
+           'Subscribe', 'Event', 'CallbackProfile', 'Profile', 'Stats', 'RunRecord', 'GetHistory', 'Auth',
+           'MESSAGE_LIMIT', 'encode_message', 'decode_message', 'read_message', 'write_message']
+
+
+MESSAGE_LIMIT = 2 ** 24  # Maximum size of one newline terminated message
 
 
 class Message(DataClass):
@@ -17,36 +23,233 @@ class Error(DataClass):
     message: str
 
 
+class Busy(Error):
+    """Error reply when the server is too overloaded to accept the request. Lag is the event loop lag in seconds."""
+    lag: float = 0.0
+
+
 class Quit(DataClass):
+    """Shut down the server. It waits up to deadline seconds (or its drain timeout) for the running callbacks."""
+    deadline: float = field(None, skip_dict=None)
+
+
+class Ping(DataClass):
     pass
 
 
+class Auth(DataClass):
+    """Handshake that starts every connection to a server with a token. Each side sends a random nonce."""
+    nonce: str
+
+
 class Update(DataClass):
+    """Import or reload the update_path modules. If module_name is blank the server manifest is reloaded too.
+
+    If manifest_path is given the schedules of that JSON, TOML or YAML manifest file on the server are loaded.
+    """
     module_name: str = ''
+    manifest_path: str = field('', skip_dict='')
 
 
 class RunCommand(DataClass):
+    """Run a registered callback. If background is True the reply is a JobStatus sent before the callback finishes.
+
+    If timeout is given the callback is cancelled and the command fails after that many seconds.
+    """
     callback_name: str
     args: tuple = field(default_factory=tuple)
     kwargs: dict = field(default_factory=dict)
+    background: bool = field(False, skip_dict=False)
+    timeout: float = field(None, skip_dict=None)
 
 
 class ScheduleCommand(DataClass):
+    """Run a registered callback on a schedule. If priority is given it replaces the priority of the schedule.
+
+    If after is given the callback runs every time all of the named schedules succeeded instead of on the schedule.
+    """
     name: str
     schedule: Schedule
     callback_name: str
     args: tuple = field(default_factory=tuple)
     kwargs: dict = field(default_factory=dict)
+    priority: int = field(None, skip_dict=None)
+    after: list = field(default_factory=list)
 
 
 class RunningSchedule(DataClass):
     name: str
     schedule: Schedule
+    callback_name: str = field('', skip_dict='')
+    after: list = field(default_factory=list)
 
 
 class ListSchedules(DataClass):
+    """Request the running schedules. The reply is a ListSchedules with the matching schedules.
+
+    Filters, pagination and streaming are optional. The reply cursor is the value to send for the next page or
+    blank if there are no more pages. A streamed reply is sent as several ListSchedules messages where every message
+    except the last one has more=True.
+    """
     schedules: List[RunningSchedule] = field(default_factory=list)
+    prefix: str = field('', skip_dict='')
+    callback_name: str = field('', skip_dict='')
+    next_run_after: datetime.datetime = field(None, skip_dict=None)
+    next_run_before: datetime.datetime = field(None, skip_dict=None)
+    limit: int = field(0, skip_dict=0)
+    cursor: str = field('', skip_dict='')
+    stream: bool = field(False, skip_dict=False)
+    chunk_size: int = field(100, skip_dict=100)
+    more: bool = field(False, skip_dict=False)
 
 
 class StopSchedule(DataClass):
     name: str
+
+
+class JobStatus(DataClass):
+    """Request the status of a background job. The reply is a JobStatus with the status filled in.
+
+    Status is "running", "finished", "failed", "cancelled" or "unknown" if the job id was never started or its
+    result was dropped from the result cache.
+    """
+    job_id: str
+    callback_name: str = field('', skip_dict='')
+    status: str = field('', skip_dict='')
+    error: str = field('', skip_dict='')
+    started: datetime.datetime = field(None, skip_dict=None)
+    finished: datetime.datetime = field(None, skip_dict=None)
+
+
+class JobResult(JobStatus):
+    """Request the result of a background job. If wait is True the reply is sent when the job is done."""
+    result: Any = field(None, skip_dict=None)
+    wait: bool = field(False, skip_dict=False)
+    timeout: float = field(None, skip_dict=None)
+
+
+class CancelJob(DataClass):
+    """Cancel a background job. The reply is the JobStatus of the job."""
+    job_id: str
+
+
+class Subscribe(DataClass):
+    """Turn the connection into a stream of Event messages sent by the server.
+
+    The server replies with a Message and then sends an Event every time a matching event happens until the connection
+    is closed. Empty filters receive everything.
+    """
+    names: list = field(default_factory=list)
+    prefix: str = field('', skip_dict='')
+    events: list = field(default_factory=list)
+    max_queue: int = field(1000, skip_dict=1000)
+
+
+class Event(DataClass):
+    """Server event. Event is "fired", "finished", "failed", "added" or "removed".
+
+    Name is the schedule name or the callback name for background jobs. Count is the number of events that were
+    coalesced into this event and dropped is the number of events that were dropped before this event.
+    """
+    event: str
+    name: str
+    time: datetime.datetime = field(None, skip_dict=None)
+    error: str = field('', skip_dict='')
+    job_id: str = field('', skip_dict='')
+    count: int = field(1, skip_dict=1)
+    dropped: int = field(0, skip_dict=0)
+
+
+class CallbackProfile(DataClass):
+    """Timing of one callback name. Times are in seconds. Wall and cpu only count the time spent on the loop."""
+    callback_name: str
+    calls: int = 0
+    errors: int = 0
+    steps: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    elapsed: float = 0.0
+    max_step: float = 0.0
+    slow_steps: int = 0
+    slow_name: str = ''
+
+
+class Profile(DataClass):
+    """Request the callbacks that blocked the loop the most. The reply is a Profile with the profiles.
+
+    Sort is "wall", "cpu", "max_step", "slow_steps", "calls" or "elapsed". Enabled and slow_threshold change the
+    profiler settings when given. The reply has the current settings.
+    """
+    profiles: List[CallbackProfile] = field(default_factory=list)
+    sort: str = field('wall', skip_dict='wall')
+    limit: int = field(10, skip_dict=10)
+    reset: bool = field(False, skip_dict=False)
+    enabled: bool = field(None, skip_dict=None)
+    slow_threshold: float = field(None, skip_dict=None)
+
+
+class Stats(DataClass):
+    """Request the server statistics. The reply is a Stats message with the values filled in.
+
+    Lag is the smoothed event loop lag in seconds and level is "ok", "warn", "shed" or "busy". Counters are the
+    number of times something happened like {"skipped": 2, "deferred": 5, "rejected": 1}. Lateness is the seconds
+    schedules started after they were due for each priority {"10": {"count", "mean", "p50", "p99", "max"}}.
+    Jitter is the seconds each precise schedule (spin > 0) woke up after it was due {name: {...}}. Dead letters
+    are the most recent runs that failed after all of their retries. Rate limits are the rate, policy, queue depth
+    and allowed, queued and dropped counts of every rate limited callback {callback_name: {...}}.
+    """
+    lag: float = field(0.0, skip_dict=0.0)
+    max_lag: float = field(0.0, skip_dict=0.0)
+    level: str = field('', skip_dict='')
+    schedules: int = field(0, skip_dict=0)
+    running_jobs: int = field(0, skip_dict=0)
+    counters: dict = field(default_factory=dict)
+    lateness: dict = field(default_factory=dict)
+    jitter: dict = field(default_factory=dict)
+    dead_letters: list = field(default_factory=list)
+    rate_limits: dict = field(default_factory=dict)
+
+
+class RunRecord(DataClass):
+    """One past run of a schedule. Duration is in seconds. Outcome is "succeeded", "failed", "timeout",
+    "cancelled", "skipped" or "dropped".
+    """
+    planned: datetime.datetime = field(None, skip_dict=None)
+    started: datetime.datetime = field(None, skip_dict=None)
+    duration: float = 0.0
+    outcome: str = ''
+
+
+class GetHistory(DataClass):
+    """Request the most recent runs of a schedule. The reply is a GetHistory with the runs filled in, newest first.
+
+    A limit of 0 returns every run the server keeps.
+    """
+    name: str
+    limit: int = field(0, skip_dict=0)
+    runs: List[RunRecord] = field(default_factory=list)
+
+
+# ========== Stream Functions ==========
+def encode_message(message: DataClass) -> bytes:
+    """Return the newline terminated bytes to send for the message."""
+    return message.json().encode() + b'\n'
+
+
+def decode_message(data: bytes) -> DataClass:
+    """Return the message object from the received bytes."""
+    return DataClass.from_json(data)
+
+
+async def read_message(reader) -> DataClass:
+    """Read one newline terminated message. Return None when the stream has ended."""
+    data = await reader.readline()
+    if not data:
+        return None
+    return decode_message(data)
+
+
+async def write_message(writer, message: DataClass):
+    """Write the message and wait for the stream to drain."""
+    writer.write(encode_message(message))
+    await writer.drain()
@@ -0,0 +1,132 @@
+import heapq
+import asyncio
+import itertools
+import contextlib
+from collections import deque
+
+from ..utils import get_loop
+
+
+__all__ = ['PriorityGate', 'LatenessStats']
+
+
+class PriorityGate(object):
+    """Let waiting callbacks start in priority order (highest first).
+
+    Schedules that come due together wake up in the same loop iteration. Every one of them joins the gate in that
+    iteration and the gate releases them on the next iteration, so the highest priority callback starts first no
+    matter which task asyncio woke first. With max_concurrent the gate also works as a pool. When the pool is full
+    the waiting callbacks are started in priority order as running callbacks finish.
+
+    Args:
+        max_concurrent (int)[None]: Maximum number of callbacks running at the same time. None is no limit.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run with if None use the running loop.
+    """
+    def __init__(self, max_concurrent: int = None, loop: asyncio.AbstractEventLoop = None):
+        self.max_concurrent = max_concurrent
+        self._loop = loop
+
+        self.running = 0
+        self.waiting = []  # heap of (-priority, order, future)
+        self._order = itertools.count()
+        self._release_handle = None
+
+    @property
+    def loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is not None:
+            return self._loop
+        return get_loop()
+
+    @loop.setter
+    def loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def is_full(self) -> bool:
+        """Return if the maximum number of callbacks are running."""
+        return self.max_concurrent is not None and self.running >= self.max_concurrent
+
+    def schedule_release(self):
+        """Release the waiting callbacks on the next loop iteration."""
+        if self._release_handle is None and self.waiting:
+            self._release_handle = self.loop.call_soon(self.release_waiting)
+
+    def release_waiting(self):
+        """Start the highest priority waiting callbacks."""
+        self._release_handle = None
+        while self.waiting and not self.is_full():
+            _, _, fut = heapq.heappop(self.waiting)
+            if not fut.done():  # Cancelled while waiting
+                self.running += 1
+                fut.set_result(None)
+
+    def try_acquire(self) -> bool:
+        """Take a slot right away if no callback is waiting. Return False if the slot was not taken."""
+        if self.waiting or self.is_full():
+            return False
+        self.running += 1
+        return True
+
+    async def acquire(self, priority: int = 0):
+        """Wait for the turn of this priority to run."""
+        fut = self.loop.create_future()
+        heapq.heappush(self.waiting, (-priority, next(self._order), fut))
+        self.schedule_release()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # Cancelled after the slot was given
+            raise
+
+    def release(self):
+        """Let the next callback run."""
+        self.running -= 1
+        self.schedule_release()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = 0):
+        """Context manager to run a callback when it is the callbacks turn."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class LatenessStats(object):
+    """Seconds between when each schedule was due and when its callback started, kept for each key.
+
+    The key is the priority for the lateness of each priority class or the schedule name for precise schedules.
+
+    Args:
+        max_samples (int)[1000]: Number of recent samples kept for each key to calculate the percentiles.
+    """
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.classes = {}  # {key: [count, total, max, deque(samples)]}
+
+    def record(self, key, lateness: float):
+        """Add the lateness in seconds of one run."""
+        try:
+            stats = self.classes[key]
+        except KeyError:
+            stats = self.classes[key] = [0, 0.0, 0.0, deque(maxlen=self.max_samples)]
+        lateness = max(lateness, 0.0)
+        stats[0] += 1
+        stats[1] += lateness
+        stats[2] = max(stats[2], lateness)
+        stats[3].append(lateness)
+
+    def summary(self) -> dict:
+        """Return {key: {"count", "mean", "p50", "p99", "max"}} with the keys as strings, largest key first."""
+        summary = {}
+        for key, (count, total, max_lateness, samples) in sorted(self.classes.items(), reverse=True):
+            values = sorted(samples)
+            summary[str(key)] = {'count': count, 'mean': total / count, 'max': max_lateness,
+                                      'p50': values[int(len(values) * 0.5)],
+                                      'p99': values[min(int(len(values) * 0.99), len(values) - 1)]}
+        return summary
+
+    def reset(self):
+        """Clear the statistics."""
+        self.classes.clear()
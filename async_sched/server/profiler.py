@@ -0,0 +1,144 @@
+import time
+import types
+import inspect
+import logging
+from typing import Callable, Awaitable, List
+
+from ..utils import call_async
+from .messages import CallbackProfile
+
+
+__all__ = ['SORT_KEYS', 'CallbackStats', 'Profiler']
+
+
+SORT_KEYS = ('wall', 'cpu', 'max_step', 'slow_steps', 'calls', 'elapsed')
+
+
+class CallbackStats(object):
+    """Timing totals for one callback name.
+
+    Wall and cpu time only count the time the callback was running on the loop (the coroutine steps), so a callback
+    that awaits for a long time is not counted as blocking. Elapsed is the total time from start to finish.
+    """
+    def __init__(self, callback_name: str = ''):
+        self.callback_name = callback_name
+        self.calls = 0
+        self.errors = 0
+        self.steps = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.elapsed = 0.0
+        self.max_step = 0.0
+        self.slow_steps = 0
+        self.slow_name = ''  # Schedule name of the slowest step
+
+    def to_message(self) -> CallbackProfile:
+        return CallbackProfile(callback_name=self.callback_name, calls=self.calls, errors=self.errors,
+                               steps=self.steps, wall=self.wall, cpu=self.cpu, elapsed=self.elapsed,
+                               max_step=self.max_step, slow_steps=self.slow_steps, slow_name=self.slow_name)
+
+
+class Profiler(object):
+    """Measure the wall and cpu time of every step a callback runs on the event loop.
+
+    A step is one run of the callback between awaits. Only one step can run on the loop at a time, so a long step
+    is exactly how long the callback blocked every other schedule and client. Steps longer than the slow threshold
+    are logged with the schedule name, like the asyncio debug slow_callback_duration warning.
+
+    Args:
+        enabled (bool)[False]: If False callbacks are called without being timed.
+        slow_threshold (float)[0.1]: Seconds a step can block the loop before it is logged as slow.
+        logger (logging.Logger)[None]: Logger for the slow step warnings.
+    """
+    def __init__(self, enabled: bool = False, slow_threshold: float = 0.1, logger: logging.Logger = None):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.logger = logger or logging.getLogger("asyncio")
+        self.stats = {}  # {callback_name: CallbackStats}
+
+    def get_stats(self, callback_name: str) -> CallbackStats:
+        """Return the stats for the callback name."""
+        try:
+            return self.stats[callback_name]
+        except KeyError:
+            stats = self.stats[callback_name] = CallbackStats(callback_name)
+            return stats
+
+    def record_step(self, stats: CallbackStats, name: str, wall: float, cpu: float):
+        """Add the time of one step and log it if it blocked the loop for too long."""
+        stats.steps += 1
+        stats.wall += wall
+        stats.cpu += cpu
+        if wall > stats.max_step:
+            stats.max_step = wall
+            stats.slow_name = name
+        if self.slow_threshold is not None and wall >= self.slow_threshold:
+            stats.slow_steps += 1
+            self.logger.warning(f'Callback "{stats.callback_name}" for "{name}" blocked the loop for {wall:.3f} s '
+                                f'({cpu:.3f} s cpu)')
+
+    @types.coroutine
+    def time_steps(self, stats: CallbackStats, name: str, coro):
+        """Run the coroutine and time every step. This replaces "await coro"."""
+        send_value, error = None, None
+        while True:
+            start_wall, start_cpu = time.perf_counter(), time.thread_time()
+            try:
+                if error is not None:
+                    future = coro.throw(error)
+                else:
+                    future = coro.send(send_value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.record_step(stats, name, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+
+            try:
+                send_value, error = (yield future), None
+            except BaseException as err:  # Pass cancellation and thrown errors into the coroutine
+                send_value, error = None, err
+
+    async def call_async(self, callback_name: str, name: str, callback: Callable[..., Awaitable[None]] = None,
+                         *args, **kwargs):
+        """Call the callback and record its timing.
+
+        Args:
+            callback_name (str): Name to record the timing under.
+            name (str): Schedule name (or other source) reported with slow steps.
+            callback (callable/awaitable): Normal function or coroutine function to call.
+            *args (tuple/object): Positional arguments to pass into the callback function.
+            **kwargs (dict/object): Keyword arguments to pass into the callback function.
+        """
+        if not self.enabled:
+            return await call_async(callback, *args, **kwargs)
+
+        stats = self.get_stats(callback_name)
+        stats.calls += 1
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(callback):
+                return await self.time_steps(stats, name, callback(*args, **kwargs))
+            elif callable(callback):
+                start_wall, start_cpu = time.perf_counter(), time.thread_time()
+                try:
+                    return callback(*args, **kwargs)
+                finally:
+                    self.record_step(stats, name, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.elapsed += time.perf_counter() - start
+
+    def top(self, sort: str = 'wall', limit: int = 10) -> List[CallbackStats]:
+        """Return the stats with the largest sort value first."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f'Invalid sort "{sort}"! Use one of {", ".join(SORT_KEYS)}')
+        items = sorted(self.stats.values(), key=lambda stats: getattr(stats, sort), reverse=True)
+        if limit and limit > 0:
+            items = items[:limit]
+        return items
+
+    def reset(self):
+        """Clear all of the recorded timing."""
+        self.stats.clear()
@@ -0,0 +1,121 @@
+import asyncio
+from collections import deque
+
+from ..utils import get_loop, get_clock
+
+
+__all__ = ['RATE_QUEUE', 'RATE_DROP', 'RATE_POLICIES', 'TokenBucket']
+
+
+RATE_QUEUE = 'queue'
+RATE_DROP = 'drop'
+RATE_POLICIES = (RATE_QUEUE, RATE_DROP)
+
+
+class TokenBucket(object):
+    """Limit how often a callback is called across every schedule and command that uses it.
+
+    The bucket holds up to burst tokens and gains rate tokens every second. Every call takes one token. A call
+    without a token waits in a first in first out queue with the "queue" policy or is dropped with the "drop" policy.
+    Waiting calls are woken by one timer when the next token is ready instead of every caller polling.
+
+    Args:
+        rate (float): Calls allowed per second.
+        burst (int)[1]: Maximum number of calls that can happen at once after the callback was idle.
+        policy (str)['queue']: "queue" waits for a token. "drop" skips the call when there is no token.
+        max_queue (int)[None]: Maximum number of waiting calls for the "queue" policy. Calls over this are dropped.
+            None is no limit.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to run with if None use the running loop.
+    """
+    def __init__(self, rate: float, burst: int = 1, policy: str = RATE_QUEUE, max_queue: int = None,
+                 loop: asyncio.AbstractEventLoop = None):
+        if rate <= 0:
+            raise ValueError('The rate must be greater than 0!')
+        if policy not in RATE_POLICIES:
+            raise ValueError(f'Invalid rate limit policy "{policy}"! Use one of {RATE_POLICIES}.')
+        self.rate = rate
+        self.burst = max(burst or 1, 1)
+        self.policy = policy
+        self.max_queue = max_queue
+        self._loop = loop
+
+        self.tokens = float(self.burst)
+        self.updated = get_clock().monotonic()
+        self.waiting = deque()  # Futures of the queued calls
+        self._wake_handle = None
+        self.allowed = 0
+        self.queued = 0
+        self.dropped = 0
+
+    @property
+    def loop(self) -> 'asyncio.AbstractEventLoop':
+        if self._loop is not None:
+            return self._loop
+        return get_loop()
+
+    @loop.setter
+    def loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    @property
+    def depth(self) -> int:
+        """Return the number of calls waiting for a token."""
+        return len(self.waiting)
+
+    def refill(self):
+        """Add the tokens gained since the last refill."""
+        now = get_clock().monotonic()
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.burst)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token right away if no call is waiting. Return False if there was no token."""
+        if self.waiting:
+            return False
+        self.refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.allowed += 1
+        return True
+
+    async def acquire(self) -> bool:
+        """Wait for a token. Return False if the call was dropped."""
+        if self.try_acquire():
+            return True
+        if self.policy == RATE_DROP or (self.max_queue is not None and len(self.waiting) >= self.max_queue):
+            self.dropped += 1
+            return False
+
+        fut = self.loop.create_future()
+        self.waiting.append(fut)
+        self.queued += 1
+        self.schedule_wake()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.tokens += 1  # Cancelled after the token was given
+            raise
+        return True
+
+    def schedule_wake(self):
+        """Wake the waiting calls when the next token is ready."""
+        if self._wake_handle is None and self.waiting:
+            self.refill()
+            delay = max((1 - self.tokens) / self.rate, 0)
+            self._wake_handle = self.loop.call_later(delay, self.wake)
+
+    def wake(self):
+        """Give the ready tokens to the waiting calls in order."""
+        self._wake_handle = None
+        self.refill()
+        while self.waiting and self.tokens >= 1:
+            fut = self.waiting.popleft()
+            if not fut.done():  # Cancelled while waiting
+                self.tokens -= 1
+                self.allowed += 1
+                fut.set_result(None)
+        while self.waiting and self.waiting[0].done():
+            self.waiting.popleft()
+        self.schedule_wake()
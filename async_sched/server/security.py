@@ -0,0 +1,237 @@
+import os
+import ssl
+import hmac
+import struct
+from typing import Union, Tuple
+
+from .messages import Auth, Error, encode_message, decode_message
+
+
+__all__ = ['MAC_SIZE', 'CLIENT', 'SERVER', 'AuthenticationError', 'make_token', 'new_nonce', 'derive_key',
+           'SignedReader', 'SignedWriter', 'authenticate_client', 'authenticate_server',
+           'SessionContext', 'make_server_context', 'make_client_context', 'get_default_token',
+           'get_default_client_context']
+
+
+MAC_SIZE = 16  # Bytes of the HMAC-SHA256 that are sent (32 hex characters)
+CLIENT = b'c'  # Direction of the frames the client sends
+SERVER = b's'  # Direction of the frames the server sends
+SEQUENCE = struct.Struct('>Q')
+
+CLIENT_CONTEXT = None  # Shared client SSLContext made from the environment variables, so sessions are resumed
+
+
+class AuthenticationError(ConnectionError):
+    """The other side does not have the token or a message was changed, replayed or reordered."""
+    pass
+
+
+def make_token(token: Union[str, bytes, None]) -> Union[bytes, None]:
+    """Return the shared token as bytes or None if authentication is disabled."""
+    if not token:
+        return None
+    if isinstance(token, str):
+        token = token.encode()
+    return token
+
+
+def new_nonce() -> str:
+    """Return a random 128 bit hex nonce."""
+    return os.urandom(16).hex()
+
+
+def derive_key(token: bytes, client_nonce: str, server_nonce: str) -> bytes:
+    """Return the key that signs the messages of one connection.
+
+    Both nonces are part of the key, so a message recorded from one connection is not valid on another connection.
+    """
+    return hmac.digest(token, b'async_sched auth ' + client_nonce.encode() + server_nonce.encode(), 'sha256')
+
+
+class SignedWriter(object):
+    """Stream writer that signs every newline terminated message it writes.
+
+    A frame is the hex HMAC-SHA256 of the direction, the number of the message on the connection and the message,
+    a space and then the message. The number stops a message from being replayed, dropped or reordered.
+
+    Args:
+        writer (asyncio.StreamWriter): Writer to send the signed frames with.
+        key (bytes): Key from derive_key().
+        direction (bytes): CLIENT or SERVER for the side that writes.
+    """
+    def __init__(self, writer, key: bytes, direction: bytes):
+        self.writer = writer
+        self.key = key
+        self.direction = direction
+        self.count = 0
+
+    def sign(self, line: bytes) -> bytes:
+        mac = hmac.digest(self.key, self.direction + SEQUENCE.pack(self.count) + line, 'sha256')[:MAC_SIZE]
+        self.count += 1
+        return mac.hex().encode() + b' ' + line + b'\n'
+
+    def write(self, data: bytes):
+        self.writer.write(b''.join(self.sign(line) for line in data.splitlines()))
+
+    def __getattr__(self, item):
+        return getattr(self.writer, item)
+
+
+class SignedReader(object):
+    """Stream reader that checks the signature of every newline terminated message it reads.
+
+    Args:
+        reader (asyncio.StreamReader): Reader to receive the signed frames from.
+        key (bytes): Key from derive_key().
+        direction (bytes): CLIENT or SERVER for the side that wrote the frames.
+    """
+    def __init__(self, reader, key: bytes, direction: bytes):
+        self.reader = reader
+        self.key = key
+        self.direction = direction
+        self.count = 0
+
+    def verify(self, frame: bytes) -> bytes:
+        """Return the message of the frame or raise an AuthenticationError if the signature is wrong."""
+        mac, _, line = frame.rstrip(b'\r\n').partition(b' ')
+        expected = hmac.digest(self.key, self.direction + SEQUENCE.pack(self.count) + line, 'sha256')[:MAC_SIZE]
+        if not hmac.compare_digest(mac, expected.hex().encode()):
+            raise AuthenticationError('The message signature is not valid!')
+        self.count += 1
+        return line + b'\n'
+
+    async def readline(self) -> bytes:
+        frame = await self.reader.readline()
+        if not frame:
+            return frame
+        return self.verify(frame)
+
+    def __getattr__(self, item):
+        return getattr(self.reader, item)
+
+
+async def authenticate_client(reader, writer, token: bytes) -> Tuple[SignedReader, SignedWriter]:
+    """Run the client side of the handshake and return the signed reader and writer for the connection.
+
+    The client sends an Auth message with its nonce and the server replies with its nonce. No secret is sent.
+    The first signed message proves that both sides have the token.
+    """
+    client_nonce = new_nonce()
+    writer.write(encode_message(Auth(nonce=client_nonce)))
+    await writer.drain()
+    data = await reader.readline()
+    if not data:
+        raise ConnectionError('The server closed the connection!')
+    reply = decode_message(data)
+    if not isinstance(reply, Auth):
+        raise AuthenticationError(getattr(reply, 'message', None) or 'The server did not accept the handshake!')
+
+    key = derive_key(token, client_nonce, reply.nonce)
+    return SignedReader(reader, key, SERVER), SignedWriter(writer, key, CLIENT)
+
+
+async def authenticate_server(reader, writer, token: bytes) -> Tuple[SignedReader, SignedWriter]:
+    """Run the server side of the handshake and return the signed reader and writer for the connection.
+
+    Raise an AuthenticationError after replying with an Error if the client did not start with the handshake.
+    """
+    data = await reader.readline()
+    if not data:
+        raise ConnectionError('The client closed the connection!')
+    try:
+        message = decode_message(data)
+    except (TypeError, ValueError, Exception):
+        message = None
+    if not isinstance(message, Auth):
+        writer.write(encode_message(Error(message='Authentication required!')))
+        await writer.drain()
+        raise AuthenticationError('The client did not authenticate!')
+
+    server_nonce = new_nonce()
+    writer.write(encode_message(Auth(nonce=server_nonce)))
+    await writer.drain()
+    key = derive_key(token, message.nonce, server_nonce)
+    return SignedReader(reader, key, CLIENT), SignedWriter(writer, key, SERVER)
+
+
+class SessionContext(ssl.SSLContext):
+    """Client SSLContext that resumes the last TLS session of each server.
+
+    asyncio does not take a TLS session when it opens a connection, so the session is given where the connection
+    is wrapped. Resuming a session skips the certificate exchange of a full handshake. Sessions cannot be saved
+    across processes, so this helps a process that opens many connections like the ClientPool.
+    """
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        ctx = super().__new__(cls, protocol, *args, **kwargs)
+        ctx.sessions = {}  # {server_hostname: ssl.SSLSession}
+        return ctx
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side=server_side, server_hostname=server_hostname,
+                                session=session)
+
+    def save_session(self, server_hostname: str, ssl_object: ssl.SSLObject):
+        """Save the session of the connection to resume it on the next connection to the server."""
+        session = getattr(ssl_object, 'session', None)
+        if session is not None and session.has_ticket:
+            self.sessions[server_hostname] = session
+
+
+def make_server_context(certfile: str, keyfile: str = None, cafile: str = None) -> ssl.SSLContext:
+    """Return the SSLContext for a TLS server.
+
+    Args:
+        certfile (str): PEM file with the server certificate chain.
+        keyfile (str)[None]: PEM file with the private key if it is not in the certfile.
+        cafile (str)[None]: If given only clients with a certificate signed by these CAs can connect (mutual TLS).
+    """
+    ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ctx.load_cert_chain(certfile, keyfile)
+    if cafile:
+        ctx.load_verify_locations(cafile)
+        ctx.verify_mode = ssl.CERT_REQUIRED
+    return ctx
+
+
+def make_client_context(cafile: str = None, certfile: str = None, keyfile: str = None,
+                        check_hostname: bool = True) -> SessionContext:
+    """Return the SessionContext for a TLS client.
+
+    Args:
+        cafile (str)[None]: PEM file with the CAs that signed the server certificate. If None use the system CAs.
+        certfile (str)[None]: PEM file with the client certificate for a server that requires one.
+        keyfile (str)[None]: PEM file with the client private key if it is not in the certfile.
+        check_hostname (bool)[True]: If True the server certificate must match the host name.
+    """
+    ctx = SessionContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = check_hostname
+    if cafile:
+        ctx.load_verify_locations(cafile)
+    else:
+        ctx.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    if certfile:
+        ctx.load_cert_chain(certfile, keyfile)
+    return ctx
+
+
+def get_default_token() -> Union[bytes, None]:
+    """Return the token from the ASYNC_SCHED_TOKEN environment variable or None."""
+    return make_token(os.getenv('ASYNC_SCHED_TOKEN'))
+
+
+def get_default_client_context() -> Union[SessionContext, None]:
+    """Return the client context made from the environment variables or None if TLS is not enabled.
+
+    ASYNC_SCHED_TLS=1 enables TLS with the system CAs. ASYNC_SCHED_CAFILE enables TLS with the given CAs.
+    ASYNC_SCHED_CERTFILE and ASYNC_SCHED_KEYFILE give the client certificate.
+    """
+    global CLIENT_CONTEXT
+    cafile = os.getenv('ASYNC_SCHED_CAFILE')
+    if not cafile and os.getenv('ASYNC_SCHED_TLS', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    if CLIENT_CONTEXT is None:
+        CLIENT_CONTEXT = make_client_context(cafile, os.getenv('ASYNC_SCHED_CERTFILE'),
+                                             os.getenv('ASYNC_SCHED_KEYFILE'))
+    return CLIENT_CONTEXT
@@ -0,0 +1,314 @@
+import gc
+import os
+import sys
+import math
+import marshal
+import struct
+import datetime
+import contextlib
+from array import array
+from operator import itemgetter
+from typing import Callable, Iterable, List, Tuple, Union
+
+from serial_json import Weekdays, dumps, loads
+
+from ..utils import get_clock
+from ..schedule import CATCH_UP_NONE, CATCH_UP_ONCE, CATCH_UP_ALL, Schedule
+from .lag import SHED_POLICIES
+
+
+__all__ = ['MAGIC', 'VERSION', 'HEADER', 'COLUMNS', 'VALUE_KEYS', 'get_values', 'paused_gc', 'pack_snapshot',
+           'unpack_snapshot', 'write_snapshot', 'read_snapshot']
+
+
+MAGIC = b'ASNP'
+VERSION = 1
+
+# Magic, version, number of schedules and when the snapshot was saved in microseconds since 1970
+HEADER = struct.Struct('<4sHIq')
+
+NO_TIME = -2 ** 63  # Stored for a time that is None
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_US = datetime.timedelta(microseconds=1)
+MARSHAL_VERSION = 4
+TRANSPOSE_SIZE = 5000
+CATCH_UP_POLICIES = (CATCH_UP_NONE, CATCH_UP_ONCE, CATCH_UP_ALL)
+WEEKDAY_BITS = {name: 1 << i for name, i in Weekdays.DAYS.items()}
+
+
+def pack_time(dt: datetime.datetime) -> int:
+    """Return the naive local datetime as microseconds since 1970 without the slow timestamp() call."""
+    if dt is None:
+        return NO_TIME
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return (dt - EPOCH) // ONE_US
+
+
+def unpack_time(value: int) -> datetime.datetime:
+    if value == NO_TIME:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=value)
+
+
+def pack_at(at: datetime.time) -> int:
+    if at is None:
+        return NO_TIME
+    return ((at.hour * 60 + at.minute) * 60 + at.second) * 1000000 + at.microsecond
+
+
+def unpack_at(value: int) -> datetime.time:
+    if value == NO_TIME:
+        return None
+    return (EPOCH + datetime.timedelta(microseconds=value)).time()
+
+
+def pack_weekdays(weekdays: Iterable[str]) -> int:
+    mask = 0
+    for day in weekdays:
+        mask |= WEEKDAY_BITS[day]
+    return mask
+
+
+def unpack_number(value: float) -> Union[int, float]:
+    return int(value) if value.is_integer() else value
+
+
+def pack_optional(value: Union[float, None]) -> float:
+    """Return NaN for a number that is None, so it can be stored in a float array."""
+    return math.nan if value is None else value
+
+
+def unpack_optional(value: float) -> Union[float, None]:
+    return None if math.isnan(value) else value
+
+
+def unpack_column(unpack: Callable, values: list) -> list:
+    """Return the unpacked values. Each distinct value is unpacked once, because most columns hold a few defaults."""
+    if len(values) < 64:
+        return [unpack(value) for value in values]
+    try:
+        unpacked = {value: unpack(value) for value in set(values)}
+        return list(map(unpacked.__getitem__, values))
+    except KeyError:  # NaN is not equal to itself, so it is not found in the dict
+        return [unpack(value) for value in values]
+
+
+# Columns of the stored schedule values as (key in the schedule __dict__, array typecode, pack, unpack). Pack and
+# unpack convert a value that cannot be stored in the array as is.
+COLUMNS = (
+    ('days', 'd', None, unpack_number),
+    ('hours', 'd', None, unpack_number),
+    ('minutes', 'd', None, unpack_number),
+    ('_seconds', 'd', None, unpack_number),
+    ('milliseconds', 'd', None, unpack_number),
+    ('microseconds', 'd', None, unpack_number),
+    ('weeks', 'd', None, unpack_number),
+    ('repeat', 'B', None, bool),
+    ('_at', 'q', pack_at, unpack_at),
+    ('_start_on', 'q', pack_time, unpack_time),
+    ('_end_on', 'q', pack_time, unpack_time),
+    ('_last_run', 'q', pack_time, unpack_time),
+    ('_next_run', 'q', pack_time, unpack_time),
+    ('_retry_run', 'q', pack_time, unpack_time),
+    ('shed', 'B', SHED_POLICIES.index, SHED_POLICIES.__getitem__),
+    ('priority', 'i', None, None),
+    ('spin', 'd', None, None),
+    ('retries', 'i', None, None),
+    ('retry_delay', 'd', None, None),
+    ('retry_backoff', 'd', None, None),
+    ('retry_max_delay', 'd', None, None),
+    ('retry_jitter', 'd', None, None),
+    ('attempt', 'i', None, None),
+    ('misfire_grace_time', 'd', pack_optional, unpack_optional),
+    ('catch_up', 'B', CATCH_UP_POLICIES.index, CATCH_UP_POLICIES.__getitem__),
+    ('max_catch_up', 'i', None, None),
+    ('catch_up_delay', 'd', None, None),
+    ('missed', 'i', None, None),
+    ('timeout', 'd', pack_optional, unpack_optional),
+    ('_weekdays', 'B', pack_weekdays, None),  # Weekdays objects are made for each schedule when restored
+    )
+VALUE_KEYS = tuple(column[0] for column in COLUMNS) + ('last_error',)
+get_stored = itemgetter(*VALUE_KEYS[:-2])
+
+
+def get_values(sched: Schedule) -> tuple:
+    """Return the values of the schedule that are saved in a snapshot in the order of VALUE_KEYS.
+
+    The values are read from the schedule __dict__, which is much faster than the field properties. The weekdays
+    are copied to a tuple, so the values only hold immutable objects that the garbage collector stops tracking.
+    """
+    values = vars(sched)
+    return get_stored(values) + (tuple(values['_weekdays']), values['last_error'])
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """Pause the garbage collector.
+
+    A server with many schedules has millions of objects. Restoring a snapshot allocates enough objects to start
+    several full collections that take about a third of the restore. The collector is global, so only pause it
+    while nothing else can run, like a restore that blocks the event loop.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def dump_args(args: tuple, kwargs: dict) -> bytes:
+    """Return the callback arguments as bytes.
+
+    The builtin values most callbacks take are saved with marshal, which is about ten times faster than json.
+    Other values are saved as serial_json json. The first byte tells which one was used.
+    """
+    if not args and not kwargs:
+        return b''
+    try:
+        return b'm' + marshal.dumps((tuple(args), kwargs), MARSHAL_VERSION)
+    except ValueError:
+        return b'j' + dumps([list(args), kwargs]).encode()
+
+
+def load_args(data: bytes) -> Tuple[tuple, dict]:
+    if not data:
+        return (), {}
+    elif data[:1] == b'm':
+        return marshal.loads(data[1:])
+    args, kwargs = loads(data[1:].decode())
+    return tuple(args), kwargs
+
+
+def pack_array(typecode: str, values: list) -> bytes:
+    arr = array(typecode, values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpack_array(typecode: str, data: bytes, offset: int, count: int) -> Tuple[list, int]:
+    arr = array(typecode)
+    end = offset + arr.itemsize * count
+    arr.frombytes(data[offset:end])
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr.tolist(), end
+
+
+def pack_strings(values: List[bytes]) -> bytes:
+    return pack_array('I', [len(value) for value in values]) + b''.join(values)
+
+
+def unpack_strings(data: bytes, offset: int, count: int) -> Tuple[List[bytes], int]:
+    lengths, offset = unpack_array('I', data, offset, count)
+    values = []
+    for length in lengths:
+        values.append(data[offset: offset + length])
+        offset += length
+    return values, offset
+
+
+def pack_snapshot(items: List[tuple], saved: datetime.datetime = None) -> bytes:
+    """Return the schedules as the bytes of a snapshot file.
+
+    The file is a header followed by one column for every value. Numbers and times are fixed size little endian
+    arrays, so a column can be found without reading the columns before it. The strings are an array of byte lengths
+    followed by the bytes. Times are microseconds since 1970 in local time.
+
+    Args:
+        items (list): List of (name, values, callback_name, args, kwargs, after) where values is the tuple from
+            get_values().
+        saved (datetime.datetime)[None]: When the snapshot was taken. If None use now.
+    """
+    if saved is None:
+        saved = get_clock().now()
+    parts = [HEADER.pack(MAGIC, VERSION, len(items), pack_time(saved))]
+
+    # Turn the rows into columns a slice at a time, so a thread packing the snapshot lets the event loop run
+    columns = [[] for _ in VALUE_KEYS]
+    for i in range(0, len(items), TRANSPOSE_SIZE):
+        for column, values in zip(columns, zip(*(item[1] for item in items[i: i + TRANSPOSE_SIZE]))):
+            column.extend(values)
+    for (key, typecode, pack, _), values in zip(COLUMNS, columns):
+        if pack is not None:
+            values = [pack(value) for value in values]
+        parts.append(pack_array(typecode, values))
+
+    parts.append(pack_strings([item[0].encode() for item in items]))
+    parts.append(pack_strings([item[2].encode() for item in items]))
+    parts.append(pack_strings(['\0'.join(item[5]).encode() for item in items]))
+    parts.append(pack_strings([dump_args(item[3], item[4]) for item in items]))
+    parts.append(pack_strings([error.encode() for error in columns[-1]]))
+    return b''.join(parts)
+
+
+def unpack_snapshot(data: bytes) -> List[tuple]:
+    """Return a list of (name, schedule, callback_name, args, kwargs, after) from the bytes of a snapshot file."""
+    magic, version, count, saved = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('The data is not a schedule snapshot!')
+    if version != VERSION:
+        raise ValueError(f'Unsupported schedule snapshot version {version}!')
+
+    offset = HEADER.size
+    keys = []
+    columns = []
+    for key, typecode, _, unpack in COLUMNS:
+        values, offset = unpack_array(typecode, data, offset, count)
+        if unpack is not None:
+            values = unpack_column(unpack, values)
+        keys.append(key)
+        columns.append(values)
+
+    names, offset = unpack_strings(data, offset, count)
+    callback_names, offset = unpack_strings(data, offset, count)
+    afters, offset = unpack_strings(data, offset, count)
+    args, offset = unpack_strings(data, offset, count)
+    errors, offset = unpack_strings(data, offset, count)
+    names = list(map(bytes.decode, names))
+    callback_names = list(map(bytes.decode, callback_names))
+    errors = list(map(bytes.decode, errors))
+
+    # Making the schedules without __init__ is many times faster. Copying the defaults sets every attribute and
+    # keeps the order of the attributes.
+    defaults = vars(Schedule())
+    weekdays = {}  # {mask: names}
+    new = Schedule.__new__
+    items = []
+    for i, row in enumerate(zip(*columns)):
+        sched = new(Schedule)
+        values = defaults.copy()
+        values.update(zip(keys, row))
+        mask = values['_weekdays']
+        try:
+            days = weekdays[mask]
+        except KeyError:
+            days = weekdays[mask] = [day for day, bit in WEEKDAY_BITS.items() if mask & bit]
+        values['_weekdays'] = week = Weekdays.__new__(Weekdays)
+        list.extend(week, days)  # Weekdays() without names would be every day
+        values['last_error'] = errors[i]
+        sched.__dict__ = values
+
+        after = afters[i]
+        items.append((names[i], sched, callback_names[i], *load_args(args[i]),
+                      after.decode().split('\0') if after else []))
+    return items
+
+
+def write_snapshot(path: str, items: List[tuple]):
+    """Write the schedules to the file. The file is replaced at once so a reader never sees half a file."""
+    data = pack_snapshot(items)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> List[tuple]:
+    """Return a list of (name, schedule, callback_name, args, kwargs, after) from the snapshot file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return unpack_snapshot(data)
@@ -1,26 +1,51 @@
 import os
 import sys
+import ssl
+import stat
+import json
+import bisect
+import signal
 import logging
 import asyncio
-from typing import Callable, Awaitable, Union, Tuple
+import datetime
+from collections import Counter, deque
+from typing import Callable, Awaitable, Union, Tuple, Iterable
 
-from serial_json import DataClass, loads, dumps
+from serial_json import loads, dumps
 
 try:
     from importlib import reload
 except (ImportError, Exception):
     from imp import reload
 
-from ..utils import print_exception, get_loop, call, call_async
-from ..schedule import Schedule
-from .messages import Message, Error, Quit, Update, RunCommand, ScheduleCommand, RunningSchedule, \
-    ListSchedules, StopSchedule
+from ..utils import print_exception, get_loop, get_clock, call, call_async, call_thread, call_timeout, \
+    is_unix_address, get_unix_path
+from ..schedule import TIMING_KEYS, Schedule
+from ..tracing import COMMAND, RunContext, trace_async
+from .messages import Message, Error, Busy, Quit, Ping, Update, RunCommand, ScheduleCommand, RunningSchedule, \
+    ListSchedules, StopSchedule, JobStatus, JobResult, CancelJob, Subscribe, Profile, Stats, GetHistory, \
+    MESSAGE_LIMIT, encode_message, decode_message
+from .jobs import UNKNOWN, JobManager
+from .events import FIRED, FINISHED, FAILED, ADDED, REMOVED, EventBus
+from .profiler import Profiler
+from .lag import SHED_DEFER, SHED_SKIP, LagMonitor
+from .priority import PriorityGate, LatenessStats
+from .batch import Batcher
+from .cache import make_cache_key, ResultCache
+from .dag import DependencyGraph
+from .ratelimit import RATE_QUEUE, TokenBucket
+from .snapshot import get_values, paused_gc, write_snapshot, read_snapshot
+from .manifest import read_manifest, diff_manifest, make_schedule
+from .security import AuthenticationError, make_token, authenticate_server
+from .history import SUCCEEDED, FAILED as RUN_FAILED, TIMEOUT, CANCELLED, SKIPPED, DROPPED, RunHistory
 
 
 __all__ = ['get_server', 'set_server', 'start_server', 'FakeScheduler', 'Scheduler']
 
 
 SERVER = None
+DRAINED = object()  # dispatch returns this when the server is draining and the callback did not run
+NOT_RUN = object()  # dispatch returns this when the rate limit or load shedding dropped the run
 
 
 def get_server():
@@ -36,20 +61,44 @@ def set_server(value):
 
 
 def start_server(addr: Union[str, Tuple[str, int]] = None, port: int = 8000, update_path: str = None,
-                 global_server: bool = False, set_env: bool = False,
+                 global_server: bool = False, set_env: bool = False, profile: bool = False,
+                 slow_callback_duration: float = 0.1, shed_lag: float = 0.5, busy_lag: float = 1.0,
+                 max_concurrent: int = None, dag_concurrency: int = None, state_path: str = None,
+                 drain_timeout: float = 30, history_size: int = 100, manifest_path: str = None,
+                 auth_token: Union[str, bytes] = None, auth_timeout: float = 5, ssl_context: ssl.SSLContext = None,
                  logger: logging.Logger = None, loop: asyncio.AbstractEventLoop = None):
     """Create a scheduler and start it as a server.
 
     Args:
-        addr (str/tuple)[None]: Ip address or tuple of ip address, port.
-        port (int)[8000]: Socket port to connect to.
+        addr (str/tuple)[None]: Ip address or tuple of ip address, port. Use "unix:///path/to/file.sock" to listen
+            on a unix domain socket instead of TCP.
+        port (int)[8000]: Socket port to connect to. Ignored for unix domain sockets.
         update_path (str)[None]: Path to directory that holds importable python files to run schedules with.
         global_server (bool)[False]: If True set this server as the main global server.
         set_env (bool)[False]: Set this address as the environment variable.
+        profile (bool)[False]: If True time the callbacks to find the callbacks that block the event loop.
+        slow_callback_duration (float)[0.1]: Log callbacks that block the loop for longer than this many seconds.
+        shed_lag (float)[0.5]: Event loop lag in seconds to start deferring or skipping schedules that allow it.
+        busy_lag (float)[1.0]: Event loop lag in seconds to start rejecting new schedules.
+        max_concurrent (int)[None]: Maximum number of schedule callbacks running at the same time.
+        dag_concurrency (int)[None]: Maximum number of schedules added with "after" running at the same time.
+        state_path (str)[None]: JSON file that keeps the last run of every schedule when the server shuts down.
+        drain_timeout (float)[30]: Seconds a graceful shutdown waits for the running callbacks.
+        history_size (int)[100]: Number of recent runs kept for every schedule. 0 does not keep a history.
+        manifest_path (str)[None]: JSON, TOML or YAML file of schedules to add after the update_path modules are
+            imported.
+        auth_token (str/bytes)[None]: Shared secret. If given every message must be signed with it.
+        auth_timeout (float)[5]: Seconds a client has to finish the Auth handshake before it is disconnected.
+        ssl_context (ssl.SSLContext)[None]: Serve TLS with this context (see security.make_server_context).
         logger (logging.Logger)[None]: Python logger
         loop (asyncio.AbstractEventLoop)[None]: Async event loop to run with if None use the running loop.
     """
-    srv = Scheduler(addr=addr, port=port, update_path=update_path, logger=logger, loop=loop)
+    srv = Scheduler(addr=addr, port=port, update_path=update_path, profile=profile,
+                    slow_callback_duration=slow_callback_duration, shed_lag=shed_lag, busy_lag=busy_lag,
+                    max_concurrent=max_concurrent, dag_concurrency=dag_concurrency, state_path=state_path,
+                    drain_timeout=drain_timeout, history_size=history_size, manifest_path=manifest_path,
+                    auth_token=auth_token, auth_timeout=auth_timeout, ssl_context=ssl_context, logger=logger,
+                    loop=loop)
     if global_server:
         set_server(srv)
     if set_env:
@@ -58,11 +107,13 @@ def start_server(addr: Union[str, Tuple[str, int]] = None, port: int = 8000, upd
 
     srv.start()
     srv.update_commands()
+    if manifest_path:
+        srv.load_manifest()
     return srv
 
 
 class FakeScheduler(object):
-    def register_callback(self, name: str = None, func: Callable[..., Awaitable[None]] = None):
+    def register_callback(self, name: str = None, func: Callable[..., Awaitable[None]] = None, **kwargs):
         if callable(name) and func is None:
             func = name
             name = None
@@ -84,16 +135,42 @@ class FakeScheduler(object):
 
 class Scheduler(object):
 
-    READ_SIZE = 4096
+    MESSAGE_LIMIT = MESSAGE_LIMIT
 
     def __init__(self, addr: Union[str, Tuple[str, int]] = None, port: int = 8000, update_path=None,
-                 logger: logging.Logger = None, loop: asyncio.AbstractEventLoop = None):
+                 profile: bool = False, slow_callback_duration: float = 0.1, shed_lag: float = 0.5,
+                 busy_lag: float = 1.0, max_concurrent: int = None, dag_concurrency: int = None,
+                 state_path: str = None, drain_timeout: float = 30, history_size: int = 100,
+                 manifest_path: str = None, auth_token: Union[str, bytes] = None, auth_timeout: float = 5,
+                 ssl_context: ssl.SSLContext = None, logger: logging.Logger = None,
+                 loop: asyncio.AbstractEventLoop = None):
         """Create a scheduler and start it as a server.
 
         Args:
-            addr (str/tuple)[None]: Ip address or tuple of ip address, port.
-            port (int)[8000]: Socket port to connect to.
+            addr (str/tuple)[None]: Ip address or tuple of ip address, port. Use "unix:///path/to/file.sock" to
+                listen on a unix domain socket instead of TCP.
+            port (int)[8000]: Socket port to connect to. Ignored for unix domain sockets.
             update_path (str)[None]: Path to directory that holds importable python files to run schedules with.
+            profile (bool)[False]: If True time the callbacks to find the callbacks that block the event loop.
+            slow_callback_duration (float)[0.1]: Log callbacks that block the loop for longer than this many seconds.
+            shed_lag (float)[0.5]: Event loop lag in seconds to start deferring or skipping schedules that allow it.
+            busy_lag (float)[1.0]: Event loop lag in seconds to start rejecting new schedules.
+            max_concurrent (int)[None]: Maximum number of schedule callbacks running at the same time. Waiting
+                callbacks start in priority order.
+            dag_concurrency (int)[None]: Maximum number of schedules added with "after" running at the same time.
+            state_path (str)[None]: JSON file that keeps the last run of every schedule when the server shuts
+                down. A schedule added with the same name continues from its saved last run.
+            drain_timeout (float)[30]: Seconds a graceful shutdown waits for the running callbacks.
+            history_size (int)[100]: Number of recent runs kept for every schedule. 0 does not keep a history.
+            manifest_path (str)[None]: JSON, TOML or YAML file of schedules that load_manifest() and an Update
+                without a module name add. Reloads only change the schedules that changed in the file. An Update can
+                only name other manifests in the same directory.
+            auth_token (str/bytes)[None]: Shared secret. If given a connection must start with the Auth handshake
+                and every message is signed with an HMAC of a key made from the token. Messages without a valid
+                signature close the connection.
+            auth_timeout (float)[5]: Seconds a client has to finish the Auth handshake. A client that connects
+                and sends nothing is disconnected after this time, so it cannot keep the connection open.
+            ssl_context (ssl.SSLContext)[None]: Serve TLS with this context (see security.make_server_context).
             logger (logging.Logger)[None]: Python logger
             loop (asyncio.AbstractEventLoop)[None]: Async event loop to run with if None use the running loop.
         """
@@ -106,10 +183,41 @@ class Scheduler(object):
         self.logger = logger or logging.getLogger("asyncio")
 
         self.update_path = update_path
-        self.tasks = {}
+        self.tasks = {}  # {name: [task, schedule, callback, args, kwargs]}
+        self.sleeping = set()  # Names of the schedules waiting for their next run
         self.callbacks = {}
+        self.batchers = {}  # {func: Batcher} for the callbacks registered with batch=True
+        self.caches = {}  # {name: ResultCache} for the callbacks registered with cache=True
+        self.limiters = {}  # {func: TokenBucket} for the callbacks registered with a rate
+        self.threaded = set()  # Functions registered with thread=True
+        self.events = EventBus()
+        self.jobs = JobManager(loop=loop, events=self.events)
+        self.profiler = Profiler(enabled=profile, slow_threshold=slow_callback_duration, logger=self.logger)
+        self.lag = LagMonitor(shed_threshold=shed_lag, busy_threshold=busy_lag, logger=self.logger, loop=loop)
+        self.counters = Counter()
+        self.gate = PriorityGate(max_concurrent=max_concurrent, loop=loop)
+        self.lateness = LatenessStats()
+        self.jitter = LatenessStats()
+        self.dead_letters = deque(maxlen=100)  # Runs that failed after all of their retries
+        self.history_size = history_size
+        self.history = {}  # {name: RunHistory} of the recent runs of every schedule
+        self.manifest_path = manifest_path
+        self.manifest = {}  # {name: entry} of the schedules added by the last manifest that was loaded
+        self.auth_token = make_token(auth_token)
+        self.auth_timeout = auth_timeout
+        self.ssl_context = ssl_context
+        self.graph = DependencyGraph(max_concurrent=dag_concurrency, on_failed=self.upstream_failed, loop=loop)
+        self.state_path = state_path
+        self.saved_state = self.load_state()  # {name: {"last_run": ...}} from the last shutdown
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self.active_runs = 0
+        self.drained = asyncio.Event()  # Set when no callback is running
+        self.drained.set()
+        self._sorted_names = None
         self.server = None
         self.server_task = None
+        self.shutdown_task = None
 
         self.ip_address = addr[0]
         self.port = addr[1]
@@ -149,12 +257,30 @@ class Scheduler(object):
     def loop(self, loop: asyncio.AbstractEventLoop):
         self._loop = loop
 
-    def register_callback(self, name: str = None, func: Callable[..., Awaitable[None]] = None):
+    def register_callback(self, name: str = None, func: Callable[..., Awaitable[None]] = None, batch: bool = False,
+                          batch_window: float = 0.01, batch_size: int = None, cache: bool = False,
+                          cache_ttl: float = 60, cache_size: int = 128, rate: float = None, rate_burst: int = 1,
+                          rate_policy: str = RATE_QUEUE, rate_queue: int = None, thread: bool = False):
         """Register a callback function to be callable from a received message.
 
         Args:
             name (str)[None]: Name of the callback function. If func the name will be populated from the func.__name__.
             func (callable)[None]: Callback function to call. If None a decorator wrapper will be returned.
+            batch (bool)[False]: If True the calls that happen within the batch window are grouped into one call.
+                The function receives a list of (args, kwargs) and can return a list with a result for each call.
+            batch_window (float)[0.01]: Seconds to wait for more calls after the first call of a batch.
+            batch_size (int)[None]: Maximum number of calls in one batch.
+            cache (bool)[False]: If True RunCommand reuses the result of a call with the same arguments and
+                identical calls that run at the same time share one call. Only use this for idempotent callbacks.
+            cache_ttl (float)[60]: Seconds a cached result is reused. None reuses results until they are evicted.
+            cache_size (int)[128]: Maximum number of cached results.
+            rate (float)[None]: Maximum calls per second for every schedule and command that uses the callback.
+                None is no limit.
+            rate_burst (int)[1]: Number of calls that can happen at once after the callback was idle.
+            rate_policy (str)['queue']: "queue" makes calls over the rate wait their turn. "drop" skips them.
+            rate_queue (int)[None]: Maximum number of calls waiting for the rate. Calls over this are dropped.
+            thread (bool)[False]: If True run the normal function in a thread so it does not block the loop and can
+                be stopped by a timeout. The function polls utils.get_cancel_token() to stop early.
 
         Returns:
             func (callable): If given func is None a decorator function will be returned else the given function.
@@ -165,105 +291,457 @@ class Scheduler(object):
 
         if func is None:
             def decorator(func):
-                return self.register_callback(name, func)
+                return self.register_callback(name, func, batch=batch, batch_window=batch_window,
+                                              batch_size=batch_size, cache=cache, cache_ttl=cache_ttl,
+                                              cache_size=cache_size, rate=rate, rate_burst=rate_burst,
+                                              rate_policy=rate_policy, rate_queue=rate_queue, thread=thread)
             return decorator
 
         if name is None:
             name = func.__name__
 
+        old = self.callbacks.get(name)
+        if old is not None:
+            self.batchers.pop(old, None)
+            self.limiters.pop(old, None)
+            self.threaded.discard(old)
+        if batch:
+            def runner(callback, items):
+                return self.profiler.call_async(name, 'batch', callback, items)
+            self.batchers[func] = Batcher(func, window=batch_window, max_size=batch_size, runner=runner,
+                                          loop=self._loop)
+        if thread:
+            self.threaded.add(func)
+        if rate is not None:
+            self.limiters[func] = TokenBucket(rate, burst=rate_burst, policy=rate_policy, max_queue=rate_queue,
+                                              loop=self._loop)
+        if cache:
+            self.caches[name] = ResultCache(ttl=cache_ttl, max_size=cache_size, loop=self._loop)
+        else:
+            self.caches.pop(name, None)
+
         self.callbacks[name] = func
         return func
 
+    def call_callback(self, callback_name: Union[str, None], name: str, callback: Callable[..., Awaitable[None]],
+                      *args, **kwargs) -> Awaitable:
+        """Return the awaitable that calls the callback through its batch or the profiler.
+
+        Args:
+            callback_name (str): Registered name of the callback. If None it is looked up when needed.
+            name (str): Schedule name (or other source) that is calling the callback.
+            callback (callable/awaitable): Function to call.
+            *args (tuple/object): Positional arguments to pass into the callback function.
+            **kwargs (dict/object): Keyword arguments to pass into the callback function.
+        """
+        try:
+            batcher = self.batchers.get(callback)
+            threaded = callback in self.threaded
+        except TypeError:  # Not hashable so it cannot be a batch or thread callback
+            batcher, threaded = None, False
+        if batcher is not None:
+            return batcher.submit(*args, **kwargs)
+        elif threaded:
+            return call_thread(callback, *args, **kwargs)
+        elif self.profiler.enabled:
+            if callback_name is None:
+                callback_name = self.get_callback_name(callback)
+            return self.profiler.call_async(callback_name, name, callback, *args, **kwargs)
+        return call_async(callback, *args, **kwargs)
+
+    def get_limiter(self, callback: Callable[..., Awaitable[None]]) -> Union[TokenBucket, None]:
+        """Return the rate limit of the callback or None if it does not have one."""
+        try:
+            return self.limiters.get(callback)
+        except TypeError:  # Not hashable so it cannot have a rate limit
+            return None
+
+    async def call_limited(self, limiter: TokenBucket, callback_name: str, make_coro: Callable[[], Awaitable]):
+        """Wait for the rate limit and await make_coro(). Raise an error if the rate limit dropped the call."""
+        if not await limiter.acquire():
+            self.counters['rate_dropped'] += 1
+            raise RuntimeError(f'Callback "{callback_name}" was dropped by its rate limit!')
+        return await make_coro()
+
+    def run_command(self, message: RunCommand, callback: Callable[..., Awaitable[None]]) -> Awaitable:
+        """Return the awaitable that runs the callback of the RunCommand message or returns its cached result."""
+        def call_command():
+            return self.call_callback(message.callback_name, 'RunCommand', callback, *message.args, **message.kwargs)
+
+        limiter = self.get_limiter(callback)
+        if limiter is None:
+            make_coro = call_command
+        else:
+            def make_coro():
+                return self.call_limited(limiter, message.callback_name, call_command)
+
+        cache = self.caches.get(message.callback_name)
+        if cache is None:
+            coro = make_coro()
+        else:
+            coro = cache.call(make_cache_key(message.args, message.kwargs), make_coro)
+        return trace_async(self.wait_timeout(coro, message.timeout, message.callback_name), message.callback_name,
+                           kind=COMMAND)
+
+    async def wait_timeout(self, awaitable: Awaitable, timeout: float = None, name: str = ''):
+        """Await with the timeout and count the timeouts. None is no timeout."""
+        if timeout is None:
+            return await awaitable
+        try:
+            return await call_timeout(awaitable, timeout, name)
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            raise
+
+    def get_callback_name(self, callback: Callable[..., Awaitable[None]]) -> str:
+        """Return the registered name of the callback function or the function name if it is not registered."""
+        for name, func in self.callbacks.items():
+            if func is callback:
+                return name
+        return getattr(callback, '__name__', str(callback))
+
+    def sorted_names(self) -> list:
+        """Return the schedule names in sorted order. The list is cached until a schedule is added or removed."""
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.tasks)
+        return self._sorted_names
+
+    def iter_schedules(self, prefix: str = '', callback_name: str = '', next_run_after: datetime.datetime = None,
+                       next_run_before: datetime.datetime = None, cursor: str = ''):
+        """Iterate over the (name, schedule, callback_name) of the matching schedules in name order.
+
+        Args:
+            prefix (str)['']: Only include schedules with a name that starts with this prefix.
+            callback_name (str)['']: Only include schedules that run this callback.
+            next_run_after (datetime.datetime)[None]: Only include schedules that run at or after this time.
+            next_run_before (datetime.datetime)[None]: Only include schedules that run before this time.
+            cursor (str)['']: Only include schedules with a name after this name (last name of the previous page).
+        """
+        names = self.sorted_names()
+        start = bisect.bisect_left(names, prefix)
+        if cursor:
+            start = max(start, bisect.bisect_right(names, cursor))
+
+        # Build the reverse lookup once instead of searching the callbacks for every schedule
+        registered = {id(func): name for name, func in self.callbacks.items()}
+
+        for i in range(start, len(names)):
+            name = names[i]
+            if prefix and not name.startswith(prefix):
+                break  # Sorted names with the prefix are all together
+            try:
+                _, sched, callback = self.tasks[name][:3]
+            except (KeyError, ValueError):
+                continue
+
+            cb_name = registered.get(id(callback)) or getattr(callback, '__name__', str(callback))
+            if callback_name and cb_name != callback_name:
+                continue
+            if next_run_after is not None or next_run_before is not None:
+                next_run = sched.next_run
+                if next_run is None or (next_run_after is not None and next_run < next_run_after) or \
+                        (next_run_before is not None and next_run >= next_run_before):
+                    continue
+            yield name, sched, cb_name
+
+    async def send_schedules(self, writer, message: ListSchedules):
+        """Send the schedules requested by the ListSchedules message.
+
+        A streamed reply is written in chunks and the loop is given a chance to run other tasks between chunks.
+        """
+        items = self.iter_schedules(prefix=message.prefix, callback_name=message.callback_name,
+                                    next_run_after=message.next_run_after, next_run_before=message.next_run_before,
+                                    cursor=message.cursor)
+        limit = message.limit if message.limit > 0 else None
+        chunk_size = max(message.chunk_size, 1) if message.stream else None
+
+        chunk = []
+        count = 0
+        last_name = ''
+        for name, sched, cb_name in items:
+            if limit is not None and count >= limit:
+                # There is another page. Continue after the last name that was sent.
+                writer.write(encode_message(ListSchedules(schedules=chunk, cursor=last_name)))
+                return
+            chunk.append(RunningSchedule(name=name, schedule=sched, callback_name=cb_name,
+                                         after=self.graph.get_after(name)))
+            count += 1
+            last_name = name
+
+            if chunk_size is not None and len(chunk) >= chunk_size:
+                writer.write(encode_message(ListSchedules(schedules=chunk, more=True)))
+                await writer.drain()
+                await asyncio.sleep(0)
+                chunk = []
+
+        writer.write(encode_message(ListSchedules(schedules=chunk)))
+
     async def handle_client(self, reader, writer):
         """Run the client. This code handles the communication between the client and server."""
         addr = writer.get_extra_info('peername')
         self.logger.info(f'Client connected {addr}')
 
+        if self.auth_token is not None:
+            try:
+                reader, writer = await asyncio.wait_for(authenticate_server(reader, writer, self.auth_token),
+                                                        self.auth_timeout)
+            except asyncio.TimeoutError:
+                self.counters['auth_failed'] += 1
+                self.logger.warning(f'Client {addr} did not authenticate in {self.auth_timeout} seconds!')
+                writer.close()
+                return
+            except (ConnectionError, Exception) as err:
+                self.counters['auth_failed'] += 1
+                self.logger.warning(f'Client {addr} did not authenticate! {err}')
+                writer.close()
+                return
+
         while self.is_serving() and not reader.at_eof() and not writer.is_closing():
             try:
-                data = await reader.read(self.READ_SIZE)
+                data = await reader.readline()
                 if not data:
                     continue
+            except AuthenticationError as err:
+                self.counters['auth_failed'] += 1
+                self.logger.warning(f'Closing client {addr}! {err}')
+                break
             except (TypeError, ValueError, Exception):
                 break
 
             try:
-                message = DataClass.from_json(data)
+                message = decode_message(data)
             except (TypeError, ValueError, Exception):
                 self.logger.error('Invalid data received!')
                 message = None
                 continue
 
-            if isinstance(message, Quit):
+            if self.draining and isinstance(message, (RunCommand, ScheduleCommand)):
+                writer.write(encode_message(Busy(message='Server is shutting down!')))
+                await writer.drain()
+
+            elif isinstance(message, Quit):
                 self.logger.info('Quit Received')
-                writer.write(Message(message='Stopping server').json().encode())
+                writer.write(encode_message(Message(message='Stopping server')))
                 await writer.drain()
-                await self.stop_async()
+                await self.shutdown_async(message.deadline)
                 try: self.loop.stop()
                 except: pass
-                try: self.loop.close()
-                except: pass
+
+            elif isinstance(message, Ping):
+                writer.write(encode_message(Ping()))
+                await writer.drain()
 
             elif isinstance(message, Update):
                 self.logger.info(f'Update "{message.module_name}" Received')
                 self.update_commands(module_name=message.module_name)
 
-                writer.write(Message(message=f'Updated Command {message.module_name}').json().encode())
+                reply = Message(message=f'Updated Command {message.module_name}')
+                manifest_path = message.manifest_path or (not message.module_name and self.manifest_path)
+                if manifest_path:
+                    try:
+                        if message.manifest_path:
+                            manifest_path = self.check_manifest_path(manifest_path)
+                        counts = self.load_manifest(manifest_path, save_path=not message.manifest_path)
+                        reply = Message(message=f'Updated Command {message.module_name} and manifest: '
+                                                + ', '.join(f'{n} {key}' for key, n in counts.items()))
+                    except Exception as err:
+                        print_exception(err, msg=f'Could not load the manifest "{manifest_path}"')
+                        reply = Error(message=f'Could not load the manifest "{manifest_path}"! {err}')
+                writer.write(encode_message(reply))
                 await writer.drain()
 
             elif isinstance(message, ListSchedules):
                 self.logger.info('List Schedules Received')
                 try:
-                    li = ListSchedules(schedules=[RunningSchedule(name=name, schedule=Schedule(**item[1].dict()))
-                                                  for name, item in self.tasks.items()])
-                    writer.write(li.json().encode())
+                    await self.send_schedules(writer, message)
                 except Exception as err:
                     print_exception(err, msg='Cannot read the list of schedules!')
-                    writer.write(Error(message='Cannot read the list of schedules!').json().encode())
+                    writer.write(encode_message(Error(message='Cannot read the list of schedules!')))
                 await writer.drain()
 
             elif isinstance(message, RunCommand):
                 self.logger.info(f'Run Command "{message.callback_name}" Received')
                 try:
                     cmd = self.callbacks[message.callback_name]
-                    await call_async(cmd, *message.args, **message.kwargs)
-                    writer.write(Message(message='Command "{}" ran successfully!'.format(message.callback_name)).json().encode())
+                    coro = self.run_command(message, cmd)
+                    if message.background:
+                        job = self.jobs.start(coro, message.callback_name)
+                        reply = self.get_job_status(job.job_id)
+                    else:
+                        await coro
+                        reply = Message(message='Command "{}" ran successfully!'.format(message.callback_name))
+                    writer.write(encode_message(reply))
                 except Exception as err:
                     print_exception(err, msg='Could not run command "{}"'.format(message.callback_name))
-                    writer.write(Error(message='Error in command "{}"'.format(message.callback_name)).json().encode())
+                    writer.write(encode_message(Error(message='Error in command "{}"'.format(message.callback_name))))
+                await writer.drain()
+
+            elif isinstance(message, JobResult):
+                if message.wait:
+                    await self.jobs.wait(message.job_id, message.timeout)
+                reply = self.get_job_status(message.job_id, JobResult)
+                try:
+                    data = encode_message(reply)
+                except (TypeError, ValueError, Exception):
+                    reply.result = repr(reply.result)  # Result cannot be serialized
+                    data = encode_message(reply)
+                writer.write(data)
+                await writer.drain()
+
+            elif isinstance(message, JobStatus):
+                writer.write(encode_message(self.get_job_status(message.job_id)))
+                await writer.drain()
+
+            elif isinstance(message, Subscribe):
+                self.logger.info(f'Subscribe Received')
+                writer.write(encode_message(Message(message='Subscribed to events')))
+                await writer.drain()
+                await self.send_events(reader, writer, message)
+
+            elif isinstance(message, Stats):
+                writer.write(encode_message(self.get_stats()))
+                await writer.drain()
+
+            elif isinstance(message, Profile):
+                self.logger.info(f'Profile Received')
+                try:
+                    writer.write(encode_message(self.get_profile(message)))
+                except Exception as err:
+                    print_exception(err, msg='Cannot read the profile!')
+                    writer.write(encode_message(Error(message=f'Cannot read the profile! {err}')))
+                await writer.drain()
+
+            elif isinstance(message, GetHistory):
+                history = self.history.get(message.name)
+                if history is None:
+                    reply = Error(message=f'No history for the schedule named "{message.name}"!')
+                else:
+                    reply = GetHistory(name=message.name, limit=message.limit, runs=history.runs(message.limit))
+                writer.write(encode_message(reply))
+                await writer.drain()
+
+            elif isinstance(message, CancelJob):
+                self.logger.info(f'Cancel Job "{message.job_id}" Received')
+                await self.jobs.cancel(message.job_id)
+                writer.write(encode_message(self.get_job_status(message.job_id)))
                 await writer.drain()
 
             elif isinstance(message, ScheduleCommand):
                 self.logger.info(f'Schedule Command "{message.name}" Received')
+                if self.lag.is_busy():
+                    self.counters['rejected'] += 1
+                    reply = Busy(message='Server is busy! Event loop lag is {:.3f} s'.format(self.lag.lag),
+                                 lag=self.lag.lag)
+                    writer.write(encode_message(reply))
+                    await writer.drain()
+                    continue
                 try:
                     s = message.schedule
+                    if message.priority is not None:
+                        s.priority = message.priority
                     cmd = self.callbacks[message.callback_name]
-                    self.add(message.name, s, cmd, *message.args, **message.kwargs)
-                    writer.write(Message(message='Scheduled Command "{}" is running!'.format(message.callback_name)).json().encode())
+                    self.add(message.name, s, cmd, *message.args, after=message.after, **message.kwargs)
+                    reply = Message(message='Scheduled Command "{}" is running!'.format(message.callback_name))
+                    writer.write(encode_message(reply))
                 except Exception as err:
                     print_exception(err, msg='Could not run command "{}"'.format(message.callback_name))
-                    writer.write(Error(message='Error in command "{}"'.format(message.callback_name)).json().encode())
+                    writer.write(encode_message(Error(message='Error in command "{}"'.format(message.callback_name))))
                 await writer.drain()
 
             elif isinstance(message, StopSchedule):
                 self.logger.info(f'Stop Schedule "{message.name}" Received')
                 try:
                     self.remove(message.name)
-                    writer.write(Message(message='Stopped running the schedule named "{}"!'.format(message.name)).json().encode())
+                    reply = Message(message='Stopped running the schedule named "{}"!'.format(message.name))
+                    writer.write(encode_message(reply))
                 except Exception as err:
                     print_exception(err, msg='Error while stopping schedule "{}"'.format(message.name))
-                    writer.write(Error(message='Error while stopping schedule "{}"'.format(message.name)).json().encode())
+                    reply = Error(message='Error while stopping schedule "{}"'.format(message.name))
+                    writer.write(encode_message(reply))
                 await writer.drain()
 
             else:
                 self.logger.info(f'Unknown Command Received')
-                writer.write(Error(message='Unknown command given!').json().encode())
+                writer.write(encode_message(Error(message='Unknown command given!')))
                 await writer.drain()
 
         # Close when ending
         writer.close()
         self.logger.info(f'Client closed {addr}')
 
+    async def send_events(self, reader, writer, message: Subscribe):
+        """Send events to the subscribed connection until the connection is closed."""
+        sub = self.events.subscribe(names=message.names, prefix=message.prefix, events=message.events,
+                                    max_queue=message.max_queue)
+        closed = self.loop.create_task(reader.read())  # The client does not send anything else
+        try:
+            while not writer.is_closing():
+                get_event = self.loop.create_task(sub.get())
+                await asyncio.wait([get_event, closed], return_when=asyncio.FIRST_COMPLETED)
+                if not get_event.done():
+                    get_event.cancel()
+                    break
+
+                writer.write(encode_message(get_event.result()))
+                await writer.drain()  # Events wait in the bounded subscriber queue while the client is slow
+        except (ConnectionError, Exception):
+            pass
+        finally:
+            self.events.unsubscribe(sub)
+            closed.cancel()
+
+    def get_stats(self) -> Stats:
+        """Return a Stats message with the current server statistics."""
+        counters = dict(self.counters)
+        if self.batchers:
+            counters['batch_calls'] = sum(batcher.calls for batcher in self.batchers.values())
+            counters['batched'] = sum(batcher.submitted for batcher in self.batchers.values())
+        if self.limiters:
+            counters['rate_queued'] = sum(limiter.queued for limiter in self.limiters.values())
+        if self.caches:
+            counters['cache_hits'] = sum(cache.hits for cache in self.caches.values())
+            counters['cache_misses'] = sum(cache.misses for cache in self.caches.values())
+            counters['cache_shared'] = sum(cache.shared for cache in self.caches.values())
+        return Stats(lag=self.lag.lag, max_lag=self.lag.max_lag, level=self.lag.level, schedules=len(self.tasks),
+                     running_jobs=len(self.jobs.running), counters=counters,
+                     lateness=self.lateness.summary(), jitter=self.jitter.summary(),
+                     dead_letters=list(self.dead_letters), rate_limits=self.get_rate_limits())
+
+    def get_rate_limits(self) -> dict:
+        """Return the rate, queue depth and counts of every rate limited callback."""
+        limits = {}
+        for name, func in self.callbacks.items():
+            limiter = self.get_limiter(func)
+            if limiter is not None:
+                limits[name] = {'rate': limiter.rate, 'policy': limiter.policy, 'depth': limiter.depth,
+                                'allowed': limiter.allowed, 'queued': limiter.queued, 'dropped': limiter.dropped}
+        return limits
+
+    def get_profile(self, message: Profile) -> Profile:
+        """Change the profiler settings and return a Profile message with the callbacks that blocked the most."""
+        if message.enabled is not None:
+            self.profiler.enabled = message.enabled
+        if message.slow_threshold is not None:
+            self.profiler.slow_threshold = message.slow_threshold
+
+        profiles = [stats.to_message() for stats in self.profiler.top(message.sort, message.limit)]
+        if message.reset:
+            self.profiler.reset()
+        return Profile(profiles=profiles, sort=message.sort, limit=message.limit, enabled=self.profiler.enabled,
+                       slow_threshold=self.profiler.slow_threshold)
+
+    def get_job_status(self, job_id: str, cls=JobStatus) -> JobStatus:
+        """Return a JobStatus (or JobResult) message for the background job."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return cls(job_id=job_id, status=UNKNOWN)
+
+        reply = cls(job_id=job.job_id, callback_name=job.callback_name, status=job.status, error=job.error,
+                    started=job.started, finished=job.finished)
+        if isinstance(reply, JobResult):
+            reply.result = job.result
+        return reply
+
     def is_serving(self) -> bool:
         """Return if the server is running."""
         try:
@@ -287,10 +765,21 @@ class Scheduler(object):
             self.ip_address = addr
         if isinstance(port, int):
             self.port = port
-        self.server = await asyncio.start_server(self.handle_client, self.ip_address, self.port, loop=self.loop, **kwargs)
-
-        addr = self.server.sockets[0].getsockname()
+        kwargs.setdefault('limit', self.MESSAGE_LIMIT)
+        if self.ssl_context is not None:
+            kwargs.setdefault('ssl', self.ssl_context)
+        if is_unix_address(self.ip_address):
+            path = get_unix_path(self.ip_address)
+            if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+                os.remove(path)  # Remove a stale socket file left by a previous server
+            self.server = await asyncio.start_unix_server(self.handle_client, path, **kwargs)
+            addr = self.ip_address
+        else:
+            self.server = await asyncio.start_server(self.handle_client, self.ip_address, self.port, **kwargs)
+            addr = self.server.sockets[0].getsockname()
+            self.port = addr[1]  # Update the port if 0 was given for any available port
         self.logger.info(f'Started Serving on {addr}')
+        self.lag.start()
 
         try:
             async with self.server:
@@ -301,12 +790,13 @@ class Scheduler(object):
     def stop(self):
         """Stop running the server."""
         self.logger.info('Attempting to stop the server')
+        self.lag.stop()
         try:
             self.server.close()
         except (AttributeError, Exception):
             pass
         try:
-            self.server_task.stop()
+            self.server_task.cancel()
         except (AttributeError, Exception):
             pass
 
@@ -316,22 +806,472 @@ class Scheduler(object):
         """Stop the server from running."""
         return self.stop()
 
-    def add(self, name: str, schedule: Schedule, callback: Callable[..., Awaitable[None]] = None, *args, **kwargs):
-        """Add a schedule to run.
+    async def shutdown_async(self, deadline: float = None):
+        """Stop the server gracefully.
+
+        Stop accepting connections and starting new runs, wait up to the deadline for the running callbacks and
+        background jobs to finish, save the last run of every schedule to the state path and stop the schedules.
+
+        Args:
+            deadline (float)[None]: Seconds to wait for the running callbacks. If None use the drain_timeout.
+        """
+        if deadline is None:
+            deadline = self.drain_timeout
+        self.draining = True
+        self.logger.info(f'Draining {self.active_runs} running callbacks and {len(self.jobs.running)} jobs')
+        try:
+            self.server.close()
+        except (AttributeError, Exception):
+            pass
+
+        end = self.loop.time() + deadline
+        try:
+            await asyncio.wait_for(self.drained.wait(), deadline)
+        except asyncio.TimeoutError:
+            self.logger.warning(f'{self.active_runs} callbacks are still running after {deadline} seconds')
+        jobs = [job.task for job in self.jobs.running.values()]
+        if jobs:
+            await asyncio.wait(jobs, timeout=max(end - self.loop.time(), 0))
+
+        self.save_state()
+        for name in list(self.tasks):
+            self.remove(name)
+        self.jobs.cancel_all()
+        self.stop()
+
+    def handle_signal(self, deadline: float = None):
+        """Shut down gracefully and stop the event loop."""
+        if self.shutdown_task is None:
+            self.logger.info('Shutdown signal received')
+            self.shutdown_task = self.loop.create_task(self.shutdown_async(deadline), name='shutdown')
+            self.shutdown_task.add_done_callback(lambda task: self.loop.stop())
+
+    def add_signal_handlers(self, signals: Iterable[int] = (signal.SIGTERM, signal.SIGINT), deadline: float = None):
+        """Shut down gracefully when the process receives one of the signals. Only works on Unix event loops."""
+        for sig in signals:
+            self.loop.add_signal_handler(sig, self.handle_signal, deadline)
+
+    def load_state(self) -> dict:
+        """Return the saved schedule state from the state path."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f).get('schedules', {})
+        except (OSError, ValueError, AttributeError, Exception) as err:
+            print_exception(err, msg=f'Could not load the schedule state from "{self.state_path}"')
+            return {}
+
+    def save_state(self):
+        """Save the last run of every schedule to the state path. The file is replaced in one step."""
+        if not self.state_path:
+            return
+        schedules = {}
+        for name, (task, sched, *_) in self.tasks.items():
+            if sched.last_run is not None:
+                schedules[name] = {'last_run': sched.last_run.isoformat()}
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'saved': get_clock().now().isoformat(), 'schedules': schedules}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def snapshot(self, path: str) -> int:
+        """Save every schedule with its callback name, arguments and run times to a binary file.
+
+        This blocks until the file is written. Use snapshot_async while the server is running.
+
+        Args:
+            path (str): File to write the snapshot to.
+
+        Returns:
+            count (int): Number of schedules saved.
+        """
+        items = self.copy_schedules()
+        write_snapshot(path, items)
+        return len(items)
+
+    async def snapshot_async(self, path: str, chunk_size: int = 5000) -> int:
+        """Save every schedule to a binary file without blocking the event loop.
+
+        The values of the schedules are copied on the loop, chunk_size schedules at a time, so every schedule is
+        saved as it was between two of its runs. Then they are packed and written from a thread.
+
+        Args:
+            path (str): File to write the snapshot to.
+            chunk_size (int)[5000]: Number of schedules to copy before letting the loop run other tasks.
+
+        Returns:
+            count (int): Number of schedules saved.
+        """
+        names = list(self.tasks)
+        items = []
+        for i in range(0, len(names), chunk_size):
+            if i:
+                await asyncio.sleep(0)
+            items.extend(self.copy_schedules(names[i: i + chunk_size]))
+        await self.loop.run_in_executor(None, write_snapshot, path, items)
+        return len(items)
+
+    def copy_schedules(self, names: Iterable[str] = None) -> list:
+        """Return (name, values, callback_name, args, kwargs, after) for the snapshot of each schedule.
+
+        Args:
+            names (list)[None]: Schedule names to copy. If None copy every schedule.
+        """
+        registered = {id(func): name for name, func in self.callbacks.items()}
+        items = []
+        for name in (self.tasks if names is None else names):
+            try:
+                task, sched, callback, args, kwargs = self.tasks[name]
+            except KeyError:
+                continue  # Removed while the snapshot was taken
+            cb_name = registered.get(id(callback)) or getattr(callback, '__name__', str(callback))
+            after = self.graph.get_after(name) if name in self.graph else ()
+            items.append((name, get_values(sched), cb_name, args, kwargs, after))
+        return items
+
+    def restore(self, path: str) -> int:
+        """Add every schedule from a snapshot file. The schedules continue from their saved run times.
+
+        Schedules with a callback name that is not registered are skipped.
+
+        Args:
+            path (str): Snapshot file written by snapshot or snapshot_async.
+
+        Returns:
+            count (int): Number of schedules added.
+        """
+        with paused_gc():  # The loop is blocked, so pausing the collector does not affect the other tasks
+            return self.add_restored(read_snapshot(path))
+
+    async def restore_async(self, path: str, chunk_size: int = 5000) -> int:
+        """Read the snapshot file in a thread and add every schedule from it without blocking the event loop.
+
+        The garbage collector is not paused, because other tasks and threads run while the file is read.
+
+        Args:
+            path (str): Snapshot file written by snapshot or snapshot_async.
+            chunk_size (int)[5000]: Number of schedules to add before letting the loop run other tasks.
+
+        Returns:
+            count (int): Number of schedules added.
+        """
+        items = await self.loop.run_in_executor(None, read_snapshot, path)
+        count = 0
+        for i in range(0, len(items), chunk_size):
+            if i:
+                await asyncio.sleep(0)
+            count += self.add_restored(items[i: i + chunk_size])
+        return count
+
+    def add_restored(self, items: Iterable[tuple]) -> int:
+        """Add the (name, schedule, callback_name, args, kwargs, after) items read from a snapshot."""
+        count = 0
+        for name, sched, callback_name, args, kwargs, after in items:
+            try:
+                callback = self.callbacks[callback_name]
+            except KeyError:
+                self.logger.error(f'Cannot restore "{name}"! Callback "{callback_name}" is not registered.')
+                continue
+            self.add(name, sched, callback, *args, after=after, **kwargs)
+            count += 1
+        return count
+
+    def check_manifest_path(self, path: str) -> str:
+        """Return the real path of a manifest a client asked for.
+
+        A client can only load the manifest_path or another file in the same directory, so it cannot make the
+        server read any file. Without a manifest_path a client cannot name a manifest.
+
+        Raises:
+            PermissionError: If the file is not in the directory of the manifest_path.
+        """
+        if not self.manifest_path:
+            raise PermissionError('The server does not have a manifest_path to load manifests from!')
+        directory = os.path.dirname(os.path.realpath(self.manifest_path))
+        real_path = os.path.realpath(os.path.join(directory, path))
+        if os.path.dirname(real_path) != directory:
+            raise PermissionError(f'The manifest "{path}" is not in the directory of the server manifest!')
+        return real_path
+
+    def load_manifest(self, path: str = None, save_path: bool = True) -> dict:
+        """Add the schedules of the manifest file and remove the schedules that were taken out of it.
+
+        The file is diffed against the last manifest that was loaded. Only added or changed entries are (re)added
+        and only the entries that are no longer in the file are removed, so unchanged schedules keep their timers,
+        last run and history. Schedules that were not added by a manifest are never removed.
+
+        Args:
+            path (str)[None]: JSON, TOML or YAML manifest file. If None use the manifest_path.
+            save_path (bool)[True]: If True the path becomes the manifest_path that an Update without a module name
+                reloads. The path a client sends is not saved.
+
+        Returns:
+            counts (dict): Number of schedules that were added, changed, removed, unchanged and failed.
+        """
+        if path is None:
+            path = self.manifest_path
+        entries = read_manifest(path)
+        if save_path:
+            self.manifest_path = path
+        added, changed, removed, unchanged = diff_manifest(self.manifest, entries)
+
+        for name in removed:
+            self.manifest.pop(name, None)
+            self.remove(name)
+
+        failed = 0
+        keep = set(unchanged)
+        for name, entry in entries.items():
+            callback = self.callbacks.get(entry['callback'])
+            running = self.tasks.get(name)
+            if callback is None:
+                self.logger.error(f'Cannot add "{name}"! Callback "{entry["callback"]}" is not registered.')
+                failed += 1  # The entry is not saved, so the next load tries again
+            elif name in keep and running is not None:
+                running[2] = callback  # Keep the timer, but run the callback that was registered last
+            else:
+                try:
+                    self.add(name, make_schedule(entry), callback, *entry['args'], after=entry['after'],
+                             **entry['kwargs'])
+                    self.manifest[name] = entry
+                except Exception as err:
+                    print_exception(err, msg=f'Cannot add "{name}" from the manifest')
+                    failed += 1
+
+        counts = {'added': len(added), 'changed': len(changed), 'removed': len(removed),
+                  'unchanged': len(unchanged), 'failed': failed}
+        self.logger.info(f'Loaded manifest "{path}": {counts}')
+        return counts
+
+    def add(self, name: str, schedule: Schedule, callback: Callable[..., Awaitable[None]] = None, *args,
+            after: Iterable[str] = None, **kwargs):
+        """Add a schedule to run or update the running schedule with the same name.
+
+        Adding a name that is running again (like reloading a module) only changes what is different. The running
+        task and Schedule object are kept, so the schedule keeps its timing, history and any callback in flight.
+        A new callback or arguments are used from the next firing. New settings are copied to the running Schedule
+        and a timing change makes the next run again. Only a change of the after names replaces the task.
+
+        A schedule added here is no longer owned by the manifest, so a reload that drops the name does not remove it.
 
         Args:
             name (str): Name of the schedule
-            schedule (Schedule): Schedule to run.
+            schedule (Schedule): Schedule to run. If after is given only the options of the schedule are used (like
+                retries and priority) and the schedule runs when the schedules it runs after succeeded.
             callback (callable/awaitable): Function to run on the given schedule.
             *args (tuple/object): Positional arguments to pass into the callback function.
+            after (list)[None]: Names of the schedules that must all succeed before this schedule runs.
             **kwargs (dict/object): Keyword arguments to pass into the callback function.
         """
+        if schedule is None:
+            schedule = Schedule()
+        self.manifest.pop(name, None)  # load_manifest saves the entry again after it adds the schedule
+        after = sorted(set(after)) if after else []
+        running = self.tasks.get(name)
+        if running is not None and not running[0].done() and after == self.graph.get_after(name):
+            self.update(name, running, schedule, callback, args, kwargs)
+            return
+        if after:
+            self.graph.check(name, after)  # Raise an error before the old schedule is removed
+
         # Remove any old tasks with the same name
         self.remove(name)
 
+        # Continue from the last run saved by the last shutdown
+        saved = self.saved_state.pop(name, None)
+        if saved is not None and schedule.last_run is None and saved.get('last_run'):
+            schedule.reschedule(datetime.datetime.fromisoformat(saved['last_run']))
+
         # Start a new task
-        task = self.loop.create_task(schedule.run_async(callback, *args, **kwargs), name=name)
-        self.tasks[name] = [task, schedule]
+        if after:
+            self.graph.add(name, after)
+            task = self.loop.create_task(self.run_dependent(name, schedule), name=name)
+        else:
+            task = self.loop.create_task(self.run_schedule(name, schedule), name=name)
+        self.tasks[name] = [task, schedule, callback, args, kwargs]
+        if self.history_size:
+            self.history[name] = RunHistory(self.history_size)
+        self._sorted_names = None
+        self.events.publish(ADDED, name)
+
+    def update(self, name: str, running: list, schedule: Schedule, callback: Callable[..., Awaitable[None]],
+               args: tuple, kwargs: dict):
+        """Update the running schedule in place with the values given to add.
+
+        Args:
+            name (str): Name of the running schedule.
+            running (list): [task, schedule, callback, args, kwargs] of the running schedule.
+            schedule (Schedule): Schedule with the new settings.
+            callback (callable/awaitable): Function to run from the next firing.
+            args (tuple): Positional arguments to pass into the callback function.
+            kwargs (dict): Keyword arguments to pass into the callback function.
+        """
+        task, sched = running[:2]
+        changed = [] if schedule is sched else sched.changed_settings(schedule)
+        if callback is running[2] and args == running[3] and kwargs == running[4] and not changed:
+            self.counters['unchanged'] += 1
+            return
+
+        running[2:] = [callback, args, kwargs]  # dispatch reads these on every firing
+        if changed:
+            sched.update_settings(schedule, changed)
+            if name in self.sleeping and any(key in TIMING_KEYS for key in changed):
+                # Only the sleep until the old next run is cancelled. A firing in flight finishes on its own.
+                task.cancel()
+                running[0] = self.loop.create_task(self.run_schedule(name, sched), name=name)
+        self.counters['updated'] += 1
+        self.events.publish(ADDED, name)
+
+    async def run_schedule(self, name: str, sched: Schedule):
+        """Run the schedule until it ends like Schedule.run_async. The timeout only limits the callback."""
+        sleeping = self.sleeping
+        while sched.retry_run is not None or not sched.past_end():
+            sleeping.add(name)  # Not removed when cancelled, because update starts the next task right away
+            await sched.wait_async()
+            sleeping.discard(name)
+            if self.draining:
+                break  # A run that comes due while draining is left to the next start, so it is not saved as run
+            if sched.skip_missed():
+                continue
+            last_run, last_due = sched.last_run, sched.last_due
+            sched.start_run()
+            if not await self.run_once(name, sched):
+                sched.last_run, sched.last_due = last_run, last_due
+                break
+
+    async def run_dependent(self, name: str, sched: Schedule):
+        """Run the schedule every time all of the schedules it runs after succeeded."""
+        while True:
+            last_run, last_due = sched.last_run, sched.last_due
+            if sched.retry_run is not None:
+                await sched.wait_async()
+                sched.start_run()
+            else:
+                await self.graph.wait_ready(name)
+                sched.last_due = sched.last_run = get_clock().now()
+
+            async with self.graph.gate.slot(sched.priority):
+                if not await self.run_once(name, sched):
+                    sched.last_run, sched.last_due = last_run, last_due
+                    break
+
+    async def run_once(self, name: str, sched: Schedule) -> bool:
+        """Dispatch one run of the schedule and save the retry state. Return False if draining stopped the run.
+
+        A retry that was dropped before it ran is set again, so the failure is still retried or dead lettered.
+        """
+        try:
+            result = await self.dispatch(name)
+            if result is DRAINED:
+                return False
+            elif result is NOT_RUN:
+                sched.retry_later()
+            else:
+                sched.run_succeeded()
+        except Exception as err:
+            self.logger.critical(f'Error in Task "{name}": {err}')
+            sched.run_failed(err)
+        return True
+
+    def upstream_failed(self, name: str, error: str):
+        """Tell the subscribers that the schedule will not run because a schedule it runs after failed."""
+        self.counters['upstream_failed'] += 1
+        self.events.publish(FAILED, name, error=error)
+
+    async def wait_turn(self, sched: Schedule) -> bool:
+        """Wait until the schedule can start and take a slot of the priority gate.
+
+        While the loop is overloaded a "skip" schedule returns False without a slot. A "defer" schedule gives its
+        slot back and waits until the lag clears. The schedule task waits here so the runs it misses are coalesced.
+        """
+        deferred = False
+        while True:
+            if not (sched.spin > 0 and self.gate.try_acquire()):  # Precise schedules do not wait for the ordering
+                await self.gate.acquire(sched.priority)
+            if deferred or not self.lag.is_shedding() or sched.shed not in (SHED_SKIP, SHED_DEFER):
+                return True
+
+            self.gate.release()
+            if sched.shed == SHED_SKIP:
+                self.counters['skipped'] += 1
+                return False
+            self.counters['deferred'] += 1
+            deferred = True
+            await self.lag.wait_clear()
+
+    async def dispatch(self, name: str):
+        """Run the callback of the named schedule. The schedule calls this every time it fires."""
+        task, sched, callback, args, kwargs = self.tasks[name]
+        if self.draining:
+            return DRAINED
+        history = self.history.get(name)
+        limiter = self.get_limiter(callback)
+        if limiter is not None and not await limiter.acquire():
+            self.counters['rate_dropped'] += 1
+            self.record_run(history, sched, DROPPED)
+            return NOT_RUN
+        if not await self.wait_turn(sched):
+            self.record_run(history, sched, SKIPPED)
+            return NOT_RUN
+        if self.draining:
+            self.gate.release()
+            return DRAINED
+
+        self.active_runs += 1
+        self.drained.clear()
+        started = get_clock().time()
+        lateness = 0.0
+        outcome = CANCELLED
+        try:
+            if sched.last_due is not None:
+                lateness = (get_clock().now() - sched.last_due).total_seconds()
+                self.lateness.record(sched.priority, lateness)
+            if sched.spin > 0:
+                self.jitter.record(name, sched.last_jitter)
+
+            self.events.publish(FIRED, name)
+            try:
+                with RunContext(name, sched.last_due):
+                    result = await self.wait_timeout(self.call_callback(None, name, callback, *args, **kwargs),
+                                                     sched.timeout, name)
+            except Exception as err:
+                outcome = TIMEOUT if isinstance(err, asyncio.TimeoutError) else RUN_FAILED
+                self.events.publish(FAILED, name, error=str(err))
+                self.run_failed(name, sched, callback, err)
+                raise
+            outcome = SUCCEEDED
+            self.events.publish(FINISHED, name)
+            self.graph.succeeded(name)
+            return result
+        finally:
+            if history is not None:
+                history.record(started, lateness, get_clock().time() - started, outcome)
+            self.gate.release()
+            self.active_runs -= 1
+            if self.active_runs == 0:
+                self.drained.set()
+
+    @staticmethod
+    def record_run(history: Union[RunHistory, None], sched: Schedule, outcome: str):
+        """Save a run that did not call the callback to the history."""
+        if history is not None:
+            now = get_clock().time()
+            lateness = 0.0
+            if sched.last_due is not None:
+                lateness = now - sched.last_due.timestamp()
+            history.record(now, lateness, 0.0, outcome)
+
+    def run_failed(self, name: str, sched: Schedule, callback: Callable[..., Awaitable[None]], err: Exception):
+        """Count the retry or save the run to the dead letters if the schedule gives up on the run."""
+        if sched.will_retry():
+            self.counters['retries'] += 1
+        else:
+            self.counters['dead_letters'] += 1
+            self.dead_letters.append({'name': name, 'callback_name': self.get_callback_name(callback),
+                                      'error': str(err), 'attempts': sched.attempt + 1,
+                                      'time': get_clock().now().isoformat()})
+            self.graph.failed(name, str(err))
 
     def remove(self, name: str):
         """Remove and stop running a schedule.
@@ -339,16 +1279,19 @@ class Scheduler(object):
         Args:
             name (str): Name of the schedule
         """
+        self.graph.remove(name)
         try:
-            task, sched = self.tasks.pop(name)
+            task, sched = self.tasks.pop(name)[:2]
+            self.history.pop(name, None)
+            self.sleeping.discard(name)
+            self._sorted_names = None
+            self.events.publish(REMOVED, name)
             try:
                 task.cancel()
             except:
                 pass
-            try:
-                sched.stop()
-            except:
-                pass
+            # End the schedule like Schedule.stop without its search of every task on the loop for the task
+            sched.end_on = get_clock().now()
         except (KeyError, Exception):
             pass
 
@@ -0,0 +1,371 @@
+import time
+import asyncio
+import datetime
+from collections import Counter
+from itertools import accumulate, repeat
+from operator import add, floordiv, sub
+from typing import Awaitable, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from . import utils
+from .schedule import Schedule
+
+
+__all__ = ['iter_run_times', 'preview', 'get_run_offsets', 'Simulation', 'simulate', 'VirtualClock']
+
+
+ONE_US = datetime.timedelta(microseconds=1)
+US = 1000000
+MAX_STEPS = 10000000  # Stop a schedule that makes more run times than this while fast forwarding to the start
+
+
+def get_first_run(sched: Schedule, start: datetime.datetime) -> Union[datetime.datetime, None]:
+    """Return the first run time of the schedule at or after the start without changing the schedule."""
+    if sched.retry_run is not None:
+        dt = sched.retry_run
+    elif sched._next_run is not None:
+        dt = sched._next_run
+    else:
+        dt = sched.get_run_after(sched.last_run or sched.start_on or start)
+
+    interval = sched.interval
+    if dt is None or dt >= start or not sched.repeat:
+        return dt if dt is None or dt >= start else None
+    elif sched.at is None and len(sched.allowed_weekdays()) == 7 and interval > datetime.timedelta(0):
+        return dt + interval * -((dt - start) // interval)  # Jump over the runs before the start at once
+
+    for _ in range(MAX_STEPS):
+        next_dt = sched.get_run_after(dt)
+        if next_dt is None or next_dt <= dt or next_dt >= start:
+            return next_dt if next_dt is not None and next_dt > dt else None
+        dt = next_dt
+    return None
+
+
+def iter_run_times(sched: Schedule, start: datetime.datetime = None,
+                   end: datetime.datetime = None) -> Iterator[datetime.datetime]:
+    """Yield the run times of the schedule from start to end on a virtual clock without sleeping.
+
+    The runs are made with Schedule.get_run_after like a server that runs every schedule on time. The schedule is not
+    changed. Runs before the start are skipped and a run at or after the end_on of the schedule does not happen.
+
+    Args:
+        sched (Schedule): Schedule to play forward.
+        start (datetime.datetime)[None]: Time the virtual clock starts at. If None use now.
+        end (datetime.datetime)[None]: Last time to include. If None yield run times until the schedule ends.
+    """
+    if start is None:
+        start = datetime.datetime.now()
+    end_on = sched.end_on
+    dt = get_first_run(sched, start)
+    while dt is not None and (end is None or dt <= end) and (end_on is None or dt < end_on):
+        yield dt
+        if not sched.repeat:
+            break
+        next_dt = sched.get_run_after(dt)
+        if next_dt is None or next_dt <= dt:
+            break  # No interval would run the schedule at the same time forever
+        dt = next_dt
+
+
+def preview(sched: Schedule, count: int = 10, start: datetime.datetime = None) -> List[datetime.datetime]:
+    """Return the next count run times of the schedule."""
+    times = []
+    for dt in iter_run_times(sched, start):
+        if len(times) >= count:
+            break
+        times.append(dt)
+    return times
+
+
+def get_run_offsets(sched: Schedule, start: datetime.datetime, end: datetime.datetime) -> Sequence[int]:
+    """Return the run times from start to end as microseconds after the start.
+
+    A schedule with a plain interval returns a range, so its runs are never made one at a time.
+    """
+    interval = sched.interval
+    if (sched.repeat and sched.at is None and len(sched.allowed_weekdays()) == 7 and
+            interval >= datetime.timedelta(microseconds=1) and sched.retry_run is None):
+        first = get_first_run(sched, start)
+        if first is None:
+            return range(0)
+        stop = (end - start) // ONE_US + 1
+        if sched.end_on is not None:
+            stop = min(stop, (sched.end_on - start) // ONE_US)
+        return range((first - start) // ONE_US, stop, interval // ONE_US)
+    return [(dt - start) // ONE_US for dt in iter_run_times(sched, start, end)]
+
+
+class Simulation(object):
+    """Firing timeline of a set of schedules that was played forward on a virtual clock.
+
+    The time range is split into slots of resolution seconds. A run is active in every slot from the slot it starts
+    in until the slot it ends in, so runs that start in the same slot overlap even if they take no time.
+
+    Args:
+        start (datetime.datetime): Time the simulation started at.
+        end (datetime.datetime): Last time of the simulation.
+        bucket (float)[60]: Seconds in each reported bucket. A multiple of the resolution.
+        resolution (float)[1]: Seconds in each slot the concurrency is counted in.
+    """
+    def __init__(self, start: datetime.datetime, end: datetime.datetime, bucket: float = 60, resolution: float = 1):
+        self.start = start
+        self.end = end
+        self.resolution = resolution
+        self.slot_us = max(int(resolution * US), 1)
+        self.slots_per_bucket = max(int(round(bucket / resolution)), 1)
+        self.bucket = self.slots_per_bucket * self.slot_us / US
+        self.num_slots = (end - start) // ONE_US // self.slot_us + 1
+
+        self.runs = {}  # {name: number of runs}
+        self._starts = Counter()  # {slot: number of runs that started}
+        self._ends = Counter()  # {slot: number of runs that ended}
+        self._start_steps = {}  # {stride: [start or stop of the runs that repeat every stride slots]}
+        self._end_steps = {}
+        self._timeline = None
+
+    def add_steps(self, steps: dict, first: int, stride: int, count: int):
+        """Add count runs every stride slots from the first slot as a +1 at the first slot and -1 after the last."""
+        size = self.num_slots
+        if first >= size:
+            return
+        try:
+            diff = steps[stride]
+        except KeyError:
+            diff = steps[stride] = [0] * size
+        diff[first] += 1
+        stop = first + stride * count
+        if stop < size:
+            diff[stop] -= 1
+
+    def add(self, name: str, offsets: Sequence[int], duration: float = 0):
+        """Add the run start times in microseconds after the start of one schedule that runs for duration seconds.
+
+        A range with a step of whole slots is added in constant time. The runs of other offsets are counted one at a
+        time.
+        """
+        slot = self.slot_us
+        last = max(int(duration * US), 1) - 1  # The end slot is the slot after the last slot the run is active in
+        self.runs[name] = len(offsets)
+        self._timeline = None
+        if isinstance(offsets, range) and len(offsets) > 1 and offsets.step % slot == 0:
+            first, stride, count = offsets[0], offsets.step // slot, len(offsets)
+            self.add_steps(self._start_steps, first // slot, stride, count)
+            self.add_steps(self._end_steps, (first + last) // slot + 1, stride, count)
+        elif offsets:
+            self._starts.update(map(floordiv, offsets, repeat(slot)))
+            self._ends.update(map(add, map(floordiv, map(add, offsets, repeat(last)), repeat(slot)), repeat(1)))
+
+    def count_slots(self, counts: Counter, steps: dict) -> List[int]:
+        """Return the number of runs in each slot from the single runs and the repeating runs."""
+        size = self.num_slots
+        totals = [0] * size
+        for i, count in counts.items():
+            if i < size:
+                totals[i] += count
+        for stride, diff in steps.items():
+            for i in range(min(stride, size)):
+                diff[i::stride] = accumulate(diff[i::stride])
+            totals = list(map(add, totals, diff))
+        return totals
+
+    def get_timeline(self) -> Tuple[List[int], List[int]]:
+        """Return the number of runs that start in each slot and the number of runs active in each slot."""
+        if self._timeline is None:
+            starts = self.count_slots(self._starts, {s: list(d) for s, d in self._start_steps.items()})
+            ends = self.count_slots(self._ends, {s: list(d) for s, d in self._end_steps.items()})
+            self._timeline = starts, list(accumulate(map(sub, starts, ends)))
+        return self._timeline
+
+    @property
+    def starts(self) -> List[int]:
+        """Return the number of runs that start in each slot."""
+        return self.get_timeline()[0]
+
+    @property
+    def active(self) -> List[int]:
+        """Return the number of active runs in each slot."""
+        return self.get_timeline()[1]
+
+    @property
+    def total_runs(self) -> int:
+        return sum(self.runs.values())
+
+    def get_time(self, slot: int) -> datetime.datetime:
+        """Return the start time of the slot."""
+        return self.start + datetime.timedelta(microseconds=slot * self.slot_us)
+
+    @property
+    def peak(self) -> int:
+        """Return the largest number of runs active at once."""
+        return max(self.active, default=0)
+
+    @property
+    def peak_time(self) -> Union[datetime.datetime, None]:
+        """Return the start of the first slot with the peak number of active runs."""
+        active = self.active
+        if not active:
+            return None
+        return self.get_time(active.index(max(active)))
+
+    def get_buckets(self) -> List[dict]:
+        """Return a dict with the time, number of firings and peak concurrency of every bucket."""
+        starts, active = self.get_timeline()
+        size = self.slots_per_bucket
+        return [{'time': self.get_time(i), 'firings': sum(starts[i: i + size]), 'concurrency': max(active[i: i + size])}
+                for i in range(0, self.num_slots, size)]
+
+    def get_histograms(self) -> Dict[str, Dict[int, int]]:
+        """Return {"firings": {firings: number of buckets}, "concurrency": {active runs: number of slots}}."""
+        buckets = self.get_buckets()
+        return {'firings': dict(sorted(Counter(bucket['firings'] for bucket in buckets).items())),
+                'concurrency': dict(sorted(Counter(self.active).items()))}
+
+    def busiest(self, count: int = 10) -> List[dict]:
+        """Return the buckets with the most firings."""
+        return sorted(self.get_buckets(), key=lambda bucket: bucket['firings'], reverse=True)[:count]
+
+    def summary(self) -> dict:
+        """Return the main numbers of the simulation."""
+        firings = [bucket['firings'] for bucket in self.get_buckets()]
+        return {'schedules': len(self.runs), 'runs': self.total_runs, 'buckets': len(firings),
+                'bucket_seconds': self.bucket, 'max_firings': max(firings, default=0),
+                'mean_firings': sum(firings) / len(firings) if firings else 0.0,
+                'peak_concurrency': self.peak, 'peak_time': self.peak_time}
+
+
+def simulate(schedules: Union[Dict[str, Schedule], Iterable[Schedule]], start: datetime.datetime = None,
+             end: datetime.datetime = None, duration: Union[float, Dict[str, float]] = 0, bucket: float = 60,
+             resolution: float = 1) -> Simulation:
+    """Play the schedules forward from start to end on a virtual clock and return the Simulation.
+
+    Nothing sleeps and the schedules are not changed, so a day of 10,000 schedules can be checked before they are
+    deployed. A schedule with a plain interval is counted without making its runs one at a time.
+
+    Args:
+        schedules (dict/list): {name: Schedule} or a list of schedules which are named by their index.
+        start (datetime.datetime)[None]: Time the virtual clock starts at. If None use now.
+        end (datetime.datetime)[None]: Last time of the simulation. If None simulate one day.
+        duration (float/dict)[0]: Seconds each run takes or {name: seconds}. Used for the concurrency.
+        bucket (float)[60]: Seconds in each reported bucket (per minute by default).
+        resolution (float)[1]: Seconds in each slot the concurrency is counted in.
+    """
+    if start is None:
+        start = datetime.datetime.now()
+    if end is None:
+        end = start + datetime.timedelta(days=1)
+    if not isinstance(schedules, dict):
+        schedules = {str(i): sched for i, sched in enumerate(schedules)}
+
+    sim = Simulation(start, end, bucket=bucket, resolution=resolution)
+    for name, sched in schedules.items():
+        run_time = duration.get(name, 0) if isinstance(duration, dict) else duration
+        sim.add(name, get_run_offsets(sched, start, end), run_time)
+    return sim
+
+
+class VirtualClock(utils.Clock):
+    """Deterministic fast forward clock for tests of timing code.
+
+    While run() runs a coroutine the event loop never sleeps. If no callback is ready the clock jumps to the next
+    loop timer, so a schedule that waits 5 ms wakes up exactly on time and a simulated hour takes as long as its
+    callbacks. Every loop iteration takes step seconds of virtual time, so a busy wait like the spin of
+    sleep_precise finishes. The loop time and every time async_sched reads through utils.get_clock() follow the
+    virtual time. The time module is not changed, so other threads and libraries keep the real time.
+
+    Sockets still use real I/O. The clock waits up to io_wait real seconds for socket data before it jumps.
+
+    Args:
+        start (datetime.datetime)[None]: Virtual time to start at. If None use now.
+        step (float)[1e-5]: Seconds of virtual time each loop iteration takes.
+        io_wait (float)[0.001]: Real seconds to wait for socket I/O before jumping to the next timer.
+    """
+    def __init__(self, start: datetime.datetime = None, step: float = 1e-5, io_wait: float = 0.001):
+        if start is None:
+            start = datetime.datetime.now()
+        self.start = start
+        self.step = step
+        self.io_wait = io_wait
+        self.elapsed = 0.0
+        self._epoch = start.timestamp()
+        self._monotonic = time.monotonic()
+        self._patched = []  # [(object, attribute, real value)]
+        self._token = None
+
+    def now(self, tz=None) -> datetime.datetime:
+        now = self.start + datetime.timedelta(seconds=self.elapsed)
+        return now if tz is None else now.astimezone(tz)
+
+    def time(self) -> float:
+        return self._epoch + self.elapsed
+
+    def monotonic(self) -> float:
+        return self._monotonic + self.elapsed
+
+    perf_counter = monotonic
+
+    def advance(self, seconds: float):
+        """Move the virtual time forward."""
+        if seconds > 0:
+            self.elapsed += seconds
+
+    def make_select(self, real_select):
+        """Return the selector select function that jumps to the next timer instead of sleeping."""
+        def select(timeout=None):
+            events = real_select(0)
+            if events or timeout == 0:  # A timeout of 0 means callbacks are ready to run
+                self.advance(self.step)
+                return events
+            elif timeout is None:  # Nothing is scheduled, so only socket I/O or a thread can wake the loop
+                return real_select(None)
+            if self.io_wait > 0:
+                events = real_select(min(timeout, self.io_wait))
+            if not events:
+                self.advance(timeout)
+            return events
+        return select
+
+    def patch(self, obj, attr: str, value):
+        self._patched.append((obj, attr, getattr(obj, attr)))
+        setattr(obj, attr, value)
+
+    def install(self, loop: asyncio.AbstractEventLoop):
+        """Make the loop and async_sched in this context use the virtual time until uninstall is called.
+
+        Only this loop object and the clock of this context are changed. Tasks started from this context read the
+        virtual time, but threads started from it read the real time unless they copy the context.
+        """
+        selector = getattr(loop, '_selector', None)
+        if selector is None:
+            raise RuntimeError('The virtual clock needs a selector event loop!')
+        self.patch(selector, 'select', self.make_select(selector.select))
+        self.patch(loop, 'time', self.monotonic)
+        self._token = utils.set_clock(self)
+
+    def uninstall(self):
+        """Restore the real time."""
+        if self._token is not None:
+            utils.reset_clock(self._token)
+            self._token = None
+        while self._patched:
+            obj, attr, value = self._patched.pop()
+            setattr(obj, attr, value)
+
+    def run(self, main: Awaitable):
+        """Run the coroutine on a new event loop with the virtual time like asyncio.run and return its result."""
+        loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            self.install(loop)
+            return loop.run_until_complete(main)
+        finally:
+            try:
+                tasks = asyncio.all_tasks(loop)
+                for task in tasks:
+                    task.cancel()
+                if tasks:
+                    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                self.uninstall()
+                asyncio.set_event_loop(None)
+                loop.close()
@@ -0,0 +1,310 @@
+import json
+import time
+import random
+import datetime
+import threading
+import contextvars
+from collections import deque
+from typing import Iterable, Union
+
+from .utils import print_exception, get_clock
+
+
+__all__ = ['SCHEDULE', 'COMMAND', 'RUN_CONTEXT', 'RunContext', 'get_run_context', 'trace_async',
+           'Span', 'start_span', 'MemoryExporter', 'FileExporter', 'Tracer', 'get_tracer', 'set_tracer',
+           'enable_tracing', 'disable_tracing']
+
+
+SCHEDULE = 'schedule'
+COMMAND = 'command'
+
+RUN_CONTEXT = contextvars.ContextVar('async_sched_run', default=None)
+TRACER = None
+
+
+def new_span_id() -> str:
+    """Return a random 64 bit hex span id like OpenTelemetry span ids."""
+    return '%016x' % random.getrandbits(64)
+
+
+def new_trace_id() -> str:
+    """Return a random 128 bit hex trace id like OpenTelemetry trace ids."""
+    return '%032x' % random.getrandbits(128)
+
+
+class Span(object):
+    """Timed operation in the OpenTelemetry span format.
+
+    Args:
+        name (str): Name of the operation.
+        trace_id (str)[None]: Id shared by every span of the run. If None a new trace is started.
+        parent_span_id (str)['']: Id of the span that caused this span.
+        kind (str)['INTERNAL']: OpenTelemetry span kind.
+        attributes (dict)[None]: Values that describe the operation.
+    """
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_span_id', 'kind', 'attributes', 'start_time', 'end_time',
+                 'status', 'message')
+
+    def __init__(self, name: str, trace_id: str = None, parent_span_id: str = '', kind: str = 'INTERNAL',
+                 attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id or new_trace_id()
+        self.span_id = new_span_id()
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.status = 'UNSET'
+        self.message = ''
+
+    def end(self, error: BaseException = None):
+        """Stop the span and give it to the tracer to export."""
+        self.end_time = time.time_ns()
+        if error is not None:
+            self.status = 'ERROR'
+            self.message = str(error) or type(error).__name__
+        else:
+            self.status = 'OK'
+        tracer = TRACER
+        if tracer is not None:
+            tracer.record(self)
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+
+    def to_dict(self) -> dict:
+        """Return the span as a dictionary with the OpenTelemetry (OTLP JSON) field names."""
+        return {'traceId': self.trace_id, 'spanId': self.span_id, 'parentSpanId': self.parent_span_id,
+                'name': self.name, 'kind': self.kind, 'startTimeUnixNano': self.start_time,
+                'endTimeUnixNano': self.end_time, 'attributes': self.attributes,
+                'status': {'code': self.status, 'message': self.message}}
+
+
+class RunContext(object):
+    """Context of one schedule firing or command that callbacks can read with get_run_context().
+
+    The context is stored in a contextvar, so it follows the run into the coroutines and threads it starts. If
+    tracing is enabled a span is recorded for the run. Entering the context is on the path of every firing, so the
+    run id and actual datetime are only made when they are read.
+
+    Args:
+        name (str): Schedule or callback name.
+        planned (datetime.datetime)[None]: When the run was due.
+        kind (str)['schedule']: "schedule" for a firing or "command" for a RunCommand.
+    """
+    __slots__ = ('name', 'planned', 'kind', 'started', 'span', '_run_id', '_token')
+
+    def __init__(self, name: str, planned: datetime.datetime = None, kind: str = SCHEDULE):
+        self.name = name
+        self.planned = planned
+        self.kind = kind
+        self.started = None  # time.time() when the run started
+        self.span = None
+        self._run_id = None
+        self._token = None
+
+    @property
+    def run_id(self) -> str:
+        """Return the id of the run. It is the span id if the run is traced."""
+        if self._run_id is None:
+            self._run_id = new_span_id()
+        return self._run_id
+
+    @property
+    def trace_id(self) -> str:
+        """Return the trace id of the run or an empty string if tracing is disabled."""
+        if self.span is not None:
+            return self.span.trace_id
+        return ''
+
+    @property
+    def actual(self) -> Union[datetime.datetime, None]:
+        """Return when the run started."""
+        if self.started is not None:
+            return datetime.datetime.fromtimestamp(self.started)
+
+    def __enter__(self) -> 'RunContext':
+        self.started = get_clock().time()
+        self._token = RUN_CONTEXT.set(self)
+        if TRACER is not None:
+            attrs = {'async_sched.name': self.name, 'async_sched.kind': self.kind}
+            if self.planned is not None:
+                attrs['async_sched.planned'] = self.planned.isoformat()
+                attrs['async_sched.lateness'] = (self.actual - self.planned).total_seconds()
+            self.span = Span(f'{self.kind} {self.name}', kind='SERVER' if self.kind == COMMAND else 'INTERNAL',
+                             attributes=attrs)
+            self._run_id = self.span.span_id
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        RUN_CONTEXT.reset(self._token)
+        if self.span is not None:
+            self.span.end(exc)
+
+
+def get_run_context() -> Union[RunContext, None]:
+    """Return the context of the running schedule firing or command or None."""
+    return RUN_CONTEXT.get()
+
+
+async def trace_async(awaitable, name: str, planned: datetime.datetime = None, kind: str = COMMAND):
+    """Await inside a new run context."""
+    with RunContext(name, planned, kind):
+        return await awaitable
+
+
+def start_span(name: str, **attributes) -> Span:
+    """Start a span for a downstream call as a child of the running firing. Use it as a context manager.
+
+    The span is not recorded if tracing is disabled.
+    """
+    ctx = RUN_CONTEXT.get()
+    if ctx is not None and ctx.span is not None:
+        return Span(name, trace_id=ctx.trace_id, parent_span_id=ctx.run_id, attributes=attributes)
+    return Span(name, attributes=attributes)
+
+
+class MemoryExporter(object):
+    """Keep the most recent exported spans in memory.
+
+    Args:
+        max_spans (int)[10000]: Maximum number of spans to keep.
+    """
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, spans: Iterable[Span]):
+        self.spans.extend(span.to_dict() for span in spans)
+
+    def shutdown(self):
+        pass
+
+
+class FileExporter(object):
+    """Append the exported spans to a file with one json span on each line.
+
+    Args:
+        path (str): File to append the spans to.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Iterable[Span]):
+        data = ''.join(json.dumps(span.to_dict()) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(data)
+
+    def shutdown(self):
+        pass
+
+
+class Tracer(object):
+    """Collect finished spans and export them in batches from a background thread.
+
+    Recording a span only appends it to a queue, so the event loop never waits for the exporter.
+
+    Args:
+        exporter (object): Object with an export(spans) and shutdown() method like MemoryExporter or FileExporter.
+        batch_size (int)[512]: Export as soon as this many spans are waiting.
+        flush_interval (float)[1]: Seconds between exports of the waiting spans.
+        max_queue (int)[10000]: Maximum number of waiting spans. New spans are dropped when the queue is full.
+    """
+    def __init__(self, exporter, batch_size: int = 512, flush_interval: float = 1, max_queue: int = 10000):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        self.queue = deque()
+        self.exported = 0
+        self.dropped = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self.thread = None
+
+    def start(self) -> 'Tracer':
+        """Start the export thread."""
+        if self.thread is None or not self.thread.is_alive():
+            self._stopping = False
+            self.thread = threading.Thread(target=self.run, name='async_sched_tracer', daemon=True)
+            self.thread.start()
+        return self
+
+    def record(self, span: Span):
+        """Queue the finished span to be exported."""
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.append(span)
+        if len(self.queue) >= self.batch_size:
+            self._wake.set()
+
+    def run(self):
+        """Export the waiting spans every flush interval until the tracer is shut down."""
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Export all of the waiting spans now."""
+        with self._lock:
+            while self.queue:
+                batch = []
+                while self.queue and len(batch) < self.batch_size:
+                    batch.append(self.queue.popleft())
+                try:
+                    self.exporter.export(batch)
+                    self.exported += len(batch)
+                except Exception as err:
+                    print_exception(err, msg='Could not export the trace spans')
+
+    def shutdown(self):
+        """Stop the export thread after it exported the waiting spans."""
+        self._stopping = True
+        self._wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        self.exporter.shutdown()
+
+
+def get_tracer() -> Union[Tracer, None]:
+    """Return the tracer that records the spans or None if tracing is disabled."""
+    return TRACER
+
+
+def set_tracer(tracer: Union[Tracer, None]):
+    """Set the tracer that records the spans. None disables tracing."""
+    global TRACER
+    TRACER = tracer
+
+
+def enable_tracing(path: str = None, **kwargs) -> Tracer:
+    """Start recording a span for every firing and command.
+
+    Args:
+        path (str)[None]: File to append the spans to. If None keep the spans in a MemoryExporter.
+        **kwargs (dict): batch_size, flush_interval and max_queue keyword arguments for the Tracer.
+    """
+    disable_tracing()
+    exporter = FileExporter(path) if path else MemoryExporter()
+    tracer = Tracer(exporter, **kwargs).start()
+    set_tracer(tracer)
+    return tracer
+
+
+def disable_tracing():
+    """Stop recording spans and export the spans that are waiting."""
+    tracer = TRACER
+    set_tracer(None)
+    if tracer is not None:
+        tracer.shutdown()
@@ -1,13 +1,20 @@
 import os
+import time
 import datetime
 import sys
 import traceback
 import asyncio
 import inspect
+import functools
+import threading
+import contextvars
 from typing import Callable, Awaitable
 
 
-__all__ = ['DEFAULT_HOST', 'DEFAULT_PORT', 'call', 'call_async', 'get_loop',
+__all__ = ['DEFAULT_HOST', 'DEFAULT_PORT', 'UNIX_PREFIX', 'is_unix_address', 'get_unix_path',
+           'call', 'call_async', 'CancelToken', 'get_cancel_token', 'call_thread', 'call_timeout',
+           'get_loop', 'get_task_name', 'Clock', 'REAL_CLOCK', 'get_clock', 'set_clock', 'reset_clock',
+           'HAS_TIMERFD', 'timerfd_sleep', 'sleep_precise',
            'ScheduleError', 'print_exception', 'get_traceback',
            'is_ignored', 'ignore_exception', 'stop_ignore_exception']
 
@@ -18,6 +25,18 @@ try:
 except:
     DEFAULT_PORT = 8000
 
+UNIX_PREFIX = 'unix://'
+
+
+def is_unix_address(host: str) -> bool:
+    """Return if the given host is a unix domain socket address ("unix:///tmp/async_sched.sock")."""
+    return isinstance(host, str) and host.startswith(UNIX_PREFIX)
+
+
+def get_unix_path(host: str) -> str:
+    """Return the socket file path from a unix domain socket address."""
+    return host[len(UNIX_PREFIX):]
+
 
 def call(callback: Callable[..., Awaitable[None]] = None, *args, **kwargs):
     """Call the given callback function. This function can be a normal function or a coroutine."""
@@ -39,6 +58,74 @@ async def call_async(callback: Callable[..., Awaitable[None]] = None, *args, **k
         return callback(*args, **kwargs)
 
 
+class CancelToken(object):
+    """Flag that tells a callback running in a thread to stop.
+
+    A thread cannot be cancelled like a task, so a sync callback that may run for a long time polls the token it
+    gets from get_cancel_token() and returns early when the call was cancelled or timed out.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """Return if the call was cancelled."""
+        return self._event.is_set()
+
+    def cancel(self):
+        """Tell the callback to stop."""
+        self._event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Sleep for the timeout or until the call is cancelled. Return if the call was cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        """Raise a CancelledError if the call was cancelled."""
+        if self.cancelled:
+            raise asyncio.CancelledError('The call was cancelled!')
+
+
+CANCEL_TOKEN = contextvars.ContextVar('async_sched_cancel_token', default=None)
+
+
+def get_cancel_token() -> CancelToken:
+    """Return the cancel token of the running threaded callback or a token that is never cancelled."""
+    token = CANCEL_TOKEN.get()
+    if token is None:
+        token = CancelToken()
+    return token
+
+
+async def call_thread(callback: Callable[..., Awaitable[None]] = None, *args, **kwargs):
+    """Call a normal function in the default executor thread so it does not block the loop.
+
+    The function can poll get_cancel_token() to stop early when this call is cancelled or times out. Coroutine
+    functions are awaited normally.
+    """
+    if inspect.iscoroutinefunction(callback):
+        return await callback(*args, **kwargs)
+
+    token = CancelToken()
+    ctx = contextvars.copy_context()
+    ctx.run(CANCEL_TOKEN.set, token)
+    try:
+        return await get_loop().run_in_executor(None, functools.partial(ctx.run, callback, *args, **kwargs))
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+
+
+async def call_timeout(awaitable: Awaitable, timeout: float = None, name: str = ''):
+    """Await with a timeout. Raise a TimeoutError with a message if the timeout passed. None is no timeout."""
+    if timeout is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise asyncio.TimeoutError(f'"{name}" timed out after {timeout} seconds!') from None
+
+
 def get_loop():
     """Get the running event loop or a new event loop."""
     try:
@@ -47,6 +134,93 @@ def get_loop():
         return asyncio.get_event_loop()
 
 
+def get_task_name() -> str:
+    """Return the name of the running task or an empty string if there is no running task."""
+    try:
+        return asyncio.current_task().get_name()
+    except (RuntimeError, AttributeError, Exception):
+        return ''
+
+
+class Clock(object):
+    """Clock that async_sched reads the time from.
+
+    Every time read of async_sched goes through get_clock(), so a test can give its event loop a fake clock like
+    simulate.VirtualClock with set_clock. The time module itself is never changed, so other threads and libraries
+    keep the real time.
+    """
+    now = staticmethod(datetime.datetime.now)
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+    time = staticmethod(time.time)  # Last, because it hides the time module in the class body
+
+
+REAL_CLOCK = Clock()
+CLOCK = contextvars.ContextVar('async_sched_clock', default=REAL_CLOCK)
+
+
+def get_clock() -> Clock:
+    """Return the clock of the running context."""
+    return CLOCK.get()
+
+
+def set_clock(clock: Clock) -> contextvars.Token:
+    """Use the clock in this context and in the tasks started from it. Return the token for reset_clock."""
+    return CLOCK.set(clock)
+
+
+def reset_clock(token: contextvars.Token):
+    """Go back to the clock that was used before set_clock."""
+    CLOCK.reset(token)
+
+
+HAS_TIMERFD = hasattr(os, 'timerfd_create')  # Linux and Python 3.13+
+
+
+async def timerfd_sleep(delay: float):
+    """Sleep with a timerfd so the wake up is not rounded to the millisecond timeout of the selector."""
+    loop = get_loop()
+    fd = os.timerfd_create(time.CLOCK_MONOTONIC, flags=os.TFD_NONBLOCK | os.TFD_CLOEXEC)
+    try:
+        fut = loop.create_future()
+        os.timerfd_settime(fd, initial=max(delay, 1e-9))
+        loop.add_reader(fd, lambda: fut.done() or fut.set_result(None))
+        try:
+            await fut
+        finally:
+            loop.remove_reader(fd)
+    finally:
+        os.close(fd)
+
+
+async def sleep_precise(delay: float, spin: float = 0.002) -> float:
+    """Sleep for the delay with sub-millisecond accuracy and return how late the wake up was in seconds.
+
+    The loop timer is only accurate to about a millisecond, so this sleeps normally until spin seconds are left.
+    The rest is waited on a timerfd if available and finished by yielding to the loop until the deadline. Other tasks
+    still run while spinning, but the loop does not sleep during the last spin seconds.
+
+    Args:
+        delay (float): Seconds to sleep.
+        spin (float)[0.002]: Seconds before the deadline to stop the coarse sleep.
+    """
+    clock = get_clock()
+    deadline = clock.perf_counter() + delay
+    if delay > spin:
+        await asyncio.sleep(delay - spin)
+
+    remaining = deadline - clock.perf_counter()
+    if HAS_TIMERFD and remaining > 0 and clock is REAL_CLOCK:  # A timerfd waits in real time
+        try:
+            await timerfd_sleep(remaining)
+        except (NotImplementedError, OSError):
+            pass  # Event loops like the windows proactor loop do not support add_reader
+
+    while clock.perf_counter() < deadline:
+        await asyncio.sleep(0)
+    return clock.perf_counter() - deadline
+
+
 # ========== Exception Handling ==========
 IGNORE_PRINT_EXCEPTION = []
 
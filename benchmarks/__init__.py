@@ -0,0 +1,7 @@
+"""Benchmarks for async_sched.
+
+Run a benchmark module with the -m flag from the repository root.
+
+python -m benchmarks.transport
+
+"""
@@ -0,0 +1,76 @@
+"""
+Run the benchmarks with the -m flag. "all" runs every offline benchmark with small sizes.
+
+python -m benchmarks all --output results.json
+python -m benchmarks all --compare baseline.json
+python -m benchmarks round_trip --count 5000 --output round_trip.json
+python -m benchmarks loadgen --host 127.0.0.1 --port 8000 --clients 50 --duration 10
+
+"""
+import argparse
+from benchmarks import transport, lateness, round_trip, list_schedules, update, memory, loadgen, precise, \
+    tracing, snapshot, secure, simulate
+from benchmarks.common import make_report, save_report, load_report, compare_reports
+
+
+SUB_MODULES = {transport.NAME: transport,
+               lateness.NAME: lateness,
+               precise.NAME: precise,
+               round_trip.NAME: round_trip,
+               list_schedules.NAME: list_schedules,
+               update.NAME: update,
+               memory.NAME: memory,
+               loadgen.NAME: loadgen,
+               tracing.NAME: tracing,
+               snapshot.NAME: snapshot,
+               secure.NAME: secure,
+               simulate.NAME: simulate,
+               }
+
+# Small sizes so the whole suite finishes in well under a minute
+SMALL = {transport.NAME: {'count': 500},
+         lateness.NAME: {'schedules': 200, 'duration': 3},
+         precise.NAME: {'duration': 1},
+         round_trip.NAME: {'count': 500},
+         list_schedules.NAME: {'schedules': 2000},
+         update.NAME: {'modules': 5, 'schedules': 10},
+         memory.NAME: {'schedules': 2000},
+         loadgen.NAME: {'clients': 10, 'duration': 2},
+         tracing.NAME: {'count': 20000},
+         snapshot.NAME: {'schedules': 2000},
+         secure.NAME: {'count': 500, 'connections': 50},
+         simulate.NAME: {'schedules': 1000, 'hours': 6},
+         }
+
+
+def print_comparison(baseline: dict, current: dict):
+    """Print the change of every value that is in both reports."""
+    for name, (old, new, change) in compare_reports(baseline, current).items():
+        print(f'{name:>50}: {old:12.3f} -> {new:12.3f} ({change:+.1f}%)')
+
+
+if __name__ == '__main__':
+    P = argparse.ArgumentParser(description='Run the benchmarks.')
+    P.add_argument('--output', type=str, default=None, help='Save the results as a json report.')
+    P.add_argument('--compare', type=str, default=None, help='Json report to compare the results against.')
+    SUBCOMMANDS = P.add_subparsers(required=True, dest='subcommand', help='Benchmark to run.')
+    SUBCOMMANDS.add_parser('all', help='Run every offline benchmark with small sizes.')
+    PARSERS = {NAME: MODULE.get_argparse(parent_parser=SUBCOMMANDS) for NAME, MODULE in SUB_MODULES.items()}
+    ARGS = P.parse_args()
+
+    RESULTS = {}
+    if ARGS.subcommand == 'all':
+        for NAME, MODULE in SUB_MODULES.items():
+            print(f'===== {NAME} =====')
+            RESULTS[NAME] = MODULE.main(**SMALL.get(NAME, {}))
+    else:
+        KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS)
+                  if not n.startswith('_') and n not in ('output', 'compare') and getattr(ARGS, n, None) is not None}
+        RESULTS[ARGS.subcommand] = SUB_MODULES[ARGS.subcommand].main(**KWARGS)
+
+    REPORT = make_report(RESULTS)
+    if ARGS.output:
+        save_report(REPORT, ARGS.output)
+    if ARGS.compare:
+        print(f'===== compared to {ARGS.compare} =====')
+        print_comparison(load_report(ARGS.compare), REPORT)
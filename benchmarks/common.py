@@ -0,0 +1,109 @@
+import sys
+import json
+import time
+import asyncio
+import platform
+import datetime
+
+from async_sched.__meta__ import version
+from async_sched.server import Scheduler
+
+
+__all__ = ['start_scheduler', 'stop_scheduler', 'summarize', 'percentile', 'make_report', 'save_report',
+           'load_report', 'flatten', 'compare_reports', 'Timer']
+
+
+async def start_scheduler(addr=('127.0.0.1', 0), **kwargs) -> Scheduler:
+    """Start a scheduler server on the running loop and wait until it is serving."""
+    srv = Scheduler(addr, **kwargs)
+    srv.start()
+    while not srv.is_serving():
+        await asyncio.sleep(0.01)
+    return srv
+
+
+async def stop_scheduler(srv: Scheduler):
+    """Stop the server and cancel the schedule tasks without waiting for each schedule to stop."""
+    for task, *_ in srv.tasks.values():
+        task.cancel()
+    srv.tasks.clear()
+    srv.stop()
+    await asyncio.sleep(0)
+
+
+def percentile(values, pct: float) -> float:
+    """Return the percentile (0 - 100) of the sorted values."""
+    if not values:
+        return float('nan')
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def summarize(values, scale: float = 1.0) -> dict:
+    """Return the count, mean, p50, p90, p99 and max of the values multiplied by scale."""
+    values = sorted(v * scale for v in values)
+    if not values:
+        return {'count': 0}
+    return {'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99),
+            'max': values[-1]}
+
+
+def make_report(results: dict) -> dict:
+    """Return the machine readable report with information about the environment the results came from."""
+    return {'created': datetime.datetime.now().isoformat(),
+            'version': version,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'results': results}
+
+
+def save_report(report: dict, filename: str):
+    """Save the report as json."""
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_report(filename: str) -> dict:
+    """Load a json report."""
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    """Return {"benchmark.metric.stat": value} for the numeric values of the nested results."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}.{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_reports(baseline: dict, current: dict) -> dict:
+    """Return {"benchmark.metric.stat": (baseline, current, percent change)} for the values in both reports."""
+    old = flatten(baseline.get('results', baseline))
+    new = flatten(current.get('results', current))
+    changes = {}
+    for name in sorted(set(old) & set(new)):
+        change = (new[name] - old[name]) / old[name] * 100 if old[name] else float('nan')
+        changes[name] = (old[name], new[name], change)
+    return changes
+
+
+class Timer(object):
+    """Context manager that measures the elapsed seconds."""
+    def __init__(self):
+        self.start = self.elapsed = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed = time.perf_counter() - self.start
+        return False
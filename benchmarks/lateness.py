@@ -0,0 +1,82 @@
+"""
+Measure how late schedules fire when many schedules run at different intervals.
+
+python -m benchmarks.lateness --schedules 1000 --duration 5
+
+"""
+import asyncio
+import argparse
+import datetime
+
+from async_sched.schedule import Schedule
+from benchmarks.common import start_scheduler, stop_scheduler, summarize
+
+
+__all__ = ['NAME', 'INTERVALS', 'bench_lateness', 'run', 'get_argparse', 'main']
+
+
+NAME = 'lateness'
+
+INTERVALS = (0.05, 0.1, 0.5, 1.0)  # Seconds
+
+
+def make_recorder(sched: Schedule, lateness: list):
+    """Return a callback that records how late each firing of the schedule was in seconds."""
+    expected = [sched.next_run]
+
+    def record():
+        now = datetime.datetime.now()
+        lateness.append((now - expected[0]).total_seconds())
+        expected[0] = sched.last_run + sched.interval  # Next run is made from the last run
+    return record
+
+
+async def bench_lateness(schedules: int = 1000, duration: float = 5, intervals=INTERVALS):
+    """Run the schedules for the duration and return the lateness statistics in milliseconds for each interval."""
+    srv = await start_scheduler()
+    lateness = {interval: [] for interval in intervals}
+    try:
+        for i in range(schedules):
+            interval = intervals[i % len(intervals)]
+            sched = Schedule(seconds=interval, repeat=True)
+            srv.add(f'lateness {i}', sched, make_recorder(sched, lateness[interval]))
+        await asyncio.sleep(duration)
+    finally:
+        await stop_scheduler(srv)
+
+    results = {f'{interval}s_ms': summarize(values, 1e3) for interval, values in lateness.items()}
+    results['all_ms'] = summarize([v for values in lateness.values() for v in values], 1e3)
+    return results
+
+
+def run(schedules: int = 1000, duration: float = 5, **kwargs) -> dict:
+    """Return the lateness statistics in milliseconds for each interval."""
+    return asyncio.run(bench_lateness(schedules, duration))
+
+
+def get_argparse(schedules: int = 1000, duration: float = 5, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure how late schedules fire.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure how late schedules fire.')
+
+    p.add_argument('--schedules', type=int, default=schedules, help='Number of schedules to run.')
+    p.add_argument('--duration', type=float, default=duration, help='Seconds to run the schedules for.')
+
+    return p
+
+
+def main(schedules: int = 1000, duration: float = 5, **kwargs):
+    results = run(schedules, duration)
+    for name, res in results.items():
+        print('{:>8}: p50 {p50:8.2f} ms, p90 {p90:8.2f} ms, p99 {p99:8.2f} ms, max {max:8.2f} ms ({count} runs)'
+              .format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,93 @@
+"""
+Measure ListSchedules with many running schedules.
+
+python -m benchmarks.list_schedules --schedules 10000
+
+"""
+import time
+import asyncio
+import argparse
+
+from async_sched.schedule import Schedule
+from async_sched.client import Client
+from benchmarks.common import start_scheduler, stop_scheduler, Timer
+
+
+__all__ = ['NAME', 'bench_list_schedules', 'run', 'get_argparse', 'main']
+
+
+NAME = 'list_schedules'
+
+
+def poll(device):
+    pass
+
+
+async def measure_lag(stop: asyncio.Event, lags: list, interval: float = 0.001):
+    """Record how late a short sleep wakes up while the server is busy."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def bench_list_schedules(schedules: int = 10000):
+    """Return the seconds to list all, stream all, get one page and filter by prefix. The max loop lag is included."""
+    srv = await start_scheduler()
+    srv.register_callback(poll)
+    for i in range(schedules):
+        srv.add(f'device {i:06d}', Schedule(hours=1), poll, i)
+
+    results = {}
+    requests = {'all': {},
+                'stream': {'stream': True},
+                'page_100': {'limit': 100},
+                'prefix': {'prefix': 'device 0001'},
+                'callback': {'callback_name': 'poll', 'limit': 100}}
+    try:
+        async with Client((srv.ip_address, srv.port)) as client:
+            for name, kwargs in requests.items():
+                stop = asyncio.Event()
+                lags = []
+                lag_task = asyncio.get_running_loop().create_task(measure_lag(stop, lags))
+                with Timer() as t:
+                    msg = await client.request_schedules(print_results=False, **kwargs)
+                stop.set()
+                await lag_task
+                results[name] = {'seconds': t.elapsed, 'schedules': len(msg.schedules),
+                                 'max_loop_lag_ms': max(lags, default=0) * 1e3}
+    finally:
+        await stop_scheduler(srv)
+    return results
+
+
+def run(schedules: int = 10000, **kwargs) -> dict:
+    """Return the ListSchedules timing for each kind of request."""
+    return asyncio.run(bench_list_schedules(schedules))
+
+
+def get_argparse(schedules: int = 10000, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure ListSchedules with many running schedules.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure ListSchedules with many running schedules.')
+
+    p.add_argument('--schedules', type=int, default=schedules, help='Number of running schedules.')
+
+    return p
+
+
+def main(schedules: int = 10000, **kwargs):
+    results = run(schedules)
+    for name, res in results.items():
+        print('{:>8}: {seconds:8.3f} s for {schedules} schedules, max loop lag {max_loop_lag_ms:8.1f} ms'
+              .format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,137 @@
+"""
+Synthetic load generator that sends a mix of messages from many concurrent clients.
+
+Without a host a local server is started with a registered "noop" callback.
+
+python -m benchmarks.loadgen --clients 20 --duration 5 --mix "ping=2,list_schedules=1,run_command=1"
+python -m benchmarks.loadgen --host 127.0.0.1 --port 8000 --callback_name "print_task2" --rate 50
+
+"""
+import time
+import random
+import asyncio
+import argparse
+
+from async_sched.server.messages import Ping, RunCommand, ListSchedules, JobStatus, Error
+from async_sched.client import Client
+from benchmarks.common import start_scheduler, stop_scheduler, summarize
+
+
+__all__ = ['NAME', 'MESSAGES', 'parse_mix', 'client_load', 'bench_load', 'run', 'get_argparse', 'main']
+
+
+NAME = 'loadgen'
+
+MESSAGES = {'ping': lambda callback_name: Ping(),
+            'list_schedules': lambda callback_name: ListSchedules(limit=10),
+            'run_command': lambda callback_name: RunCommand(callback_name=callback_name),
+            'start_command': lambda callback_name: RunCommand(callback_name=callback_name, background=True),
+            'job_status': lambda callback_name: JobStatus(job_id='unknown'),
+            }
+
+
+def noop(*args, **kwargs):
+    pass
+
+
+def parse_mix(mix: str) -> dict:
+    """Return {message type: weight} from "ping=2,list_schedules=1"."""
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in MESSAGES:
+            raise ValueError(f'Unknown message type "{name}"! Use one of {", ".join(MESSAGES)}')
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def client_load(addr, weights: dict, deadline: float, rate: float = 0, callback_name: str = 'noop',
+                      times: dict = None, errors: dict = None):
+    """Send random messages from one connection until the deadline. Rate is messages per second (0 = no limit)."""
+    names = list(weights)
+    cum_weights = list(weights.values())
+    async with Client(addr) as client:
+        next_send = time.perf_counter()
+        while time.perf_counter() < deadline:
+            name = random.choices(names, cum_weights)[0]
+            start = time.perf_counter()
+            reply = await client.send_message(MESSAGES[name](callback_name))
+            times.setdefault(name, []).append(time.perf_counter() - start)
+            if isinstance(reply, Error):
+                errors[name] = errors.get(name, 0) + 1
+
+            if rate > 0:
+                next_send += 1 / rate
+                await asyncio.sleep(max(next_send - time.perf_counter(), 0))
+
+
+async def bench_load(host: str = None, port: int = 8000, clients: int = 10, duration: float = 5, rate: float = 0,
+                     mix: str = 'ping=1,list_schedules=1,run_command=1', callback_name: str = 'noop'):
+    """Run the load and return the throughput, latency in microseconds and error count for each message type."""
+    srv = None
+    if not host:
+        srv = await start_scheduler()
+        srv.register_callback(noop)
+        host, port = srv.ip_address, srv.port
+
+    weights = parse_mix(mix)
+    times = {}
+    errors = {}
+    try:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client_load((host, port), weights, deadline, rate, callback_name, times, errors)
+                               for _ in range(clients)))
+    finally:
+        if srv is not None:
+            await stop_scheduler(srv)
+
+    results = {'clients': clients, 'duration': duration,
+               'per_second': sum(len(values) for values in times.values()) / duration}
+    for name, values in times.items():
+        results[name] = summarize(values, 1e6)
+        results[name]['per_second'] = len(values) / duration
+        results[name]['errors'] = errors.get(name, 0)
+    return results
+
+
+def run(host: str = None, port: int = 8000, clients: int = 10, duration: float = 5, rate: float = 0,
+        mix: str = 'ping=1,list_schedules=1,run_command=1', callback_name: str = 'noop', **kwargs) -> dict:
+    """Run the load and return the results."""
+    return asyncio.run(bench_load(host, port, clients, duration, rate, mix, callback_name))
+
+
+def get_argparse(host: str = None, port: int = 8000, clients: int = 10, duration: float = 5, rate: float = 0,
+                 mix: str = 'ping=1,list_schedules=1,run_command=1', callback_name: str = 'noop', parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Send a mix of messages from many concurrent clients.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Send a mix of messages from many concurrent clients.')
+
+    p.add_argument('--host', type=str, default=host, help='Server to load. If not given a local server is started.')
+    p.add_argument('--port', type=int, default=port)
+    p.add_argument('--clients', type=int, default=clients, help='Number of concurrent connections.')
+    p.add_argument('--duration', type=float, default=duration, help='Seconds to send messages for.')
+    p.add_argument('--rate', type=float, default=rate, help='Messages per second for each client. 0 is no limit.')
+    p.add_argument('--mix', type=str, default=mix, help='Comma separated message type=weight.')
+    p.add_argument('--callback_name', type=str, default=callback_name, help='Registered callback for run_command.')
+
+    return p
+
+
+def main(host: str = None, port: int = 8000, clients: int = 10, duration: float = 5, rate: float = 0,
+         mix: str = 'ping=1,list_schedules=1,run_command=1', callback_name: str = 'noop', **kwargs):
+    results = run(host, port, clients, duration, rate, mix, callback_name)
+    print('{per_second:.0f} msg/s total from {clients} clients'.format(**results))
+    for name, res in results.items():
+        if isinstance(res, dict):
+            print('{:>16}: {per_second:8.0f} msg/s, p50 {p50:8.1f} us, p99 {p99:8.1f} us, {errors} errors'
+                  .format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
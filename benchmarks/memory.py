@@ -0,0 +1,81 @@
+"""
+Measure the memory used by each running schedule.
+
+python -m benchmarks.memory --schedules 10000
+
+"""
+import gc
+import asyncio
+import argparse
+import tracemalloc
+
+from async_sched.schedule import Schedule
+from benchmarks.common import start_scheduler, stop_scheduler
+
+
+__all__ = ['NAME', 'bench_memory', 'run', 'get_argparse', 'main']
+
+
+NAME = 'memory'
+
+
+def poll(device):
+    pass
+
+
+async def bench_memory(schedules: int = 10000):
+    """Return the bytes allocated for each Schedule object and for each schedule running in a Scheduler."""
+    srv = await start_scheduler()
+    try:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            objs = [Schedule(minutes=5, repeat=True) for _ in range(schedules)]
+            schedule_bytes = tracemalloc.get_traced_memory()[0] - start
+
+            start = tracemalloc.get_traced_memory()[0]
+            for i, sched in enumerate(objs):
+                srv.add(f'device {i:06d}', sched, poll, i)
+            await asyncio.sleep(0)  # Let each task start and wait for its schedule
+            running_bytes = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+    finally:
+        await stop_scheduler(srv)
+
+    return {'schedules': schedules,
+            'schedule_bytes': schedule_bytes / schedules,
+            'running_bytes': running_bytes / schedules,
+            'total_bytes': (schedule_bytes + running_bytes) / schedules}
+
+
+def run(schedules: int = 10000, **kwargs) -> dict:
+    """Return the memory used by each schedule."""
+    return asyncio.run(bench_memory(schedules))
+
+
+def get_argparse(schedules: int = 10000, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure the memory used by each running schedule.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure the memory used by each running schedule.')
+
+    p.add_argument('--schedules', type=int, default=schedules, help='Number of schedules to create.')
+
+    return p
+
+
+def main(schedules: int = 10000, **kwargs):
+    results = run(schedules)
+    print('Schedule {schedule_bytes:.0f} B, running task {running_bytes:.0f} B, total {total_bytes:.0f} B per schedule '
+          '({schedules} schedules)'.format(**results))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
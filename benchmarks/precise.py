@@ -0,0 +1,85 @@
+"""
+Measure the timing error of short interval schedules with and without precision mode (Schedule.spin).
+
+python -m benchmarks.precise --duration 3
+
+"""
+import time
+import asyncio
+import argparse
+
+from async_sched.schedule import Schedule
+from benchmarks.common import start_scheduler, stop_scheduler, summarize
+
+
+__all__ = ['NAME', 'INTERVALS', 'bench_precise', 'run', 'get_argparse', 'main']
+
+
+NAME = 'precise'
+
+INTERVALS = (0.001, 0.005, 0.01)  # Seconds
+
+
+def make_recorder(interval: float, errors: list):
+    """Return a callback that records how far each firing is from a perfect fixed rate in seconds."""
+    start = []
+
+    def record():
+        now = time.perf_counter()
+        if not start:
+            start.append(now)
+        else:
+            expected = start[0] + round((now - start[0]) / interval) * interval
+            errors.append(now - expected)
+    return record
+
+
+async def bench_precise(duration: float = 3, spin: float = 0.002, intervals=INTERVALS):
+    """Run one schedule for each interval with and without spin and return the timing error in microseconds."""
+    results = {}
+    for mode, mode_spin in (('normal', 0), ('precise', spin)):
+        srv = await start_scheduler()
+        errors = {interval: [] for interval in intervals}
+        try:
+            for interval in intervals:
+                sched = Schedule(seconds=interval, repeat=True, spin=mode_spin)
+                srv.add(f'{mode} {interval}', sched, make_recorder(interval, errors[interval]))
+            await asyncio.sleep(duration)
+        finally:
+            await stop_scheduler(srv)
+
+        for interval, values in errors.items():
+            results[f'{mode}_{interval * 1e3:g}ms_us'] = summarize([abs(v) for v in values], 1e6)
+    return results
+
+
+def run(duration: float = 3, spin: float = 0.002, **kwargs) -> dict:
+    """Return the timing error in microseconds for each mode and interval."""
+    return asyncio.run(bench_precise(duration, spin))
+
+
+def get_argparse(duration: float = 3, spin: float = 0.002, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure the timing error of short interval schedules.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure the timing error of short interval schedules.')
+
+    p.add_argument('--duration', type=float, default=duration, help='Seconds to run each mode for.')
+    p.add_argument('--spin', type=float, default=spin, help='Seconds to wait precisely before each run.')
+
+    return p
+
+
+def main(duration: float = 3, spin: float = 0.002, **kwargs):
+    results = run(duration, spin)
+    for name, res in results.items():
+        print('{:>18}: p50 {p50:8.1f} us, p99 {p99:8.1f} us, max {max:8.1f} us ({count} runs)'.format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
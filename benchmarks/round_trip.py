@@ -0,0 +1,91 @@
+"""
+Measure the client round trip throughput for each message type.
+
+python -m benchmarks.round_trip --count 1000
+
+"""
+import time
+import asyncio
+import argparse
+
+from async_sched.schedule import Schedule
+from async_sched.server.messages import Ping, Update, RunCommand, ScheduleCommand, ListSchedules, StopSchedule, \
+    JobStatus
+from async_sched.client import Client
+from benchmarks.common import start_scheduler, stop_scheduler, summarize
+
+
+__all__ = ['NAME', 'make_messages', 'bench_round_trip', 'run', 'get_argparse', 'main']
+
+
+NAME = 'round_trip'
+
+
+def noop(*args, **kwargs):
+    pass
+
+
+def make_messages(i: int) -> dict:
+    """Return the message to send for each message type for iteration i."""
+    return {'ping': Ping(),
+            'update': Update(),
+            'list_schedules': ListSchedules(limit=10),
+            'run_command': RunCommand(callback_name='noop', args=(i,)),
+            'start_command': RunCommand(callback_name='noop', args=(i,), background=True),
+            'job_status': JobStatus(job_id='unknown'),
+            'schedule_command': ScheduleCommand(name=f'rt {i}', schedule=Schedule(hours=1), callback_name='noop'),
+            'stop_schedule': StopSchedule(name=f'rt {i}'),
+            }
+
+
+async def bench_round_trip(count: int = 1000):
+    """Return the round trip statistics in microseconds and the messages per second for each message type."""
+    srv = await start_scheduler()
+    srv.register_callback(noop)
+    times = {}
+    try:
+        async with Client((srv.ip_address, srv.port)) as client:
+            for i in range(count):
+                for name, msg in make_messages(i).items():
+                    start = time.perf_counter()
+                    await client.send_message(msg)
+                    times.setdefault(name, []).append(time.perf_counter() - start)
+    finally:
+        await stop_scheduler(srv)
+
+    results = {}
+    for name, values in times.items():
+        results[name] = summarize(values, 1e6)
+        results[name]['per_second'] = len(values) / sum(values)
+    return results
+
+
+def run(count: int = 1000, **kwargs) -> dict:
+    """Return the round trip statistics in microseconds and the messages per second for each message type."""
+    return asyncio.run(bench_round_trip(count))
+
+
+def get_argparse(count: int = 1000, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure the round trip throughput for each message type.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure the round trip throughput for each message type.')
+
+    p.add_argument('--count', type=int, default=count, help='Number of round trips for each message type.')
+
+    return p
+
+
+def main(count: int = 1000, **kwargs):
+    results = run(count)
+    for name, res in results.items():
+        print('{:>16}: {per_second:8.0f} msg/s, p50 {p50:8.1f} us, p99 {p99:8.1f} us'.format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,124 @@
+"""
+Measure what TLS and signed messages cost for a new connection and for each command on a pooled connection.
+
+python -m benchmarks.secure --count 1000 --connections 100
+
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from async_sched.server.messages import Ping
+from async_sched.server.security import make_server_context, make_client_context
+from async_sched.client import Client, ClientPool
+from benchmarks.common import start_scheduler, stop_scheduler, summarize
+
+
+__all__ = ['NAME', 'TOKEN', 'make_certificate', 'bench_mode', 'bench_secure', 'run', 'get_argparse', 'main']
+
+
+NAME = 'secure'
+TOKEN = 'benchmark token'
+
+
+def make_certificate(path: str):
+    """Write a self signed localhost certificate with openssl and return (certfile, keyfile) or None."""
+    if shutil.which('openssl') is None:
+        return None
+    certfile, keyfile = os.path.join(path, 'cert.pem'), os.path.join(path, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-keyout', keyfile, '-out', certfile, '-subj', '/CN=localhost',
+                    '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'], check=True, capture_output=True)
+    return certfile, keyfile
+
+
+async def bench_mode(count: int, connections: int, token: str = '', cert: tuple = None) -> dict:
+    """Return the connect and round trip times in microseconds for one security mode.
+
+    connect is a new connection with its handshake and one ping like a command line call. With TLS the first
+    connection does a full handshake and the others resume the session. pooled is one ping on a connection from the
+    pool, so the handshake is paid once for all of the pings.
+    """
+    server_ctx = make_server_context(*cert) if cert else None
+    client_ctx = make_client_context(cert[0]) if cert else None
+    srv = await start_scheduler(auth_token=token, ssl_context=server_ctx)
+    addr = (srv.ip_address, srv.port)
+    try:
+        connect = []
+        reused = 0
+        for _ in range(connections):
+            start = time.perf_counter()
+            client = Client(addr, auth_token=token, ssl_context=client_ctx)
+            await client.start_async()
+            await client.send_ping()
+            connect.append(time.perf_counter() - start)
+            reused += client.session_reused
+            await client.stop_async()
+
+        pool = ClientPool(auth_token=token, ssl_context=client_ctx)
+        pooled = []
+        for _ in range(count):
+            start = time.perf_counter()
+            async with pool.connection(addr) as client:
+                msg = await client.send_ping()
+            pooled.append(time.perf_counter() - start)
+            assert isinstance(msg, Ping)
+        await pool.close_async()
+    finally:
+        await stop_scheduler(srv)
+
+    results = {'first_connect_us': connect[0] * 1e6, 'connect_us': summarize(connect, 1e6),
+               'pooled_us': summarize(pooled, 1e6)}
+    if cert:
+        results['sessions_resumed'] = reused
+    return results
+
+
+async def bench_secure(count: int = 1000, connections: int = 100) -> dict:
+    """Return the results of bench_mode for plain, hmac, tls and tls_hmac connections."""
+    results = {'plain': await bench_mode(count, connections),
+               'hmac': await bench_mode(count, connections, token=TOKEN)}
+    with tempfile.TemporaryDirectory() as path:
+        cert = make_certificate(path)
+        if cert is not None:
+            results['tls'] = await bench_mode(count, connections, cert=cert)
+            results['tls_hmac'] = await bench_mode(count, connections, token=TOKEN, cert=cert)
+    return results
+
+
+def run(count: int = 1000, connections: int = 100, **kwargs) -> dict:
+    """Return the connect and pooled round trip times for each security mode."""
+    return asyncio.run(bench_secure(count, connections))
+
+
+def get_argparse(count: int = 1000, connections: int = 100, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure the cost of TLS and signed messages.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure the cost of TLS and signed messages.')
+
+    p.add_argument('--count', type=int, default=count, help='Number of pings on a pooled connection.')
+    p.add_argument('--connections', type=int, default=connections, help='Number of new connections to time.')
+
+    return p
+
+
+def main(count: int = 1000, connections: int = 100, **kwargs):
+    results = run(count, connections)
+    for name, res in results.items():
+        print('{:>10}: first {:8.1f} us, connect p50 {:8.1f} us | pooled p50 {:6.1f} us, p99 {:6.1f} us {}'.format(
+              name, res['first_connect_us'], res['connect_us']['p50'], res['pooled_us']['p50'],
+              res['pooled_us']['p99'], f"({res['sessions_resumed']} resumed)" if 'sessions_resumed' in res else ''))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
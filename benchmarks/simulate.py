@@ -0,0 +1,107 @@
+"""
+Measure the schedule simulator on a mix of interval and daily "at" schedules compared to counting every run.
+
+python -m benchmarks.simulate --schedules 10000 --hours 24 --per_run 0
+
+"""
+import random
+import argparse
+import datetime
+from collections import Counter
+
+from async_sched.schedule import Schedule
+from async_sched.simulate import iter_run_times, simulate
+from benchmarks.common import Timer
+
+
+__all__ = ['NAME', 'INTERVALS', 'make_schedules', 'count_runs', 'bench_simulate', 'run', 'get_argparse', 'main']
+
+
+NAME = 'simulate'
+INTERVALS = (10, 60, 300, 900, 3600)
+WORKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+
+
+def make_schedules(schedules: int, start: datetime.datetime) -> dict:
+    """Return {name: Schedule} where 9 of 10 schedules repeat on an interval and the others run daily at a time."""
+    rand = random.Random(1)
+    items = {}
+    for i in range(schedules):
+        if i % 10 == 9:
+            at = '{:02d}:{:02d}'.format(rand.randrange(24), rand.choice((0, 30)))
+            sched = Schedule(days=1, at=at, repeat=True, weekdays=WORKDAYS, start_on=start - datetime.timedelta(days=3))
+        else:
+            sched = Schedule(seconds=rand.choice(INTERVALS), repeat=True,
+                             start_on=start + datetime.timedelta(seconds=rand.random() * 60))
+        items[f'device {i:06d}'] = sched
+    return items
+
+
+def count_runs(schedules: dict, start: datetime.datetime, end: datetime.datetime) -> Counter:
+    """Return {second: firings} by making every run time, which is what the simulator avoids."""
+    counts = Counter()
+    for sched in schedules.values():
+        counts.update(int((dt - start).total_seconds()) for dt in iter_run_times(sched, start, end))
+    return counts
+
+
+def bench_simulate(schedules: int = 10000, hours: float = 24, per_run: bool = True) -> dict:
+    """Return the seconds to simulate the schedules and to count every run one at a time.
+
+    Both count the most runs that start in one second, which must be the same. Counting every run of a day of
+    10,000 schedules takes minutes, so it can be turned off with per_run.
+    """
+    start = datetime.datetime(2026, 1, 5)
+    end = start + datetime.timedelta(hours=hours)
+    items = make_schedules(schedules, start)
+
+    with Timer() as t:
+        sim = simulate(items, start, end, duration=2)
+        summary = sim.summary()
+    results = {'simulate': {'seconds': t.elapsed, 'runs': summary['runs'],
+                            'runs_per_second': summary['runs'] / t.elapsed,
+                            'max_firings_per_second': max(sim.starts, default=0),
+                            'peak_concurrency': summary['peak_concurrency']}}
+
+    if not per_run:
+        return results
+    with Timer() as t:
+        counts = count_runs(items, start, end)
+    runs = sum(counts.values())
+    results['per_run'] = {'seconds': t.elapsed, 'runs': runs, 'runs_per_second': runs / t.elapsed,
+                          'max_firings_per_second': max(counts.values(), default=0)}
+    return results
+
+
+def run(schedules: int = 10000, hours: float = 24, per_run: bool = True, **kwargs) -> dict:
+    """Return the simulation timing."""
+    return bench_simulate(schedules, hours, per_run)
+
+
+def get_argparse(schedules: int = 10000, hours: float = 24, per_run: bool = True, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure simulating many schedules on a virtual clock.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure simulating many schedules on a virtual clock.')
+
+    p.add_argument('--schedules', type=int, default=schedules, help='Number of schedules to simulate.')
+    p.add_argument('--hours', type=float, default=hours, help='Number of hours to simulate.')
+    p.add_argument('--per_run', type=int, default=int(per_run), help='Also count every run one at a time.')
+
+    return p
+
+
+def main(schedules: int = 10000, hours: float = 24, per_run: bool = True, **kwargs):
+    results = run(schedules, hours, bool(per_run))
+    for name, res in results.items():
+        print('{:>10}: {seconds:8.3f} s, {runs:10d} runs, {runs_per_second:14.0f} runs/s, '
+              'max {max_firings_per_second} firings/s'.format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
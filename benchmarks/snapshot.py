@@ -0,0 +1,128 @@
+"""
+Measure saving and reading a binary snapshot of many schedules compared to the JSON list of schedules.
+
+python -m benchmarks.snapshot --schedules 100000
+
+"""
+import gc
+import os
+import asyncio
+import argparse
+import tempfile
+
+from async_sched.schedule import Schedule
+from async_sched.server.messages import RunningSchedule, ListSchedules
+from async_sched.server.snapshot import read_snapshot
+from benchmarks.common import start_scheduler, stop_scheduler, Timer
+from benchmarks.list_schedules import measure_lag
+
+
+__all__ = ['NAME', 'bench_snapshot', 'run', 'get_argparse', 'main']
+
+
+NAME = 'snapshot'
+
+
+def poll(device, timeout=1):
+    pass
+
+
+async def bench_snapshot(schedules: int = 100000) -> dict:
+    """Return the seconds, file size and max loop lag of a snapshot and the seconds to read it back."""
+    srv = await start_scheduler()
+    srv.register_callback(poll)
+    for i in range(schedules):
+        srv.add(f'device {i:06d}', Schedule(hours=1, repeat=True, priority=i % 3), poll, i, timeout=5)
+    await asyncio.sleep(0)  # Let every schedule task start waiting
+    gc.collect()  # Do not count the collection that adding the schedules started
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'snapshot.bin')
+        try:
+            stop = asyncio.Event()
+            lags = []
+            lag_task = asyncio.get_running_loop().create_task(measure_lag(stop, lags))
+            with Timer() as t:
+                await srv.snapshot_async(path)
+            stop.set()
+            await lag_task
+            results['snapshot_async'] = {'seconds': t.elapsed, 'bytes': os.path.getsize(path),
+                                         'max_loop_lag_ms': max(lags, default=0) * 1e3}
+
+            with Timer() as t:
+                srv.snapshot(path)
+            results['snapshot'] = {'seconds': t.elapsed, 'bytes': os.path.getsize(path),
+                                   'max_loop_lag_ms': t.elapsed * 1e3}
+
+            with Timer() as t:
+                read_snapshot(path)
+            results['read'] = {'seconds': t.elapsed, 'bytes': os.path.getsize(path), 'max_loop_lag_ms': 0.0}
+
+            # Read in a thread and add every schedule to a second server
+            standby = await start_scheduler()
+            standby.register_callback(poll)
+            try:
+                stop = asyncio.Event()
+                lags = []
+                lag_task = asyncio.get_running_loop().create_task(measure_lag(stop, lags))
+                with Timer() as t:
+                    await standby.restore_async(path)
+                stop.set()
+                await lag_task
+                results['restore_async'] = {'seconds': t.elapsed, 'bytes': os.path.getsize(path),
+                                            'max_loop_lag_ms': max(lags, default=0) * 1e3}
+            finally:
+                await stop_scheduler(standby)
+
+            # Block the loop with the garbage collector paused and add every schedule to a third server
+            standby = await start_scheduler()
+            standby.register_callback(poll)
+            try:
+                with Timer() as t:
+                    standby.restore(path)
+                results['restore'] = {'seconds': t.elapsed, 'bytes': os.path.getsize(path),
+                                      'max_loop_lag_ms': t.elapsed * 1e3}
+            finally:
+                await stop_scheduler(standby)
+
+            # The same schedules as the JSON ListSchedules reply for comparison
+            with Timer() as t:
+                data = ListSchedules(schedules=[RunningSchedule(name=name, schedule=sched, callback_name='poll')
+                                                for name, (task, sched, *_) in srv.tasks.items()]).json()
+            results['json'] = {'seconds': t.elapsed, 'bytes': len(data), 'max_loop_lag_ms': t.elapsed * 1e3}
+        finally:
+            await stop_scheduler(srv)
+    return results
+
+
+def run(schedules: int = 100000, **kwargs) -> dict:
+    """Return the snapshot timing and size."""
+    return asyncio.run(bench_snapshot(schedules))
+
+
+def get_argparse(schedules: int = 100000, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure saving and reading a snapshot of many schedules.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure saving and reading a snapshot of many schedules.')
+
+    p.add_argument('--schedules', type=int, default=schedules, help='Number of running schedules.')
+
+    return p
+
+
+def main(schedules: int = 100000, **kwargs):
+    results = run(schedules)
+    for name, res in results.items():
+        print('{:>14}: {seconds:8.3f} s, {bytes:10d} bytes, max loop lag {max_loop_lag_ms:8.1f} ms'
+              .format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,82 @@
+"""
+Measure the cost of the run context and trace span that wrap every schedule firing and command.
+
+python -m benchmarks.tracing --count 100000
+
+"""
+import time
+import asyncio
+import argparse
+
+from async_sched.tracing import RunContext, MemoryExporter, Tracer, set_tracer
+from benchmarks.common import summarize
+
+
+__all__ = ['NAME', 'bench_tracing', 'run', 'get_argparse', 'main']
+
+
+NAME = 'tracing'
+
+
+async def callback():
+    pass
+
+
+async def time_firings(count: int, traced: bool) -> list:
+    """Return the nanoseconds each firing took with or without the run context."""
+    times = []
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        if traced:
+            with RunContext('bench'):
+                await callback()
+        else:
+            await callback()
+        times.append(time.perf_counter_ns() - start)
+    return times
+
+
+async def bench_tracing(count: int = 100000) -> dict:
+    """Return the nanoseconds per firing without a context, with tracing disabled and with tracing enabled."""
+    results = {'baseline_ns': summarize(await time_firings(count, False)),
+               'disabled_ns': summarize(await time_firings(count, True))}
+
+    tracer = Tracer(MemoryExporter(max_spans=count), max_queue=count).start()
+    set_tracer(tracer)
+    try:
+        results['enabled_ns'] = summarize(await time_firings(count, True))
+    finally:
+        set_tracer(None)
+        tracer.shutdown()
+    return results
+
+
+def run(count: int = 100000, **kwargs) -> dict:
+    """Return the nanoseconds per firing for each tracing mode."""
+    return asyncio.run(bench_tracing(count))
+
+
+def get_argparse(count: int = 100000, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure the cost of tracing each firing.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure the cost of tracing each firing.')
+
+    p.add_argument('--count', type=int, default=count, help='Number of firings to time for each mode.')
+
+    return p
+
+
+def main(count: int = 100000, **kwargs):
+    results = run(count)
+    for name, res in results.items():
+        print('{:>12}: mean {mean:8.0f} ns, p50 {p50:8.0f} ns, p99 {p99:8.0f} ns'.format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,80 @@
+"""
+Measure the local round trip latency of the TCP transport against the unix domain socket transport.
+
+python -m benchmarks.transport --count 2000
+
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from async_sched.client import Client
+from benchmarks.common import start_scheduler, stop_scheduler, summarize
+
+
+__all__ = ['NAME', 'round_trips', 'bench_transport', 'run', 'get_argparse', 'main']
+
+
+NAME = 'transport'
+
+
+async def round_trips(addr, count: int = 1000):
+    """Return the list of round trip times in seconds for sending ListSchedules to the server at addr."""
+    times = []
+    async with Client(addr) as client:
+        for _ in range(count):
+            start = time.perf_counter()
+            await client.request_schedules(print_results=False)
+            times.append(time.perf_counter() - start)
+    return times
+
+
+async def bench_transport(addr, count: int = 1000, warmup: int = 100):
+    """Start a server at addr and return the round trip statistics in microseconds."""
+    srv = await start_scheduler(addr)
+    try:
+        addr = (srv.ip_address, srv.port)
+        await round_trips(addr, warmup)
+        times = await round_trips(addr, count)
+    finally:
+        await stop_scheduler(srv)
+
+    return summarize(times, 1e6)
+
+
+def run(count: int = 1000, **kwargs) -> dict:
+    """Return the round trip statistics in microseconds for each transport."""
+    results = {'tcp_us': asyncio.run(bench_transport(('127.0.0.1', 0), count))}
+    if hasattr(asyncio, 'start_unix_server'):
+        with tempfile.TemporaryDirectory() as tmp:
+            results['unix_us'] = asyncio.run(bench_transport('unix://' + os.path.join(tmp, 'bench.sock'), count))
+    return results
+
+
+def get_argparse(count: int = 1000, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Compare the TCP and unix domain socket round trip latency.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Compare the TCP and unix domain socket round trip latency.')
+
+    p.add_argument('--count', type=int, default=count, help='Number of round trips to measure.')
+
+    return p
+
+
+def main(count: int = 1000, **kwargs):
+    results = run(count)
+    for name, res in results.items():
+        print('{:>7}: mean {mean:8.1f} us, p50 {p50:8.1f} us, p99 {p99:8.1f} us ({count} round trips)'
+              .format(name, **res))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -0,0 +1,110 @@
+"""
+Measure how long update_commands takes to import and reload schedule modules.
+
+python -m benchmarks.update --modules 10 --schedules 20
+
+"""
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+
+from async_sched.server import set_server
+from benchmarks.common import start_scheduler, stop_scheduler, Timer
+
+
+__all__ = ['NAME', 'MODULE_TEMPLATE', 'write_modules', 'bench_update', 'run', 'get_argparse', 'main']
+
+
+NAME = 'update'
+
+MODULE_TEMPLATE = '''from async_sched import get_server, Schedule
+
+server = get_server()
+
+
+@server.register_callback('{name}_task')
+def task(i):
+    pass
+
+
+for i in range({schedules}):
+    server.add('{name} ' + str(i), Schedule(minutes=5, repeat=True), task, i)
+'''
+
+
+def write_modules(path: str, modules: int = 10, schedules: int = 20):
+    """Write the schedule modules to the path and return the module names."""
+    names = []
+    for i in range(modules):
+        name = f'bench_update_{i}'
+        with open(os.path.join(path, name + '.py'), 'w') as f:
+            f.write(MODULE_TEMPLATE.format(name=name, schedules=schedules))
+        names.append(name)
+    return names
+
+
+async def bench_update(modules: int = 10, schedules: int = 20):
+    """Return the seconds to import the modules, reload all modules and reload one module.
+
+    A reload adds the same schedules again, so it should only swap the new callback functions in. The number of
+    schedule tasks that were replaced by the reloads is reported as restarted.
+    """
+    with tempfile.TemporaryDirectory() as path:
+        names = write_modules(path, modules, schedules)
+        srv = await start_scheduler(update_path=path)
+        set_server(srv)
+        try:
+            with Timer() as t_import:
+                srv.update_commands()
+            tasks = {name: running[0] for name, running in srv.tasks.items()}
+            with Timer() as t_reload:
+                srv.update_commands()
+            with Timer() as t_one:
+                srv.update_commands(names[0])
+            restarted = sum(srv.tasks[name][0] is not task for name, task in tasks.items())
+        finally:
+            set_server(None)
+            await stop_scheduler(srv)
+            for name in names:
+                sys.modules.pop(name, None)
+            sys.path.remove(path)
+
+    return {'schedules': modules * schedules,
+            'import_seconds': t_import.elapsed,
+            'reload_all_seconds': t_reload.elapsed,
+            'reload_one_seconds': t_one.elapsed,
+            'restarted': restarted}
+
+
+def run(modules: int = 10, schedules: int = 20, **kwargs) -> dict:
+    """Return the update_commands timing."""
+    return asyncio.run(bench_update(modules, schedules))
+
+
+def get_argparse(modules: int = 10, schedules: int = 20, parent_parser=None):
+    if parent_parser is None:
+        p = argparse.ArgumentParser(description='Measure the update_commands reload time.')
+    else:
+        p = parent_parser.add_parser(NAME, help='Measure the update_commands reload time.')
+
+    p.add_argument('--modules', type=int, default=modules, help='Number of schedule modules.')
+    p.add_argument('--schedules', type=int, default=schedules, help='Number of schedules in each module.')
+
+    return p
+
+
+def main(modules: int = 10, schedules: int = 20, **kwargs):
+    results = run(modules, schedules)
+    print('import {import_seconds:.3f} s, reload all {reload_all_seconds:.3f} s, reload one {reload_one_seconds:.3f} s '
+          '({schedules} schedules, {restarted} restarted)'.format(**results))
+    return results
+
+
+if __name__ == '__main__':
+    P = get_argparse()
+    ARGS = P.parse_args()
+
+    KWARGS = {n: getattr(ARGS, n) for n in dir(ARGS) if not n.startswith('_') and getattr(ARGS, n, None) is not None}
+    main(**KWARGS)
@@ -36,7 +36,7 @@ if __name__ == "__main__":
     author = meta['author']
     author_email = meta['author_email']
     keywords = 'sched coro async cron crontab'
-    packages = find_packages(exclude=('tests', 'docs', 'bin'))
+    packages = find_packages(exclude=('tests', 'docs', 'bin', 'benchmarks', 'benchmarks.*'))
 
     # Extensions
     extensions = []
@@ -80,6 +80,8 @@ if __name__ == "__main__":
               'serial_json>=1.2.7',
               ],
           extras_require={
+              'yaml': ['PyYAML'],
+              'toml': ['tomli; python_version < "3.11"'],
               },
 
           # entry_points={
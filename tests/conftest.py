@@ -0,0 +1,12 @@
+import asyncio
+
+
+async def start_scheduler(addr=('127.0.0.1', 0), **kwargs):
+    """Start a Scheduler on a free port and wait until it is serving. Shared by the test modules."""
+    from async_sched import Scheduler
+
+    srv = Scheduler(addr, **kwargs)
+    srv.start()
+    while not srv.is_serving():
+        await asyncio.sleep(0.01)
+    return srv
@@ -10,4 +10,4 @@ def print_task1():
 server = get_server()
 
 s = Schedule(seconds=15, repeat=True)
-server.add('Task 1', s, print_task1)  # This will remove existing 'Task 1' and schedule a new 'Task 1'
+server.add('Task 1', s, print_task1)  # This will update a running 'Task 1' or schedule a new 'Task 1'
@@ -0,0 +1,76 @@
+import asyncio
+
+from conftest import start_scheduler
+
+
+def test_pool_reuse():
+    from async_sched import ClientPool, Ping
+
+    async def run():
+        srv = await start_scheduler()
+        pool = ClientPool(health_check=0)
+        addr = (srv.ip_address, srv.port)
+        try:
+            async with pool.connection(addr) as client:
+                first = client
+            assert pool.count_idle(addr) == 1
+
+            async with pool.connection(addr) as client:  # Reused after a ping health check
+                assert client is first
+                assert isinstance(await client.send_ping(), Ping)
+
+            async with pool.connection(addr, reuse=False) as client:
+                pass
+            assert pool.count_idle(addr) == 0
+            assert not client.is_alive()
+        finally:
+            await pool.close_async()
+            srv.stop()
+
+    asyncio.run(run())
+
+
+def test_pool_drops_closed():
+    from async_sched import ClientPool
+
+    async def run():
+        srv = await start_scheduler()
+        pool = ClientPool()
+        addr = (srv.ip_address, srv.port)
+        try:
+            async with pool.connection(addr) as client:
+                first = client
+            await first.stop_async()
+
+            async with pool.connection(addr) as client:
+                assert client is not first
+                assert client.is_alive()
+        finally:
+            await pool.close_async()
+            srv.stop()
+
+    asyncio.run(run())
+
+
+def test_sync_client():
+    from async_sched import SyncClient, ListSchedules
+    from async_sched.client import BackgroundLoop
+
+    server_loop = BackgroundLoop()
+    srv = server_loop.run(start_scheduler())
+    try:
+        with SyncClient((srv.ip_address, srv.port)) as client:
+            for _ in range(10):
+                msg = client.request_schedules(print_results=False)
+                assert isinstance(msg, ListSchedules)
+    finally:
+        server_loop.loop.call_soon_threadsafe(srv.stop)
+        server_loop.stop()
+
+
+if __name__ == '__main__':
+    test_pool_reuse()
+    test_pool_drops_closed()
+    test_sync_client()
+
+    print('All tests finished successfully!')
@@ -109,10 +109,121 @@ def test_serializer():
     assert '_next_run' not in d or d['_next_run'] == s._next_run
 
 
+def test_catch_up():
+    import time
+    import asyncio
+    import datetime
+    from async_sched.schedule import Schedule
+
+    # Host slept for an hour with a one minute schedule
+    now = datetime.datetime.now()
+    start = now - datetime.timedelta(hours=1, seconds=30)
+    s = Schedule(minutes=1, repeat=True, start_on=start, catch_up='none')
+    assert s.count_missed(now) == (60, start + datetime.timedelta(minutes=60))
+    assert s.skip_missed(now)
+    assert s.missed == 60 and s.next_run == start + datetime.timedelta(minutes=61) and s.next_run > now
+
+    # The default runs once for all of the missed runs
+    s = Schedule(minutes=1, repeat=True, start_on=start)
+    assert not s.skip_missed(now)
+    s.start_run(now)
+    assert s.next_run == now + datetime.timedelta(minutes=1)
+
+    # Run all of the missed runs up to max_catch_up with a delay between them
+    async def run():
+        calls = []
+        sched = Schedule(minutes=1, repeat=True, start_on=start, catch_up='all', max_catch_up=3,
+                         catch_up_delay=0.02)
+        started = time.monotonic()
+        for _ in range(4):
+            await sched.call_async(calls.append, 1)
+        assert len(calls) == 3 and sched.missed == 57
+        assert time.monotonic() - started >= 0.04
+        assert sched.next_run > datetime.datetime.now()
+
+    asyncio.run(run())
+
+
+def test_update_settings():
+    import datetime
+    from async_sched.schedule import Schedule
+
+    now = datetime.datetime.now()
+    s = Schedule(minutes=1, repeat=True, start_on=now - datetime.timedelta(seconds=30))
+    assert s.changed_settings(Schedule(minutes=1, repeat=True)) == []  # Both already started
+    assert s.changed_settings(Schedule(minutes=1, repeat=True, start_on=now + datetime.timedelta(hours=1))) == \
+        ['_start_on']
+
+    s.start_run(now)
+    other = Schedule(minutes=5, repeat=True, priority=2)
+    assert s.changed_settings(other) == ['minutes', 'priority']
+    s.update_settings(other)
+    assert s.minutes == 5 and s.priority == 2 and s.last_run == now
+    assert s.next_run == now + datetime.timedelta(minutes=5)
+
+
+def test_simulate():
+    import datetime
+    from async_sched.schedule import Schedule
+    from async_sched.simulate import preview, simulate
+
+    # The virtual clock plays the runs forward at once, so a day is checked without sleeping
+    start = datetime.datetime(2026, 1, 5)  # Monday
+    every = Schedule(minutes=15, repeat=True, start_on=start - datetime.timedelta(minutes=20))
+    daily = Schedule(days=1, at='00:30', repeat=True, weekdays=['monday', 'friday'],
+                     start_on=start - datetime.timedelta(days=1))
+    once = Schedule(seconds=30, start_on=start)
+    assert preview(every, 2, start) == [start + datetime.timedelta(minutes=10), start + datetime.timedelta(minutes=25)]
+    assert preview(daily, 3, start) == [datetime.datetime(2026, 1, d, 0, 30) for d in (5, 9, 12)]
+    assert preview(once, 3, start) == [start + datetime.timedelta(seconds=30)]
+    assert every.last_run is None and every._next_run is None  # Not changed
+
+    sim = simulate({'every': every, 'daily': daily, 'once': once}, start, start + datetime.timedelta(hours=1),
+                   duration={'every': 600})
+    assert sim.runs == {'every': 4, 'daily': 1, 'once': 1}
+    buckets = sim.get_buckets()
+    assert len(buckets) == 61 and sum(bucket['firings'] for bucket in buckets) == 6
+    assert buckets[10] == {'time': start + datetime.timedelta(minutes=10), 'firings': 1, 'concurrency': 1}
+    assert buckets[19]['firings'] == 0 and buckets[19]['concurrency'] == 1  # The run from minute 10 is still active
+    assert sim.peak == 2 and sim.peak_time == start + datetime.timedelta(minutes=30)  # daily starts during every
+    assert sim.get_histograms()['firings'] == {0: 55, 1: 6}
+
+
+def test_virtual_clock():
+    import time
+    import asyncio
+    from async_sched.schedule import Schedule
+    from async_sched.utils import REAL_CLOCK, get_clock
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+    runs = []
+
+    async def run():
+        assert get_clock() is clock
+        sched = Schedule(minutes=1, repeat=True)  # start_on is the virtual now
+        task = asyncio.ensure_future(sched.run_async(lambda: runs.append(clock.now())))
+        await asyncio.sleep(630)  # Ten and a half virtual minutes
+        task.cancel()
+        assert time.time() - real_start < 5  # The time module and other threads keep the real time
+        return clock.elapsed
+
+    real_start = time.time()
+    assert clock.run(run()) >= 630
+    assert time.time() - real_start < 5  # Ten virtual minutes do not take ten real minutes
+    assert get_clock() is REAL_CLOCK
+    assert len(runs) == 10
+    assert all(abs((b - a).total_seconds() - 60) < 0.01 for a, b in zip(runs, runs[1:]))
+
+
 if __name__ == '__main__':
     test_import()
     test_constructor()
     test_interval_properties()
     test_serializer()
+    test_catch_up()
+    test_update_settings()
+    test_simulate()
+    test_virtual_clock()
 
     print('All tests finished successfully!')
@@ -0,0 +1,1251 @@
+import os
+import asyncio
+import tempfile
+
+from conftest import start_scheduler
+
+
+def test_unix_address():
+    from async_sched.utils import is_unix_address, get_unix_path
+
+    assert is_unix_address('unix:///tmp/async_sched.sock')
+    assert not is_unix_address('127.0.0.1')
+    assert not is_unix_address(None)
+    assert get_unix_path('unix:///tmp/async_sched.sock') == '/tmp/async_sched.sock'
+
+
+def test_tcp_round_trip():
+    from async_sched import Client, ListSchedules
+
+    async def run():
+        srv = await start_scheduler()
+        try:
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.request_schedules(print_results=False)
+                assert isinstance(msg, ListSchedules)
+                assert msg.schedules == []
+        finally:
+            srv.stop()
+
+    asyncio.run(run())
+
+
+def test_unix_round_trip():
+    from async_sched import Client, ListSchedules
+
+    if not hasattr(asyncio, 'start_unix_server'):
+        return  # Unix domain sockets are not available on this platform
+
+    async def run(addr):
+        srv = await start_scheduler(addr)
+        try:
+            async with Client(addr) as client:
+                msg = await client.request_schedules(print_results=False)
+                assert isinstance(msg, ListSchedules)
+        finally:
+            srv.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run('unix://' + os.path.join(tmp, 'test.sock')))
+
+
+def test_list_schedules_filters():
+    import datetime
+    from async_sched import Client, Schedule, Ping
+    from async_sched.client.client import check_chunk
+
+    def poll(device):
+        pass
+
+    def report():
+        pass
+
+    async def run():
+        srv = await start_scheduler()
+        srv.register_callback(poll)
+        for i in range(25):
+            srv.add(f'poll {i:02d}', Schedule(hours=1), poll, i)
+        srv.add('report', Schedule(minutes=1), report)
+
+        try:
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.request_schedules(print_results=False, prefix='poll')
+                assert [r.name for r in msg.schedules] == [f'poll {i:02d}' for i in range(25)]
+                assert all(r.callback_name == 'poll' for r in msg.schedules)
+
+                msg = await client.request_schedules(print_results=False, callback_name='report')
+                assert [r.name for r in msg.schedules] == ['report']
+
+                soon = datetime.datetime.now() + datetime.timedelta(minutes=5)
+                msg = await client.request_schedules(print_results=False, next_run_before=soon)
+                assert [r.name for r in msg.schedules] == ['report']
+                msg = await client.request_schedules(print_results=False, next_run_after=soon)
+                assert len(msg.schedules) == 25
+
+                # Pages
+                names = []
+                cursor = ''
+                while True:
+                    msg = await client.request_schedules(print_results=False, limit=10, cursor=cursor)
+                    names.extend(r.name for r in msg.schedules)
+                    cursor = msg.cursor
+                    if not cursor:
+                        break
+                assert names == sorted(srv.tasks)
+
+                # Stream
+                msg = await client.request_schedules(print_results=False, stream=True, chunk_size=4)
+                assert [r.name for r in msg.schedules] == sorted(srv.tasks)
+                names = [r.name async for r in client.iter_schedules(prefix='poll 1', chunk_size=3)]
+                assert names == [f'poll {i}' for i in range(10, 20)]
+
+                # The connection is still usable after streaming
+                msg = await client.request_schedules(print_results=False, limit=1)
+                assert msg.cursor == 'poll 00'
+
+                # Stopping a stream early does not leave stale chunks for the next request
+                async for running in client.iter_schedules(chunk_size=2):
+                    break
+                assert client.streaming
+                assert isinstance(await client.send_ping(), Ping)
+                assert not client.streaming
+
+                try:
+                    check_chunk(None)
+                    raise AssertionError('A closed stream must raise an error!')
+                except ConnectionError:
+                    pass
+        finally:
+            for name in list(srv.tasks):
+                srv.remove(name)
+            srv.stop()
+
+    asyncio.run(run())
+
+
+def test_background_jobs():
+    from async_sched import Client, JobStatus, JobResult
+
+    async def run():
+        srv = await start_scheduler()
+        srv.jobs.max_results = 2
+        release = asyncio.Event()
+
+        @srv.register_callback
+        async def add(a, b):
+            await release.wait()
+            return a + b
+
+        @srv.register_callback
+        async def fail():
+            raise ValueError('Invalid value given!')
+
+        try:
+            async with Client((srv.ip_address, srv.port)) as client:
+                jobs = [await client.start_command('add', i, 1) for i in range(3)]
+                assert all(isinstance(job, JobStatus) and job.status == 'running' for job in jobs)
+
+                # The connection is not blocked while the jobs run
+                msg = await client.job_status(jobs[0].job_id)
+                assert msg.status == 'running'
+
+                release.set()
+                msg = await client.job_result(jobs[2].job_id, wait=True, timeout=1)
+                assert isinstance(msg, JobResult)
+                assert msg.status == 'finished' and msg.result == 3
+
+                msg = await client.job_result((await client.start_command('fail')).job_id, wait=True)
+                assert msg.status == 'failed' and 'Invalid value' in msg.error
+
+                # Bounded result cache drops the oldest result
+                msg = await client.job_status(jobs[0].job_id)
+                assert msg.status == 'unknown'
+
+                release.clear()
+                job = await client.start_command('add', 1, 1)
+                msg = await client.cancel_job(job.job_id)
+                assert msg.status == 'cancelled'
+        finally:
+            srv.stop()
+
+    asyncio.run(run())
+
+
+def test_subscriber_backpressure():
+    from async_sched import Event
+    from async_sched.server import Subscriber
+
+    async def run():
+        sub = Subscriber(events=['fired', 'removed'], max_queue=2)
+        assert sub.matches('fired', 'a') and not sub.matches('finished', 'a')
+
+        sub.put(Event(event='fired', name='a'))
+        sub.put(Event(event='fired', name='b'))
+        sub.put(Event(event='fired', name='a'))  # Coalesced into the waiting "a" event
+        assert len(sub.queue) == 2
+        sub.put(Event(event='removed', name='c'))  # Drops the oldest event
+
+        msg = await sub.get()
+        assert (msg.name, msg.count, msg.dropped) == ('b', 1, 2)
+        msg = await sub.get()
+        assert (msg.name, msg.count, msg.dropped) == ('c', 1, 0)
+
+    asyncio.run(run())
+
+
+def test_subscribe_events():
+    from async_sched import Client, Schedule
+
+    async def run():
+        srv = await start_scheduler()
+        calls = []
+
+        async def tick():
+            calls.append(1)
+            if len(calls) == 2:
+                raise ValueError('Second call fails')
+
+        received = []
+        try:
+            async with Client((srv.ip_address, srv.port)) as client:
+                events = client.subscribe(prefix='tick')
+                srv.loop.call_later(0.1, srv.add, 'tick', Schedule(milliseconds=20, repeat=True), tick)
+                async for event in events:
+                    received.append(event)
+                    if event.event == 'failed':
+                        srv.remove('tick')
+                    if event.event == 'removed':
+                        break
+        finally:
+            srv.remove('tick')
+            srv.stop()
+
+        names = [(e.event, e.name) for e in received]
+        assert names[:5] == [('added', 'tick'), ('fired', 'tick'), ('finished', 'tick'),
+                             ('fired', 'tick'), ('failed', 'tick')]
+        assert names[-1] == ('removed', 'tick')
+        assert 'Second call fails' in received[4].error
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_profiler():
+    import time
+    from async_sched import Client, Profile, Schedule
+
+    async def run():
+        srv = await start_scheduler(profile=True, slow_callback_duration=0.02)
+        fired = asyncio.Event()
+
+        @srv.register_callback
+        async def blocking():
+            await asyncio.sleep(0.01)  # Awaiting does not count as blocking
+            time.sleep(0.03)
+            fired.set()
+
+        @srv.register_callback
+        def quick():
+            return 1
+
+        try:
+            srv.add('Block 1', Schedule(seconds=0.01), blocking)
+            await fired.wait()
+            srv.remove('Block 1')
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                await client.run_command('quick')
+                msg = await client.request_profile(print_results=False)
+                assert isinstance(msg, Profile) and msg.enabled
+                assert [prof.callback_name for prof in msg.profiles] == ['blocking', 'quick']
+
+                prof = msg.profiles[0]
+                assert prof.calls >= 1 and prof.steps >= 2 and prof.slow_steps >= 1
+                assert prof.max_step >= 0.03 and prof.wall < prof.elapsed
+                assert prof.slow_name == 'Block 1'
+                assert msg.profiles[1].calls == 1 and msg.profiles[1].slow_steps == 0
+
+                msg = await client.request_profile(print_results=False, sort='calls', limit=1, reset=True,
+                                                   enabled=False)
+                assert len(msg.profiles) == 1 and not msg.enabled
+                msg = await client.request_profile(print_results=False)
+                assert msg.profiles == []
+        finally:
+            srv.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_lag_shedding():
+    from async_sched import Client, Schedule, Busy, Stats
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler(shed_lag=0.2, busy_lag=0.5)
+        srv.lag.max_defer = 0.3
+        runs = {'on_time': 0, 'deferred': 0, 'skipped': 0}
+        shed_runs = {'on_time': 0, 'deferred': 0, 'skipped': 0}
+
+        @srv.register_callback
+        def count(name):
+            runs[name] += 1
+            if srv.lag.is_shedding():
+                shed_runs[name] += 1
+
+        try:
+            srv.add('on_time', Schedule(seconds=0.05, repeat=True), count, 'on_time')
+            srv.add('deferred', Schedule(seconds=0.05, repeat=True, shed='defer'), count, 'deferred')
+            srv.add('skipped', Schedule(seconds=0.05, repeat=True, shed='skip'), count, 'skipped')
+            await asyncio.sleep(0.2)
+            assert all(runs.values())
+
+            clock.advance(1.5)  # Block the loop
+            while not srv.lag.is_busy():
+                await asyncio.sleep(0)
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.schedule_command('new', Schedule(seconds=1), 'count', 'on_time')
+                assert isinstance(msg, Busy) and msg.lag >= 0.5
+
+                while srv.lag.is_shedding():
+                    await asyncio.sleep(0.01)
+                msg = await client.request_stats(print_results=False)
+                assert isinstance(msg, Stats) and msg.schedules == 3 and msg.max_lag >= 1.0
+                assert msg.counters['rejected'] == 1 and msg.counters['skipped'] >= 1
+                assert msg.counters['deferred'] >= 1
+
+            # Only high priority schedules ran while shedding. Deferred runs waited until the lag cleared.
+            assert shed_runs['on_time'] >= 1 and shed_runs['skipped'] == 0 and shed_runs['deferred'] == 0
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_priority():
+    import datetime
+    from async_sched import Client, Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler(max_concurrent=2)
+        order = []
+        done = asyncio.Event()
+
+        @srv.register_callback
+        async def record(priority):
+            order.append(priority)
+            await asyncio.sleep(0.01)
+            if len(order) == 20:
+                done.set()
+
+        try:
+            # Every schedule is due at the same time and the lowest priorities are added first
+            due = clock.now() + datetime.timedelta(seconds=0.1)
+            for i in range(20):
+                srv.add(f'Task {i}', Schedule(seconds=1, next_run=due, priority=i % 5), record, i % 5)
+            await done.wait()
+            assert order == sorted(order, reverse=True)
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.request_stats(print_results=False)
+                assert list(msg.lateness) == ['4', '3', '2', '1', '0']
+                assert all(late['count'] == 4 for late in msg.lateness.values())
+                # Two callbacks run at a time so the low priorities waited for the high priorities
+                assert msg.lateness['0']['mean'] > msg.lateness['4']['mean']
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_precise_schedule():
+    from async_sched import Client, Schedule
+    from async_sched.simulate import VirtualClock
+
+    # The virtual clock makes the timing exact and the same on every run, even on a loaded machine
+    clock = VirtualClock(step=1e-5)
+
+    async def run():
+        srv = await start_scheduler()
+        times = []
+
+        @srv.register_callback
+        def record():
+            times.append(clock.perf_counter())
+
+        try:
+            sched = Schedule(seconds=0.005, repeat=True, spin=0.002, start_on=clock.now())
+            srv.add('Precise', sched, record)
+            await asyncio.sleep(0.5)
+            srv.remove('Precise')
+
+            # Fixed rate without drift, so every tick of the half second runs on the 5 ms grid
+            assert 99 <= len(times) <= 100
+            ticks = round((times[-1] - times[0]) / 0.005)
+            assert ticks == len(times) - 1 and sched.missed == 0
+            assert abs((times[-1] - times[0]) - ticks * 0.005) < 1e-4
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.request_stats(print_results=False)
+                assert msg.jitter['Precise']['count'] == len(times)
+                assert msg.jitter['Precise']['p50'] < 1e-4
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_precise_missed_ticks():
+    from async_sched import Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock(step=1e-5)
+
+    async def run():
+        srv = await start_scheduler()
+        times = []
+
+        @srv.register_callback
+        def record():
+            times.append(clock.perf_counter())
+            if len(times) == 10:
+                clock.advance(0.012)  # The callback blocks the loop for 12 ms
+
+        try:
+            sched = Schedule(seconds=0.005, repeat=True, spin=0.002, start_on=clock.now())
+            srv.add('Precise', sched, record)
+            await asyncio.sleep(0.1)
+            srv.remove('Precise')
+
+            # The late run starts at once. The runs after it skip the missed ticks and keep the phase instead of
+            # running a burst.
+            ticks = [(t - times[0]) / 0.005 for t in times]
+            assert abs(ticks[10] - 11.4) < 0.02  # Woke 1.4 ticks after tick 10 was due, so it runs as tick 11
+            assert all(abs(tick - round(tick)) < 0.02 for i, tick in enumerate(ticks) if i != 10)
+            assert sched.missed == 1
+            assert round(ticks[-1]) - (len(times) - 1) == sched.missed
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_batch_callback():
+    import datetime
+    from async_sched import Client, Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler()
+        batches = []
+        done = asyncio.Event()
+
+        @srv.register_callback(batch=True, batch_window=0.05)
+        async def poll(items):
+            batches.append(sorted(args[0] for args, kwargs in items))
+            if sum(len(b) for b in batches) >= 51:
+                done.set()
+            return [args[0] * kwargs.get('scale', 1) for args, kwargs in items]
+
+        try:
+            due = clock.now() + datetime.timedelta(seconds=0.1)
+            for i in range(50):
+                srv.add(f'Device {i}', Schedule(seconds=1, next_run=due), poll, i, scale=2)
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                job = await client.start_command('poll', 100)
+                msg = await client.job_result(job.job_id, wait=True, timeout=1)
+                assert msg.result == 100  # Each caller gets its own item of the returned list
+
+                await asyncio.wait_for(done.wait(), 1)
+                assert batches[0] == [100]
+                assert batches[1] == list(range(50))  # Schedules due together were one call
+
+                msg = await client.request_stats(print_results=False)
+                assert msg.counters['batch_calls'] == 2 and msg.counters['batched'] == 51
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_cached_command():
+    from async_sched import Client
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler()
+        calls = []
+        release = asyncio.Event()
+
+        @srv.register_callback(cache=True, cache_ttl=0.2, cache_size=2)
+        async def report(name, days=1):
+            calls.append((name, days))
+            await release.wait()
+            return f'{name} {days}'
+
+        try:
+            async with Client((srv.ip_address, srv.port)) as client:
+                # Identical requests that run together share one call
+                jobs = [await client.start_command('report', 'sales', days=7) for _ in range(3)]
+                release.set()
+                results = [(await client.job_result(job.job_id, wait=True)).result for job in jobs]
+                assert results == ['sales 7'] * 3 and calls == [('sales', 7)]
+
+                await client.run_command('report', 'sales', days=7)
+                assert len(calls) == 1  # Cached
+
+                await client.run_command('report', 'sales', days=1)
+                await client.run_command('report', 'costs')
+                await client.run_command('report', 'sales', days=7)
+                assert len(calls) == 4  # Least recently used result was evicted
+
+                await asyncio.sleep(0.25)
+                await client.run_command('report', 'costs')
+                assert len(calls) == 5  # Expired
+
+                msg = await client.request_stats(print_results=False)
+                assert msg.counters['cache_hits'] == 1 and msg.counters['cache_shared'] == 2
+                assert msg.counters['cache_misses'] == 5
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_retry_schedule():
+    import datetime
+    from async_sched import Client, Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler()
+        calls = []
+        retried = asyncio.Event()
+        dead = asyncio.Event()
+
+        @srv.register_callback
+        def flaky(name, fail_until):
+            calls.append(name)
+            if calls.count(name) <= fail_until:
+                raise ValueError(f'{name} failed')
+            retried.set()
+
+        try:
+            due = clock.now() + datetime.timedelta(seconds=0.05)
+            sched = Schedule(days=1, repeat=True, next_run=due, retries=2, retry_delay=0.1, retry_jitter=0)
+            srv.add('Daily', sched, flaky, 'Daily', 2)
+            srv.add('Broken', Schedule(days=1, next_run=due, retries=1, retry_delay=0.1), flaky, 'Broken', 10)
+
+            await asyncio.sleep(0.1)
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.request_schedules(print_results=False, prefix='Daily')
+                retrying = msg.schedules[0].schedule
+                assert retrying.attempt == 1 and retrying.last_error == 'Daily failed'
+                assert retrying.retry_run is not None and retrying.next_run == retrying.retry_run
+
+                # Backoff is 0.1 s then 0.2 s. The retry keeps the regular daily time.
+                await asyncio.wait_for(retried.wait(), 1)
+                assert calls.count('Daily') == 3 and sched.attempt == 0 and sched.retry_run is None
+                assert sched.next_run.date() == (due + datetime.timedelta(days=1)).date()
+
+                msg = await client.request_stats(print_results=False)
+                assert msg.counters['retries'] == 3 and msg.counters['dead_letters'] == 1
+                assert calls.count('Broken') == 2
+                assert msg.dead_letters[0]['name'] == 'Broken' and msg.dead_letters[0]['attempts'] == 2
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_dependencies():
+    import datetime
+    from async_sched import Client, Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler()
+        calls = []
+        fail = set()
+        finished = asyncio.Event()
+
+        @srv.register_callback
+        async def step(name):
+            if name in fail:
+                raise ValueError(f'{name} failed')
+            calls.append(name)
+            if name == 'Report':
+                finished.set()
+
+        try:
+            due = clock.now() + datetime.timedelta(seconds=0.1)
+            srv.add('Extract', Schedule(seconds=0.3, repeat=True, next_run=due), step, 'Extract')
+            srv.add('Load', Schedule(seconds=0.3, repeat=True, next_run=due), step, 'Load')
+            srv.add('Transform', None, step, 'Transform', after=['Extract'])
+            srv.add('Report', None, step, 'Report', after=['Transform', 'Load'])
+
+            try:
+                srv.add('Extract', Schedule(seconds=1), step, 'Extract', after=['Report'])
+                raise AssertionError('A cycle should raise a ValueError')
+            except ValueError:
+                pass
+            assert 'Extract' in srv.tasks
+
+            await asyncio.wait_for(finished.wait(), 1)
+            assert calls.index('Transform') > calls.index('Extract')
+            assert calls.index('Report') > max(calls.index('Transform'), calls.index('Load'))
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.request_schedules(print_results=False, prefix='Report')
+                assert msg.schedules[0].after == ['Load', 'Transform']
+
+            # A failed upstream schedule stops every schedule downstream of it
+            sub = srv.events.subscribe(events=['failed'])
+            fail.add('Extract')
+            errors = {}
+            while len(errors) < 3:
+                event = await sub.get()
+                errors[event.name] = event.error
+            assert errors['Extract'] == 'Extract failed'
+            assert errors['Transform'] == errors['Report'] == 'Upstream "Extract" failed: Extract failed'
+            assert srv.counters['upstream_failed'] == 2
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_rate_limit():
+    from async_sched import Client, Schedule, Error
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler()
+        times = []
+
+        @srv.register_callback(rate=20, rate_burst=2)
+        def call_api(value):
+            times.append(clock.monotonic())
+            return value
+
+        @srv.register_callback(rate=1, rate_policy='drop')
+        def notify():
+            times.append(0)
+
+        failed = []
+
+        @srv.register_callback(rate=4, rate_burst=1, rate_policy='drop')
+        def flaky():
+            failed.append(clock.monotonic())
+            raise ValueError('Always fails')
+
+        try:
+            # Every schedule and command shares the same bucket
+            for i in range(4):
+                srv.add(f'api {i}', Schedule(milliseconds=1), call_api, i)
+
+            async def run_command(i):
+                async with Client((srv.ip_address, srv.port)) as cli:
+                    return await cli.run_command('call_api', i)
+
+            await asyncio.gather(*(run_command(i) for i in range(4)))
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                while len(times) < 8:
+                    await asyncio.sleep(0.01)
+
+                # Two calls at once then one every 50 ms
+                assert times[-1] - times[0] >= 6 * 0.05 * 0.9
+                msg = await client.request_stats(print_results=False)
+                assert msg.rate_limits['call_api']['allowed'] == 8 and msg.rate_limits['call_api']['depth'] == 0
+
+                await client.run_command('notify')
+                dropped = await client.run_command('notify')
+                assert isinstance(dropped, Error)
+                msg = await client.request_stats(print_results=False)
+                assert msg.rate_limits['notify']['dropped'] == 1 and msg.counters['rate_dropped'] == 1
+
+            # A retry the rate limit drops is retried later instead of forgetting the failure
+            srv.add('Flaky', Schedule(milliseconds=1, retries=1, retry_delay=0.05, retry_jitter=0), flaky)
+            while srv.counters['dead_letters'] < 1:
+                await asyncio.sleep(0.01)
+            assert len(failed) == 2 and failed[1] - failed[0] >= 0.2  # The retry waited for the next token
+            assert srv.counters['rate_dropped'] > 1 and srv.counters['retries'] == 1
+            assert srv.dead_letters[0]['name'] == 'Flaky' and srv.dead_letters[0]['attempts'] == 2
+            assert srv.tasks['Flaky'][1].last_error == 'Always fails'
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_timeout():
+    import threading
+    from async_sched import Client, Schedule, Error, get_cancel_token
+
+    async def run():
+        srv = await start_scheduler()
+        stopped = threading.Event()
+
+        @srv.register_callback
+        async def hang():
+            await asyncio.sleep(10)
+
+        @srv.register_callback(thread=True)
+        def poll():
+            token = get_cancel_token()
+            while not token.wait(0.01):
+                pass
+            stopped.set()
+
+        cached_stopped = threading.Event()
+        cached_calls = []
+
+        @srv.register_callback(thread=True, cache=True)
+        def cached_poll(value):
+            cached_calls.append(value)
+            if len(cached_calls) > 1:
+                return 'done'
+            token = get_cancel_token()
+            while not token.wait(0.01):
+                pass
+            cached_stopped.set()
+
+        try:
+            srv.add('Hang', Schedule(milliseconds=10, repeat=True, timeout=0.05, retries=1, retry_delay=0.01), hang)
+            while srv.counters['dead_letters'] < 1:
+                await asyncio.sleep(0.01)
+            assert srv.counters['timeouts'] == 2 and srv.counters['retries'] == 1
+            assert 'timed out' in srv.dead_letters[0]['error']
+            srv.remove('Hang')
+
+            # The thread stops when the command times out
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.run_command('poll', command_timeout=0.05)
+                assert isinstance(msg, Error)
+                assert await asyncio.get_running_loop().run_in_executor(None, stopped.wait, 1)
+
+                msg = await client.request_stats(print_results=False)
+                assert msg.counters['timeouts'] == 3
+
+                # A cached call that timed out is cancelled, so the next identical call runs again
+                msg = await client.run_command('cached_poll', 1, command_timeout=0.05)
+                assert isinstance(msg, Error) and not srv.caches['cached_poll'].in_flight
+                assert await asyncio.get_running_loop().run_in_executor(None, cached_stopped.wait, 1)
+                msg = await client.run_command('cached_poll', 1, command_timeout=1)
+                assert not isinstance(msg, Error) and cached_calls == [1, 1]
+        finally:
+            srv.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_graceful_shutdown():
+    import os
+    import json
+    import datetime
+    import tempfile
+    from async_sched import Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run(state_path):
+        srv = await start_scheduler(state_path=state_path)
+        started = asyncio.Event()
+        finished = []
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.2)
+            finished.append(1)
+
+        due = clock.now() + datetime.timedelta(seconds=0.01)
+        srv.add('Daily', Schedule(days=1, repeat=True, next_run=due), slow)
+        srv.add('Later', Schedule(days=1, repeat=True), slow)
+        await started.wait()
+
+        # The running callback finishes before the server stops
+        await srv.shutdown_async(deadline=1)
+        assert finished == [1] and not srv.tasks and not srv.is_serving()
+        with open(state_path) as f:
+            state = json.load(f)['schedules']
+        assert list(state) == ['Daily']
+        last_run = datetime.datetime.fromisoformat(state['Daily']['last_run'])
+
+        # A restarted server continues from the saved last run
+        srv = await start_scheduler(state_path=state_path)
+        try:
+            sched = Schedule(days=1, repeat=True)
+            srv.add('Daily', sched, slow)
+            assert sched.next_run == last_run + datetime.timedelta(days=1)
+        finally:
+            srv.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clock.run(asyncio.wait_for(run(os.path.join(tmp, 'state.json')), 5))
+
+
+def test_drain_saves_real_runs():
+    import os
+    import json
+    import datetime
+    import tempfile
+    from async_sched import Schedule
+    from async_sched.simulate import VirtualClock
+
+    clock = VirtualClock()
+
+    async def run(state_path):
+        srv = await start_scheduler(state_path=state_path)
+        started = asyncio.Event()
+        ticks = []
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.3)
+
+        tick = Schedule(seconds=0.02, repeat=True)
+        srv.add('Tick', tick, lambda: ticks.append(tick.last_run))
+        srv.add('Slow', Schedule(seconds=0.01), slow)
+        await started.wait()
+        await asyncio.sleep(0.05)
+
+        # Tick comes due many times while the slow callback drains, but those runs never happen
+        await srv.shutdown_async(deadline=1)
+        with open(state_path) as f:
+            state = json.load(f)['schedules']
+        assert len(ticks) >= 2
+        assert datetime.datetime.fromisoformat(state['Tick']['last_run']) == ticks[-1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clock.run(asyncio.wait_for(run(os.path.join(tmp, 'state.json')), 5))
+
+
+def test_tracing():
+    from async_sched import Client, Schedule, enable_tracing, disable_tracing, get_run_context, start_span
+
+    async def run():
+        srv = await start_scheduler()
+        tracer = enable_tracing()
+        contexts = []
+
+        @srv.register_callback
+        async def work():
+            ctx = get_run_context()
+            contexts.append((ctx.name, ctx.kind, ctx.run_id, ctx.actual))
+            with start_span('fetch', url='http://example.com'):
+                pass
+
+        try:
+            srv.add('Work', Schedule(milliseconds=10, repeat=False), work)
+            async with Client((srv.ip_address, srv.port)) as client:
+                while not contexts:
+                    await asyncio.sleep(0.01)
+                await client.run_command('work')
+        finally:
+            srv.stop()
+            disable_tracing()
+
+        assert [ctx[:2] for ctx in contexts] == [('Work', 'schedule'), ('work', 'command')]
+        assert get_run_context() is None
+        assert len(tracer.exporter.spans) == 4 and tracer.dropped == 0
+        spans = {span['name']: span for span in tracer.exporter.spans}
+        firing = spans['schedule Work']
+        assert firing['spanId'] == contexts[0][2] and firing['status']['code'] == 'OK'
+        assert 'async_sched.lateness' in firing['attributes']
+        command = spans['command work']
+        assert command['kind'] == 'SERVER' and command['spanId'] == contexts[1][2]
+
+        # The downstream spans are children of the run that started them
+        fetches = [span for span in tracer.exporter.spans if span['name'] == 'fetch']
+        assert sorted(span['parentSpanId'] for span in fetches) == sorted([firing['spanId'], command['spanId']])
+        assert {span['traceId'] for span in fetches} == {firing['traceId'], command['traceId']}
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_history():
+    from async_sched import Client, Schedule, Error
+    from async_sched.server import RunHistory
+    from async_sched.simulate import VirtualClock
+
+    history = RunHistory(3)
+    for i in range(5):
+        history.record(1000.0 + i, 0.5, 0.25, 'failed' if i == 4 else 'succeeded')
+    runs = history.runs()
+    assert len(history) == 3 and history.nbytes == 3 * RunHistory.ENTRY_BYTES
+    assert [run.started.timestamp() for run in runs] == [1004.0, 1003.0, 1002.0]
+    assert runs[0].outcome == 'failed' and runs[0].duration == 0.25 and runs[0].planned.timestamp() == 1003.5
+    assert len(history.runs(2)) == 2
+
+    clock = VirtualClock()
+
+    async def run():
+        srv = await start_scheduler(history_size=4)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            if len(calls) == 2:
+                raise ValueError('Second run fails')
+
+        try:
+            srv.add('Work', Schedule(milliseconds=10, repeat=True), work)
+            while len(calls) < 6:
+                await asyncio.sleep(0.01)
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.get_history('Work', print_results=False)
+                assert len(msg.runs) == 4 and all(run.outcome == 'succeeded' for run in msg.runs)
+                assert msg.runs[0].started > msg.runs[1].started
+                assert all(run.started >= run.planned for run in msg.runs)
+
+                msg = await client.get_history('Work', limit=10, print_results=False)
+                assert len(msg.runs) == 4
+                msg = await client.get_history('Missing', print_results=False)
+                assert isinstance(msg, Error)
+        finally:
+            srv.stop()
+
+    clock.run(asyncio.wait_for(run(), 5))
+
+
+def test_snapshot():
+    import datetime
+    from async_sched import Schedule
+
+    async def run(path):
+        srv = await start_scheduler()
+        restored = await start_scheduler()
+
+        async def extract(day, source='db'):
+            pass
+
+        async def report():
+            pass
+
+        async def unknown():
+            pass
+
+        for s in (srv, restored):
+            s.register_callback(extract)
+            s.register_callback(report)
+
+        start = datetime.datetime.now().replace(microsecond=678901) + datetime.timedelta(days=1)
+        try:
+            srv.add('Extract', Schedule(hours=1, seconds=1.5, repeat=True, start_on=start, priority=3, retries=2,
+                                        timeout=10, catch_up='all', shed='skip'),
+                    extract, datetime.date(2024, 1, 2), source='api')
+            srv.add('Daily', Schedule(days=1, at=datetime.time(6, 30), weekdays=['monday', 'friday'], repeat=True,
+                                      start_on=start, end_on=start + datetime.timedelta(days=30)), extract, 5)
+            srv.add('Report', Schedule(retries=1), report, after=['Extract', 'Daily'])
+            srv.add('Unknown', Schedule(minutes=5, repeat=True), unknown)
+            srv.tasks['Report'][1].misfire_grace_time = None  # Always run late runs
+            srv.tasks['Daily'][1].last_run = start + datetime.timedelta(days=1)
+            srv.tasks['Daily'][1].last_error = 'Failed once'
+
+            assert await srv.snapshot_async(path) == 4
+            assert await restored.restore_async(path, chunk_size=2) == 3  # The callback of Unknown is not registered
+            assert list(restored.tasks) == ['Extract', 'Daily', 'Report']
+            for name, (task, sched, callback, args, kwargs) in restored.tasks.items():
+                old = srv.tasks[name]
+                assert sched.dict() == old[1].dict() and sched.weekdays == old[1].weekdays
+                assert sched.last_error == old[1].last_error and sched.timeout == old[1].timeout
+                assert sched.misfire_grace_time == old[1].misfire_grace_time
+                assert callback is old[2] and args == old[3] and kwargs == old[4]
+            assert restored.tasks['Report'][1].misfire_grace_time is None
+            assert restored.tasks['Extract'][1].misfire_grace_time == 1
+            assert restored.graph.get_after('Report') == ['Daily', 'Extract']
+
+            # The blocking version writes the same file
+            assert srv.snapshot(path) == 4
+            with open(path, 'rb') as f:
+                assert f.read(4) == b'ASNP'
+            assert restored.restore(path) == 3
+            assert restored.tasks['Extract'][3] == (datetime.date(2024, 1, 2),)
+        finally:
+            srv.stop()
+            restored.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(asyncio.wait_for(run(os.path.join(tmp, 'snapshot.bin')), 5))
+
+
+def test_upsert():
+    from async_sched import Schedule
+
+    async def run():
+        srv = await start_scheduler()
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def slow():
+            calls.append('slow')
+            started.set()
+            await release.wait()
+            calls.append('slow done')
+
+        async def fast():
+            calls.append('fast')
+
+        try:
+            srv.add('Idle', Schedule(hours=1, repeat=True), fast, 1)
+            task, sched = srv.tasks['Idle'][:2]
+            srv.add('Idle', Schedule(hours=1, repeat=True), fast, 1)  # No-op
+            assert srv.counters['unchanged'] == 1 and srv.tasks['Idle'][:2] == [task, sched]
+            srv.add('Idle', Schedule(hours=1, repeat=True, priority=1), slow)  # Setting and callback swap
+            assert srv.tasks['Idle'][0] is task and srv.tasks['Idle'][2] is slow and sched.priority == 1
+
+            # A timing change makes the next run again from the new interval
+            srv.add('Idle', Schedule(milliseconds=10, repeat=True), slow)
+            assert srv.tasks['Idle'][1] is sched and sched.milliseconds == 10
+            await asyncio.wait_for(started.wait(), 1)
+
+            # The callback in flight finishes and the next firing runs the new callback
+            srv.add('Idle', Schedule(milliseconds=20, repeat=True), fast)
+            release.set()
+            while calls.count('fast') < 2:
+                await asyncio.sleep(0.01)
+            assert calls[:3] == ['slow', 'slow done', 'fast']
+
+            # Changing the after names replaces the task
+            running = srv.tasks['Idle'][0]
+            srv.add('Idle', Schedule(), fast, after=['Other'])
+            assert srv.tasks['Idle'][0] is not running and srv.graph.get_after('Idle') == ['Other']
+        finally:
+            release.set()
+            srv.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_manifest():
+    import json
+    from async_sched import Client, Schedule, Error
+    from async_sched.server import parse_manifest
+
+    entries = parse_manifest({'schedules': [{'name': 'A', 'callback': 'work', 'minutes': 5,
+                                             'schedule': {'repeat': True}, 'after': ['C', 'B']}]})
+    assert entries == {'A': {'callback': 'work', 'schedule': {'repeat': True, 'minutes': 5}, 'args': [],
+                             'kwargs': {}, 'after': ['B', 'C']}}
+
+    async def run(tmp):
+        path = os.path.join(tmp, 'schedules.json')
+        manifest = {'schedules': {
+            'Keep': {'callback': 'work', 'minutes': 5, 'repeat': True},
+            'Change': {'callback': 'work', 'args': [1], 'minutes': 5, 'repeat': True},
+            'Remove': {'callback': 'work', 'minutes': 5, 'repeat': True},
+            'Missing': {'callback': 'not_registered', 'minutes': 5},
+            }}
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+
+        srv = await start_scheduler(manifest_path=path)
+
+        async def work(value=0):
+            pass
+
+        try:
+            srv.register_callback(work)
+            srv.add('Other', Schedule(minutes=5, repeat=True), work)  # Not in the manifest so it is never removed
+            assert srv.load_manifest() == {'added': 4, 'changed': 0, 'removed': 0, 'unchanged': 0, 'failed': 1}
+            assert sorted(srv.tasks) == ['Change', 'Keep', 'Other', 'Remove']
+            keep_task, keep_sched = srv.tasks['Keep'][:2]
+            change_task = srv.tasks['Change'][0]
+
+            manifest['schedules']['Change']['args'] = [2]
+            del manifest['schedules']['Remove']
+            manifest['schedules']['New'] = {'callback': 'work', 'seconds': 30, 'repeat': True, 'after': ['Keep']}
+            with open(path, 'w') as f:
+                json.dump(manifest, f)
+
+            async with Client((srv.ip_address, srv.port)) as client:
+                msg = await client.send_update()
+                # Missing failed last time, so it is tried again as an added schedule
+                assert '2 added, 1 changed, 1 removed, 1 unchanged, 1 failed' in msg.message
+                msg = await client.send_update(manifest_path=os.path.join(tmp, 'missing.json'))
+                assert isinstance(msg, Error)
+
+            assert sorted(srv.tasks) == ['Change', 'Keep', 'New', 'Other']
+            assert srv.tasks['Keep'][0] is keep_task and srv.tasks['Keep'][1] is keep_sched
+            assert srv.tasks['Change'][0] is change_task and srv.tasks['Change'][3] == (2,)
+            assert srv.graph.get_after('New') == ['Keep']
+
+            # A client can only load manifests next to the server manifest and does not change the manifest_path
+            os.mkdir(os.path.join(tmp, 'other'))
+            for other in ('other.json', os.path.join('other', 'other.json')):
+                with open(os.path.join(tmp, other), 'w') as f:
+                    json.dump(manifest, f)
+            async with Client((srv.ip_address, srv.port)) as client:
+                for other in (os.path.join(tmp, 'other', 'other.json'), os.path.join('other', 'other.json'),
+                              os.path.join('..', os.path.basename(tmp), 'other', 'other.json'), '/etc/passwd'):
+                    msg = await client.send_update(manifest_path=other)
+                    assert isinstance(msg, Error) and 'not in the directory' in msg.message
+                msg = await client.send_update(manifest_path='other.json')
+                assert '1 added, 0 changed, 0 removed, 3 unchanged, 1 failed' in msg.message  # Missing is retried
+                msg = await client.send_update(manifest_path=os.path.join(tmp, 'other.json'))
+                assert '3 unchanged' in msg.message
+            assert srv.manifest_path == path
+
+            # A client schedule that replaced a manifest schedule is not removed with the manifest entry
+            async with Client((srv.ip_address, srv.port)) as client:
+                await client.schedule_command('Keep', Schedule(minutes=1, repeat=True), 'work', 5)
+            del manifest['schedules']['Keep']
+            with open(path, 'w') as f:
+                json.dump(manifest, f)
+            assert srv.load_manifest()['removed'] == 0
+            assert srv.tasks['Keep'][3] == (5,) and 'Keep' not in srv.manifest
+
+            srv.manifest_path = None
+            try:
+                srv.check_manifest_path(os.path.join(tmp, 'other.json'))
+                raise AssertionError('A client must not name a manifest without a manifest_path')
+            except PermissionError:
+                pass
+        finally:
+            srv.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(asyncio.wait_for(run(tmp), 5))
+
+
+def test_authentication():
+    from async_sched import Client, Ping, Error
+    from async_sched.client import ClientPool
+    from async_sched.server.security import SignedWriter, SignedReader, AuthenticationError, CLIENT
+
+    # A frame only verifies once, in order and with the same key
+    writer = SignedWriter(None, b'key', CLIENT)
+    first, second = writer.sign(b'{"a": 1}'), writer.sign(b'{"a": 1}')
+    reader = SignedReader(None, b'key', CLIENT)
+    assert reader.verify(first) == b'{"a": 1}\n'
+    for frame in (first, second.replace(b'1}', b'2}')):
+        try:
+            reader.verify(frame)
+            raise AssertionError('A replayed or changed frame must not verify')
+        except AuthenticationError:
+            pass
+
+    async def run():
+        srv = await start_scheduler(auth_token='secret', auth_timeout=0.2)
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+
+        try:
+            srv.register_callback(work)
+            async with Client((srv.ip_address, srv.port), auth_token='secret') as client:
+                assert isinstance(await client.send_ping(), Ping)
+                await client.run_command('work', 1)
+
+            async with Client((srv.ip_address, srv.port), auth_token='') as client:
+                assert isinstance(await client.send_ping(), Error)  # Authentication required
+
+            async with Client((srv.ip_address, srv.port), auth_token='wrong') as client:
+                try:
+                    await client.run_command('work', 2)
+                    raise AssertionError('The server must close a connection with the wrong token')
+                except ConnectionError:
+                    pass
+            assert calls == [1] and srv.counters['auth_failed'] == 2
+
+            # A client that never sends the handshake is disconnected after the auth_timeout
+            reader, writer = await asyncio.open_connection(srv.ip_address, srv.port)
+            try:
+                assert await asyncio.wait_for(reader.read(), 1) == b''
+            finally:
+                writer.close()
+            assert srv.counters['auth_failed'] == 3
+
+            # The pool keeps the authenticated connection open, so the handshake happens once
+            pool = ClientPool(auth_token='secret')
+            for i in range(3):
+                async with pool.connection((srv.ip_address, srv.port)) as client:
+                    await client.run_command('work', i)
+            assert pool.count_idle() == 1 and calls == [1, 0, 1, 2]
+            await pool.close_async()
+        finally:
+            srv.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_tls():
+    import shutil
+    import subprocess
+    from async_sched import Client, Ping, make_server_context, make_client_context
+
+    if shutil.which('openssl') is None:
+        return  # A certificate cannot be made for the test
+
+    async def run(certfile, keyfile):
+        srv = await start_scheduler(auth_token='secret', ssl_context=make_server_context(certfile, keyfile))
+        ctx = make_client_context(certfile)
+        try:
+            reused = []
+            for _ in range(2):
+                async with Client((srv.ip_address, srv.port), auth_token='secret', ssl_context=ctx) as client:
+                    assert isinstance(await client.send_ping(), Ping)
+                    assert client.writer.get_extra_info('ssl_object') is not None
+                    reused.append(client.session_reused)
+            assert reused == [False, True]  # The second connection resumed the TLS session
+        finally:
+            srv.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = os.path.join(tmp, 'cert.pem'), os.path.join(tmp, 'key.pem')
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-keyout', keyfile, '-out', certfile, '-subj', '/CN=localhost',
+                        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'],
+                       check=True, capture_output=True)
+        asyncio.run(asyncio.wait_for(run(certfile, keyfile), 5))
+
+
+if __name__ == '__main__':
+    test_unix_address()
+    test_tcp_round_trip()
+    test_unix_round_trip()
+    test_list_schedules_filters()
+    test_background_jobs()
+    test_subscriber_backpressure()
+    test_subscribe_events()
+    test_profiler()
+    test_lag_shedding()
+    test_priority()
+    test_precise_schedule()
+    test_precise_missed_ticks()
+    test_batch_callback()
+    test_cached_command()
+    test_retry_schedule()
+    test_dependencies()
+    test_rate_limit()
+    test_timeout()
+    test_graceful_shutdown()
+    test_drain_saves_real_runs()
+    test_tracing()
+    test_history()
+    test_snapshot()
+    test_upsert()
+    test_manifest()
+    test_authentication()
+    test_tls()
+
+    print('All tests finished successfully!')